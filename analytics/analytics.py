@@ -22,28 +22,118 @@
 ###############################################
 import argparse
 import csv
+import fnmatch
+import hashlib
+import itertools
 import json
 import logging
 import multiprocessing
+from multiprocessing import shared_memory
+from multiprocessing.pool import ThreadPool
 import numpy as np
 import os
+import shutil
+import struct
 import sys
 import threading
 import time
 
-import matplotlib
-matplotlib.use("Agg")
-try:
-    import matplotlib.pyplot as plt
-except Exception as e:
-    # prevent PEP3 warning because Agg import must be before pyplot
-    raise e
-
 
 csv.field_size_limit(sys.maxsize)
 dir_path = os.path.dirname(os.path.realpath(__file__))
 project_path = dir_path[0:dir_path.find("/analytics")]
 lock = threading.RLock()
+# matplotlib.pyplot, imported by get_pyplot when the first graph is rendered
+# so callers which only calculate (core, Django views, find_unit) do not pay
+# for importing matplotlib
+plt = None
+# optional pyarrow for export_run, imported by get_pyarrow
+pyarrow = None
+
+# version of the results in extHost_results.json, increase if the analysis
+# changes so cached results of older versions are calculated again
+ANALYTICS_VERSION = 7
+# inputs of a run are identified by size, mtime and a hash of their first
+# and last FINGERPRINT_BYTES (hashing whole captures would take as long as
+# analyzing them)
+FINGERPRINT_BYTES = 1048576
+# per packet latencies of a run, stored next to extHost_results.json
+LATENCY_LIST_FILE = "latency_list.npy"
+# min/max/mean pyramid of the latencies for the zoomable interactive graph,
+# every level combines PYRAMID_FACTOR buckets of the level below
+PYRAMID_DIR = "latency_pyramid"
+PYRAMID_FACTOR = 4
+PYRAMID_DTYPE = np.dtype([("min", "<i8"), ("max", "<i8"), ("mean", "<f8"),
+                          ("time", "<i8")])
+LATENCY_WINDOWS_FILE = "latency_windows.json"
+WINDOW_PERCENTILES = [50, 99]
+
+# binary result format (*.bin), little-endian: 40 byte header followed by
+# the column values. Header: magic, format version, numpy dtype string
+# (e.g. "<u8"), number of values and the timestamp multi/tsmax the ext host
+# was started with (0 if unknown)
+BIN_MAGIC = b"P4STABIN"
+BIN_VERSION = 1
+BIN_HEADER = struct.Struct("<8sH6sQQQ")
+
+# binary chunk of a receiver in spill mode (chunk_<id>_<n>.bin): one binary
+# result file (header and values) per section, all with the same count
+CHUNK_SECTIONS = ["timestamp1_list", "timestamp2_list", "packet_sizes"]
+CHUNK_DTYPES = {"timestamp1_list": "<u8", "timestamp2_list": "<u8",
+                "packet_sizes": "<u2"}
+
+EXPORT_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+EXPORT_COMPRESSION = "zstd"
+
+# maximum number of points drawn per line chart (0 = all points)
+PLOT_MAX_POINTS = 4000
+# default number of processes rendering the graphs
+PLOT_WORKERS = min(4, os.cpu_count() or 1)
+# persistent plotting pool, created on first use by get_plot_pool
+plot_pool = None
+plot_pool_workers = 0
+# standalone analysis of a single run (python analytics.py --id) writes the
+# json and graphs to the working directory instead of results/<id>/generated
+write_to_cwd = False
+
+# runs with more packets are analyzed chunk by chunk in bounded memory
+STREAMING_THRESHOLD = 50000000
+STREAM_CHUNK_SIZE = 1000000
+
+# folder in the results of a run the chunk snapshots of a running capture
+# are copied to, see LiveAnalytics
+LIVE_CHUNK_DIR = "chunks"
+LIVE_RESULTS_FILE = "live_results.json"
+
+# latency histogram (bar chart): number of buckets and bucket layout,
+# "linear" (equal width), "log" (logarithmic width) or "hdr" (HdrHistogram
+# layout with HDR_SUB_BUCKETS equal buckets per power of two nanoseconds)
+HISTOGRAM_BINS = 10
+HISTOGRAM_SCALE = "linear"
+HISTOGRAM_SCALES = ["linear", "log", "hdr"]
+HDR_SUB_BUCKETS = 8
+# latency percentiles in the results, exact for in memory runs, estimated
+# with a DDSketch of PERCENTILE_ACCURACY relative accuracy in streaming mode
+PERCENTILES = [50, 90, 99, 99.9, 99.99]
+PERCENTILE_ACCURACY = 0.001
+# window of the throughput and packet rate graphs in nanoseconds, can be
+# set between MIN_THROUGHPUT_WINDOW (10us) and MAX_THROUGHPUT_WINDOW (1s)
+THROUGHPUT_WINDOW = 100000000
+MIN_THROUGHPUT_WINDOW = 10000
+MAX_THROUGHPUT_WINDOW = 1000000000
+# gaps in the ingress timestamps longer than LOSS_GAP_FACTOR times the median
+# gap count as loss burst
+LOSS_GAP_FACTOR = 3
+# inter-arrival times: packets closer than IAT_GAP_THRESHOLD (ns) form a
+# burst, layout of the histogram (one of HISTOGRAM_SCALES), values below
+# IAT_DENSE_LIMIT (ns) are counted with bincount, larger ones (e.g. pauses)
+# with a sort
+IAT_GAP_THRESHOLD = 1000
+IAT_HISTOGRAM_SCALE = "log"
+IAT_DENSE_LIMIT = 1048576
+# nanoseconds per unit returned by find_unit
+UNIT_FACTORS = {"nanoseconds": 1, "microseconds": 1000,
+                "milliseconds": 1000000}
 
 
 def get_fallback_logger():
@@ -54,309 +144,1849 @@ def get_fallback_logger():
 
 
 # read the csv files and plots the graphs
-def main(file_id, multicast, results_path, logger=None):
-    def thread_join(thrs):
-        for thread in thrs:
-            thread.start()
-        for thread in thrs:
-            thread.join()
-
+# streaming: analyze chunk by chunk in bounded memory (None = if the run has
+# more than STREAMING_THRESHOLD packets), no per packet graphs in this mode
+# plot_workers: number of processes of the plotting pool (None = PLOT_WORKERS)
+# plot_max_points: point budget per line chart (None = PLOT_MAX_POINTS)
+# histogram_bins/histogram_scale: latency histogram layout (None = defaults)
+# throughput_window: window of the throughput graphs in ns (None = 100ms)
+# iat_gap: inter-arrival times below it in ns are bursts (None = 1us)
+# plots: False = only calculate the results (e.g. batch_analyze), the graphs
+# are rendered by the next call with plots
+def main(file_id, multicast, results_path, logger=None, streaming=None,
+         chunk_size=None, plot_workers=None, plot_max_points=None,
+         histogram_bins=None, histogram_scale=None, throughput_window=None,
+         plots=True, iat_gap=None):
     if logger == None:
         logger = get_fallback_logger()
 
     fpath = project_path + "/results/" + str(
         file_id) + "/generated/extHost_results.json"
+    cache_key = results_cache_key(results_path, file_id, multicast,
+                                  histogram_bins, histogram_scale,
+                                  throughput_window, iat_gap)
     if os.path.isfile(fpath):
-        with open(fpath, "r") as f:
-            dict_from_json = json.load(f)
-            if "pos_latency_std_deviation" in dict_from_json:
-                logger.info("Using cached version of " + fpath)
-                return dict_from_json
-            else:
-                logger.info("Calculating results with newest P4STA features ...")
+        try:
+            with open(fpath, "r") as f:
+                dict_from_json = json.load(f)
+        except ValueError:
+            dict_from_json = {}
+        if dict_from_json.get("analytics_cache") == cache_key and \
+                (dict_from_json.get("plotted", True) or not plots):
+            logger.info("Using cached version of " + fpath)
+            return dict_from_json
+        else:
+            logger.info("Calculating results with newest P4STA features ...")
 
-    start = time.time()
-    raw_packet_counter = read_csv(logger, results_path, "raw_packet_counter", file_id)[0]
-    packet_sizes = read_csv(logger, results_path, "packet_sizes", file_id)
-    timestamp1_list = read_csv(logger, results_path, "timestamp1_list", file_id)
-    timestamp2_list = read_csv(logger, results_path, "timestamp2_list", file_id)
-    end = time.time()
-    logger.debug("It took " + str(end-start) + "s to load csv files for P4STA analytics.")
-
-    # get list of cumulative packet sizes
-    throughput_at_time = []
-    total_throughput = 0
-    
-    # debugging
-    logger.debug("LEN PACKET SIZES: " + str(len(packet_sizes)) )
-    logger.debug("len(timestamp1_list) = " + str(len(timestamp1_list)))
-    logger.debug("len(timestamp2_list) = " + str(len(timestamp2_list)))
-
-    for i in range(len(packet_sizes)):
-        total_throughput = total_throughput + packet_sizes[i]
-        throughput_at_time.append(total_throughput)
-
-    latency_list = []
-    min_latency = max_latency = ave_latency = latency_variance = 0
-    latency_std_deviation = pos_latency_std_deviation = neg_latency_std_deviation = 0
-    total_ipdv = abs_total_ipdv = total_pdv = total_latencies = 0
-    min_ipdv = max_ipdv = ave_ipdv = ave_abs_ipdv = 0
-    min_pdv = max_pdv = ave_pdv = 0
-    min_packets = max_packets = ave_packet_sec = 0
-    ipdv_list = []
-    count_list = []
-    count_list_sec = []
-    pdv_list = []
-    mbit_list = []
-    packet_list = []
-    time_throughput = []
-    if len(timestamp1_list) > 0 and len(timestamp2_list) > 0:
-        if timestamp1_list[0] > 0 and len(timestamp1_list) == len(timestamp2_list):
-            # creates list of all latencies
-
-            # 50% faster than for loop calculating t2-t1 for each packet
-            latency_list = list(map(int.__sub__, timestamp2_list, timestamp1_list))
-            total_latencies = sum(latency_list) # maybe numpy sum here
-            for i in range(0, len(timestamp1_list)):
-                # sets the start time to 0 ms
-                diff = timestamp2_list[i] - timestamp2_list[0]
-                time_throughput.append(int(round(diff / 1000000)))
-                # - [0] to set first time to 0 sec
-                count_list_sec.append(diff / 1000000000)
-            # minimum and maximum latency
-            min_latency = min(latency_list, default=0)
-            max_latency = max(latency_list, default=0)
-            # fills pdv and ipdv lists
-            for z in range(0, len(latency_list)):
-                count_list.append(z)
-                pdv = latency_list[z] - min_latency
-                pdv_list.append(pdv)
-                total_pdv = total_pdv + pdv
-                if 0 < z < len(latency_list):
-                    ipdv = latency_list[z] - latency_list[z - 1]
-                    ipdv_list.append(ipdv)
-                    total_ipdv = total_ipdv + ipdv
-                    abs_total_ipdv = abs_total_ipdv + abs(ipdv)
-                else:
-                    ipdv_list.append(0)
-            # calculate average latency, ipdv and pdv
-            if len(latency_list) > 0:
-                ave_latency = round(total_latencies / len(latency_list), 2)
-                ave_ipdv = round(total_ipdv / len(ipdv_list))
-                ave_abs_ipdv = round(abs_total_ipdv / len(ipdv_list))
-                ave_pdv = round(total_pdv / len(pdv_list))
-                # calculate standard deviation of latency
-                total_sqr_dev = 0
-                pos_sqr_dev = 0
-                pos_counter = 0
-                neg_sqr_dev = 0
-                neg_counter = 0
-                for z in range(0, len(latency_list)):
-                    total_sqr_dev += (latency_list[z] - ave_latency)**2
-                    # we count equal values to positive
-                    if latency_list[z] >= ave_latency:
-                        pos_sqr_dev += (latency_list[z] - ave_latency)**2
-                        pos_counter += 1
-                    else:
-                        neg_sqr_dev += (latency_list[z] - ave_latency)**2
-                        neg_counter += 1
-
-
-                latency_variance = total_sqr_dev / len(ipdv_list)
-                latency_std_deviation = latency_variance ** 0.5
-
-                if pos_counter > 0:
-                    pos_latency_std_deviation = (pos_sqr_dev / pos_counter) ** 0.5
-                else:
-                    pos_latency_std_deviation = 0
+    results, series = analyze_run(logger, results_path, file_id, multicast,
+                                  streaming, chunk_size, histogram_bins,
+                                  histogram_scale, throughput_window, iat_gap)
 
-                if neg_counter > 0:
-                    neg_latency_std_deviation = (neg_sqr_dev / neg_counter) ** 0.5
-                else:
-                    neg_latency_std_deviation = 0
-
-
-            # minimum and maximum ipdv
-            min_ipdv = min(ipdv_list, default=0)
-            max_ipdv = max(ipdv_list, default=0)
-            # minimum and maximum pdv
-            min_pdv = min(pdv_list, default=0)
-            max_pdv = max(pdv_list, default=0)
-            # fill speed and packet rate lists
-            last_time_hit = 0
-            last_throughput_hit = 0
-            last_packet_hit = 0
-            mbit_list.append(0)
-            packet_list.append(0)
-            # prepares lists for speed and packet rate graph
-            for y in range(0, len(throughput_at_time)):
-                # more than 99ms difference -> 0.1s intervals
-                if (time_throughput[y] - last_time_hit) >= 100:
-                    amount = (time_throughput[y] - last_time_hit) / 100
-                    # more than 200ms difference between two hits -> pause
-                    if amount >= 2:
-                        for i in range(0, int(round(amount))):
-                            mbit_list.append(0)
-                            packet_list.append(0)
-                    last_time_hit = time_throughput[y]
-                    # byte->megabit/10 measure every 0.1s but unit is mbit/s
-                    mbit_list.append((throughput_at_time[y] -
-                                      last_throughput_hit) * 8 / 100000)
-                    # *10 measure for every 0.1s but unit is packets/seconds
-                    packet_list.append((y - last_packet_hit)*10)
-                    last_packet_hit = y
-                    last_throughput_hit = throughput_at_time[y]
-            mbit_list.append(0)  # set next entry to 0
-            packet_list.append(0)
-
-            # round by 9 digits after , float could result in weird fractions
-            upsc_mbit_list = [round(x*int(multicast), 9) for x in mbit_list]
-
-            upsc_packet_list = [x*int(multicast) for x in packet_list]
-            # ignores the first and last second to prevent min = 0
-            min_packets = min(packet_list[1:-1], default=0)
-            max_packets = max(packet_list, default=0)
-            if len(packet_list) != 2:
-                # -2 because added 0 at start and end. *10 because of 0.1s step
-                ave_packet_sec = round(
-                    (len(throughput_at_time)/(len(packet_list)-2)) * 10, 2)
-            else:
-                ave_packet_sec = 0
-
-            start = time.time()
-            processes = []
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    latency_list, count_list,
-                    "Latency of DUT for every " + multicast + ". packet",
-                    "Packets", "Latency", "latency", True, False, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    latency_list, count_list_sec,
-                    "Latency of DUT for every " + multicast + ". packet",
-                    "t[s]", "Latency", "latency_sec", True, False, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    latency_list, count_list,
-                    "Latency of DUT for every " + multicast + ". packet",
-                    "Packets", "Latency", "latency_y0", True, True, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    latency_list, count_list_sec,
-                    "Latency of DUT for every " + multicast + ". packet",
-                    "t[s]", "Latency", "latency_sec_y0", True, True, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    ipdv_list, count_list,
-                    "IPDVs of DUT for every " + multicast + ". packet",
-                    "IPDV", "Packets", "ipdv", True, False, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    ipdv_list, count_list_sec,
-                    "IPDVs of DUT for every " + multicast + ". packet",
-                    "t[s]", "IPDV", "ipdv_sec", True, False, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    pdv_list, count_list,
-                    "PDVs of DUT for every " + multicast + ". packet",
-                    "Packets", "PDV", "pdv", True, False, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    pdv_list, count_list_sec,
-                    "PDVs of DUT for every " + multicast + ". packet",
-                    "t[s]", "PDV", "pdv_sec", True, False, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    mbit_list, np.arange(0, len(mbit_list) / 10, 0.1),
-                    "Throughput of DUT for every " + multicast + ". packet",
-                    "t[s]", "Megabit/s", "speed", False, False, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    upsc_mbit_list,
-                    np.arange(0, len(upsc_mbit_list) / 10, 0.1),
-                    "Upscaled throughput of DUT", "t[s]", "Megabit/s",
-                    "speed_upscaled", False, False, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    upsc_packet_list,
-                    np.arange(0, len(upsc_packet_list) / 10, 0.1),
-                    "Upscaled rate jitter of DUT", "t[s]", "Packet/s",
-                    "packet_rate_upscaled", False, False, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_graph, args=(
-                    packet_list, np.arange(0, len(packet_list) / 10, 0.1),
-                    "Rate jitter of DUT for every " + multicast + ". packet",
-                    "t[s]", "Packet/s", "packet_rate", False, False, file_id))
-            processes.append(x)
-
-            x = multiprocessing.Process(
-                target=plot_bar, args=(
-                    latency_list, min_latency, max_latency, "latency_bar",
-                    "Latency", "Packets", 10, True, file_id))
-            processes.append(x)
-
-            thread_join(processes)
-            end = time.time()
-            logger.debug("MULTIP: It took " + str(end - start) + " s to plot graphs in analytics.")
-
-    results = {"num_raw_packets": raw_packet_counter,
-               "num_processed_packets": len(latency_list),
-               "total_throughput": round(total_throughput/1000000, 2),
-               "min_latency": min_latency, "max_latency": max_latency,
-               "avg_latency": ave_latency, "min_ipdv": min_ipdv,
-               "max_ipdv": max_ipdv, "avg_ipdv": ave_ipdv,
-               "avg_abs_ipdv": ave_abs_ipdv, "min_pdv": min_pdv,
-               "max_pdv": max_pdv, "avg_pdv": ave_pdv,
-               "min_packets_per_second": min_packets,
-               "max_packets_per_second": max_packets,
-               "avg_packets_per_second": ave_packet_sec,
-               "latency_std_deviation": latency_std_deviation,
-               "pos_latency_std_deviation": pos_latency_std_deviation,
-               "neg_latency_std_deviation": neg_latency_std_deviation,
-               "latency_variance": latency_variance,
-               "latency_list": latency_list}
-    if __name__ == "__main__":
+    latency_list = np.zeros(0, dtype=np.int64)
+    if series is not None:
+        latency_list = series.get("latency", latency_list)
+        if plots:
+            plot_results(series, results, multicast, file_id, logger,
+                         plot_workers, plot_max_points, throughput_window)
+
+    results["analytics_cache"] = cache_key
+    results["plotted"] = plots
+    save_results(file_id, results, latency_list)
+    if series is not None and "latency" in series:
+        save_latency_pyramid(file_id, series["latency"], series["count_sec"])
+    else:
+        # e.g. streaming mode, tiles of an earlier analysis must not be served
+        remove_latency_pyramid(file_id)
+    if series is not None and "latency_windows" in series:
+        save_latency_windows(file_id, series["latency_windows"])
+
+    return results
+
+
+# writes extHost_results.json and the per packet latencies of a run
+def save_results(file_id, results, latency_list):
+    fpath = project_path + "/results/" + str(
+        file_id) + "/generated/extHost_results.json"
+    if write_to_cwd:
         fpath = "extHost_results.json"
+    else:
+        os.makedirs(os.path.dirname(fpath), exist_ok=True)
+    # bulk per packet data is kept out of the json, see load_latency_list
+    np.save(os.path.join(os.path.dirname(fpath), LATENCY_LIST_FILE),
+            latency_list)
     with open(fpath, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=4)
 
+
+# calculates the results of a run without plotting, returns the results
+# dict and the series of calculate_statistics(_streaming)
+def analyze_run(logger, results_path, file_id, multicast, streaming=None,
+                chunk_size=None, histogram_bins=None, histogram_scale=None,
+                throughput_window=None, iat_gap=None):
+    raw_packet_counter = int(read_csv(logger, results_path, "raw_packet_counter", file_id)[0])
+    if streaming is None:
+        streaming = estimate_packet_count(
+            results_path, file_id) > STREAMING_THRESHOLD
+
+    if streaming:
+        logger.info("Analyzing run " + str(file_id) + " in streaming mode.")
+        start = time.time()
+        results, series = calculate_statistics_streaming(
+            logger, results_path, file_id, multicast, chunk_size,
+            histogram_bins, histogram_scale, throughput_window, iat_gap)
+        end = time.time()
+        logger.debug("It took " + str(end - start) + "s to calculate statistics in streaming mode.")
+    else:
+        start = time.time()
+        packet_sizes = read_csv(logger, results_path, "packet_sizes", file_id)
+        timestamp1_list = read_timestamps(logger, results_path, "timestamp1_list", file_id)
+        timestamp2_list = read_timestamps(logger, results_path, "timestamp2_list", file_id)
+        end = time.time()
+        logger.debug("It took " + str(end-start) + "s to load csv files for P4STA analytics.")
+
+        # debugging
+        logger.debug("LEN PACKET SIZES: " + str(len(packet_sizes)))
+        logger.debug("len(timestamp1_list) = " + str(len(timestamp1_list)))
+        logger.debug("len(timestamp2_list) = " + str(len(timestamp2_list)))
+
+        start = time.time()
+        results, series = calculate_statistics(timestamp1_list, timestamp2_list,
+                                               packet_sizes, multicast,
+                                               histogram_bins, histogram_scale,
+                                               throughput_window, iat_gap)
+        end = time.time()
+        logger.debug("It took " + str(end - start) + "s to calculate statistics.")
+    return {"num_raw_packets": raw_packet_counter, **results}, series
+
+
+# identifies the input files and settings the results of a run are
+# calculated from, cached results are only used if the key is unchanged
+def results_cache_key(results_path, file_id, multicast, histogram_bins=None,
+                      histogram_scale=None, throughput_window=None,
+                      iat_gap=None):
+    inputs = {}
+    for file_name in ["raw_packet_counter", "timestamp1_list",
+                      "timestamp2_list", "packet_sizes"]:
+        for ending in [".bin", ".csv"]:
+            path = os.path.join(results_path,
+                                file_name + "_" + str(file_id) + ending)
+            if os.path.isfile(path):
+                inputs[file_name + ending] = file_fingerprint(path)
+                break
+    return {"version": ANALYTICS_VERSION, "multicast": str(multicast),
+            "histogram_bins": HISTOGRAM_BINS if histogram_bins is None
+            else int(histogram_bins),
+            "histogram_scale": HISTOGRAM_SCALE if histogram_scale is None
+            else histogram_scale,
+            "throughput_window": THROUGHPUT_WINDOW if throughput_window is None
+            else int(throughput_window),
+            "iat_gap": IAT_GAP_THRESHOLD if iat_gap is None else int(iat_gap),
+            "timestamp_format": list(read_timestamp_format(results_path,
+                                                           file_id)),
+            "inputs": inputs}
+
+
+# size, mtime and sha1 of the first and last FINGERPRINT_BYTES of a file
+def file_fingerprint(path):
+    stat = os.stat(path)
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        sha1.update(f.read(FINGERPRINT_BYTES))
+        if stat.st_size > FINGERPRINT_BYTES:
+            f.seek(max(FINGERPRINT_BYTES, stat.st_size - FINGERPRINT_BYTES))
+            sha1.update(f.read(FINGERPRINT_BYTES))
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "sha1": sha1.hexdigest()}
+
+
+# per packet latencies of an analyzed run (call main before), memory mapped
+# numpy array, empty for runs analyzed in streaming mode
+def load_latency_list(file_id):
+    path = project_path + "/results/" + str(
+        file_id) + "/generated/" + LATENCY_LIST_FILE
+    if not os.path.isfile(path):
+        return np.zeros(0, dtype=np.int64)
+    return np.load(path, mmap_mode="r")
+
+
+# stores the latency pyramid of a run in generated/latency_pyramid: level 0
+# holds the time (ms since the first packet) of every packet, level k >= 1
+# min, max, mean latency and start time of buckets of PYRAMID_FACTOR^k packets
+# up to the first level with at most PLOT_MAX_POINTS buckets
+def save_latency_pyramid(file_id, latency, count_sec):
+    path = latency_pyramid_path(file_id)
+    remove_latency_pyramid(file_id)
+    os.makedirs(path, exist_ok=True)
+    latency = np.asarray(latency, dtype=np.int64)
+    time_ms = np.rint(np.asarray(count_sec) * 1000).astype(np.int64)
+    np.save(os.path.join(path, "level_0.npy"), time_ms)
+    mins = maxs = sums = latency
+    counts = np.ones(len(latency), dtype=np.int64)
+    levels = 0
+    while len(mins) > PLOT_MAX_POINTS:
+        starts = np.arange(0, len(mins), PYRAMID_FACTOR)
+        mins = np.minimum.reduceat(mins, starts)
+        maxs = np.maximum.reduceat(maxs, starts)
+        sums = np.add.reduceat(sums, starts)
+        counts = np.add.reduceat(counts, starts)
+        time_ms = time_ms[starts]
+        levels += 1
+        level = np.zeros(len(starts), dtype=PYRAMID_DTYPE)
+        level["min"] = mins
+        level["max"] = maxs
+        level["mean"] = sums / counts
+        level["time"] = time_ms
+        np.save(os.path.join(path, "level_" + str(levels) + ".npy"), level)
+    unit = find_unit_array(latency)[1] if len(latency) > 0 else "nanoseconds"
+    with open(os.path.join(path, "pyramid.json"), "w") as f:
+        json.dump({"num_packets": len(latency), "factor": PYRAMID_FACTOR,
+                   "levels": levels, "unit": unit}, f)
+
+
+def latency_pyramid_path(file_id):
+    if write_to_cwd:
+        return PYRAMID_DIR
+    return project_path + "/results/" + str(file_id) + "/generated/" + \
+        PYRAMID_DIR
+
+
+# removes the pyramid of an earlier analysis of the run
+def remove_latency_pyramid(file_id):
+    shutil.rmtree(latency_pyramid_path(file_id), ignore_errors=True)
+
+
+# stores the latency percentiles per window (see latency_windows) as compact
+# json in generated/latency_windows.json
+def save_latency_windows(file_id, windows):
+    fpath = project_path + "/results/" + str(file_id) + "/generated/" + \
+        LATENCY_WINDOWS_FILE
+    if write_to_cwd:
+        fpath = LATENCY_WINDOWS_FILE
+    else:
+        os.makedirs(os.path.dirname(fpath), exist_ok=True)
+    with open(fpath, "w") as f:
+        json.dump(windows, f, separators=(",", ":"))
+
+
+# latency percentiles per window of an analyzed run, None if the run has none
+# (e.g. streaming mode)
+def load_latency_windows(file_id):
+    try:
+        with open(project_path + "/results/" + str(file_id) + "/generated/"
+                  + LATENCY_WINDOWS_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# points of the interactive latency graph between packet start and end
+# (0 based, end excluded, None = all) at a resolution of at most points
+# buckets from the pyramid of an analyzed run, latencies in the unit of the
+# whole run; returns None if the run has no pyramid (e.g. streaming mode)
+def latency_tiles(file_id, start=None, end=None, points=None):
+    path = project_path + "/results/" + str(file_id) + "/generated/" + \
+        PYRAMID_DIR
+    try:
+        with open(os.path.join(path, "pyramid.json"), "r") as f:
+            pyramid = json.load(f)
+    except (OSError, ValueError):
+        return None
+    num = pyramid["num_packets"]
+    start = 0 if start is None else min(max(int(start), 0), num)
+    end = num if end is None else min(max(int(end), start), num)
+    if points is None:
+        points = PLOT_MAX_POINTS
+    points = max(int(points), 1)
+    level = 0
+    bucket = 1
+    while level < pyramid["levels"] and (end - start) / bucket > points:
+        level += 1
+        bucket *= pyramid["factor"]
+    first = start // bucket
+    last = -(-end // bucket)
+    if level == 0:
+        latency = load_latency_list(file_id)[first:last]
+        time_ms = np.load(os.path.join(path, "level_0.npy"),
+                          mmap_mode="r")[first:last]
+        min_list = max_list = mean_list = scale_to_unit(
+            np.asarray(latency), pyramid["unit"])
+    else:
+        tiles = np.load(os.path.join(path, "level_" + str(level) + ".npy"),
+                        mmap_mode="r")[first:last]
+        min_list = scale_to_unit(np.asarray(tiles["min"]), pyramid["unit"])
+        max_list = scale_to_unit(np.asarray(tiles["max"]), pyramid["unit"])
+        mean_list = scale_to_unit(np.asarray(tiles["mean"]), pyramid["unit"])
+        time_ms = tiles["time"]
+    return {"num_packets": num, "level": level, "bucket": bucket,
+            "unit": pyramid["unit"], "start": first * bucket,
+            "x": (np.arange(first, last) * bucket + 1).tolist(),
+            "min": np.asarray(min_list).tolist(),
+            "max": np.asarray(max_list).tolist(),
+            "mean": np.asarray(mean_list).tolist(),
+            "time": np.asarray(time_ms).tolist()}
+
+
+# ids of the runs in results_dir matching the ids or glob patterns
+# (e.g. "16*"), only folders with timestamp files, sorted
+def batch_run_ids(results_dir, patterns):
+    ids = []
+    for file_id in sorted(os.listdir(results_dir)):
+        if not any(fnmatch.fnmatchcase(file_id, pattern)
+                   for pattern in patterns):
+            continue
+        for ending in [".bin", ".csv"]:
+            if os.path.isfile(os.path.join(results_dir, file_id,
+                                           "timestamp1_list_" + file_id +
+                                           ending)):
+                ids.append(file_id)
+                break
+    return ids
+
+
+# analyzes many runs in a process pool, e.g. all archived runs after an
+# analytics upgrade, and writes one row per run to summary_path + .json and
+# .csv; runs is a list of (file_id, multicast, results_path), the other
+# arguments like main(); returns the summary dict
+def batch_analyze(runs, summary_path, logger=None, workers=None, plots=True,
+                  streaming=None, chunk_size=None, plot_max_points=None,
+                  histogram_bins=None, histogram_scale=None,
+                  throughput_window=None, iat_gap=None):
+    if logger is None:
+        logger = get_fallback_logger()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    start = time.time()
+    with multiprocessing.Pool(max(1, min(int(workers), len(runs)))) as pool:
+        rows = pool.starmap(batch_job, [
+            (file_id, multicast, results_path, plots, streaming, chunk_size,
+             plot_max_points, histogram_bins, histogram_scale,
+             throughput_window, iat_gap)
+            for file_id, multicast, results_path in runs])
+    logger.info("It took " + str(round(time.time() - start, 2)) +
+                "s to analyze " + str(len(runs)) + " runs.")
+    summary = {"version": ANALYTICS_VERSION, "runs": rows}
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    with open(summary_path + ".json", "w") as f:
+        json.dump(summary, f, indent=4)
+    columns = []
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    with open(summary_path + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    return summary
+
+
+# executed in the pool of batch_analyze, analyzes one run with main()
+# returns the summary row of the run, "status" is "ok" or the error
+def batch_job(file_id, multicast, results_path, plots, streaming, chunk_size,
+              plot_max_points, histogram_bins, histogram_scale,
+              throughput_window, iat_gap=None):
+    logger = logging.getLogger(__name__)
+    start = time.time()
+    row = {"id": str(file_id), "multicast": multicast}
+    if len(str(multicast)) == 0:
+        row["status"] = "error: config_" + str(file_id) + ".json not found"
+        return row
+    try:
+        results = main(file_id, multicast, results_path, logger, streaming,
+                       chunk_size, 1, plot_max_points, histogram_bins,
+                       histogram_scale, throughput_window, plots, iat_gap)
+    except Exception as e:
+        logger.error("Analyzing run " + str(file_id) + " failed: " + str(e))
+        row["status"] = "error: " + str(e)
+        return row
+    row["status"] = "ok"
+    row["seconds"] = round(time.time() - start, 3)
+    # flat values only, the percentiles and packet order as own columns
+    row.update({key: value for key, value in results.items()
+                if not isinstance(value, (dict, list))})
+    row.update(results.get("latency_percentiles", {}))
+    row.update(results.get("packet_order", {}))
+    return row
+
+
+# compares several runs, e.g. of different DUT firmwares: analyzes them in a
+# process pool, writes comparison.json, comparison.csv (one row per run) and
+# overlay graphs of the latency CDF, percentiles and throughput to
+# output_path; runs is a list of (file_id, multicast, results_path)
+# returns the comparison dict
+def compare_runs(runs, output_path, logger=None, workers=None,
+                 throughput_window=None):
+    if logger is None:
+        logger = get_fallback_logger()
+    if workers is None:
+        workers = PLOT_WORKERS
+    if throughput_window is None:
+        throughput_window = THROUGHPUT_WINDOW
+    start = time.time()
+    with multiprocessing.Pool(max(1, min(int(workers), len(runs)))) as pool:
+        analyzed = pool.starmap(compare_job, [
+            (file_id, multicast, results_path, throughput_window)
+            for file_id, multicast, results_path in runs])
+    logger.debug("It took " + str(time.time() - start) + "s to analyze " +
+                 str(len(runs)) + " runs for the comparison.")
+
+    comparison = {"runs": [row for row, sketch, series in analyzed],
+                  "ks_tests": []}
+    # every pair of runs, small p-value => latency distributions differ
+    for (row, sketch, series), (other_row, other_sketch, other_series) in \
+            itertools.combinations(analyzed, 2):
+        statistic, p_value = ks_test(sketch, other_sketch)
+        comparison["ks_tests"].append({
+            "run": row["id"], "other_run": other_row["id"],
+            "statistic": round(statistic, 6), "p_value": p_value})
+
+    os.makedirs(output_path, exist_ok=True)
+    with open(os.path.join(output_path, "comparison.json"), "w") as f:
+        json.dump(comparison, f, indent=4)
+    columns = []
+    for row in comparison["runs"]:
+        columns.extend(key for key in row if key not in columns)
+    with open(os.path.join(output_path, "comparison.csv"), "w",
+              newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(comparison["runs"])
+    plot_comparison(analyzed, output_path, throughput_window)
+    return comparison
+
+
+# executed in the pool of compare_runs, analyzes one run (without plotting)
+# returns the table row, latency sketch and throughput series of the run
+def compare_job(file_id, multicast, results_path, throughput_window):
+    logger = logging.getLogger(__name__)
+    results, series = analyze_run(logger, results_path, file_id, multicast,
+                                  throughput_window=throughput_window)
+    if series is None:
+        sketch = LatencySketch()
+        series = {"mbit": [0, 0], "packet": [0, 0]}
+    elif "latency_sketch" in series:
+        sketch = series["latency_sketch"]
+    else:
+        sketch = LatencySketch()
+        sketch.add(series["latency"])
+    mbit_list = series["mbit"][1:-1]
+    row = {"id": str(file_id), "multicast": multicast,
+           "num_raw_packets": results["num_raw_packets"],
+           "num_processed_packets": results["num_processed_packets"],
+           "total_throughput": results["total_throughput"],
+           "avg_mbit_per_second": round(sum(mbit_list) / len(mbit_list), 2)
+           if len(mbit_list) > 0 else 0,
+           "max_mbit_per_second": round(max(mbit_list, default=0), 2),
+           "avg_packets_per_second": results["avg_packets_per_second"],
+           "min_latency": results["min_latency"],
+           "avg_latency": results["avg_latency"],
+           "max_latency": results["max_latency"],
+           "latency_std_deviation": results["latency_std_deviation"],
+           "avg_abs_ipdv": results["avg_abs_ipdv"]}
+    row.update(results.get("latency_percentiles", {}))
+    row.update(stamper_packet_loss(results_path, file_id))
+    return row, sketch, {"mbit": series["mbit"], "packet": series["packet"]}
+
+
+# packet loss of the DUT ports from stamper_<id>.json (p4_dev_<id>.json of
+# older runs) like P4staCore.stamper_results, empty dict if not available
+def stamper_packet_loss(results_path, file_id):
+    for prefix in ["stamper_", "p4_dev_"]:
+        path = os.path.join(results_path, prefix + str(file_id) + ".json")
+        if os.path.isfile(path):
+            break
+    else:
+        return {}
+    try:
+        with open(path, "r") as f:
+            sw = json.load(f)
+        loss = {}
+        for word in ["", "_stamped"]:
+            num_ingress = num_egress = 0
+            for dut in sw["dut_ports"]:
+                if dut["use_port"] == "checked":
+                    num_ingress += dut["num_ingress" + word + "_packets"]
+                    num_egress += dut["num_egress" + word + "_packets"]
+            loss["packetloss" + word] = num_egress - num_ingress
+            loss["packetloss" + word + "_percent"] = round(
+                (num_egress - num_ingress) / num_egress * 100, 2) \
+                if num_egress > 0 else 0
+        return loss
+    except (ValueError, KeyError, TypeError):
+        return {}
+
+
+# overlay graphs of compare_runs: latency CDF, percentiles and throughput
+def plot_comparison(analyzed, output_path, throughput_window):
+    with lock:
+        plt = get_pyplot()
+        sketches = [sketch for row, sketch, series in analyzed
+                    if sketch.num > 0]
+        unit = "nanoseconds"
+        if len(sketches) > 0:
+            unit = array_unit(np.array([sketch.percentiles(
+                -np.inf, np.inf, [50])["p50"] for sketch in sketches]))
+        factor = UNIT_FACTORS[unit]
+
+        fig, ax = plt.subplots()
+        for row, sketch, series in analyzed:
+            if sketch.num > 0:
+                values, counts = sketch.distribution()
+                keep = counts > 0
+                ax.step(values[keep] / factor,
+                        np.cumsum(counts[keep]) / sketch.num, where="post",
+                        label=row["id"])
+        ax.set(xlabel="Latency [" + unit + "]", ylabel="Fraction of packets",
+               title="Latency CDF")
+        ax.grid()
+        ax.legend(fontsize=6)
+        fig.savefig(os.path.join(output_path, "latency_cdf.svg"),
+                    format="svg")
+
+        fig, ax = plt.subplots()
+        names = [percentile_name(p) for p in PERCENTILES]
+        for row, sketch, series in analyzed:
+            if all(name in row for name in names):
+                ax.plot(names, [row[name] / factor for name in names],
+                        marker="o", label=row["id"])
+        ax.set(xlabel="Percentile", ylabel="Latency [" + unit + "]",
+               title="Latency percentiles")
+        ax.grid()
+        ax.legend(fontsize=6)
+        fig.savefig(os.path.join(output_path, "latency_percentiles.svg"),
+                    format="svg")
+
+        fig, ax = plt.subplots()
+        for row, sketch, series in analyzed:
+            ax.plot(np.arange(len(series["mbit"])) * throughput_window / 1e9,
+                    series["mbit"], label=row["id"])
+        ax.set(xlabel="t[s]", ylabel="Megabit/s",
+               title="Throughput of DUT")
+        ax.grid()
+        ax.legend(fontsize=6)
+        fig.savefig(os.path.join(output_path, "speed.svg"), format="svg")
+        plt.close("all")
+
+
+# renders all graphs of a run in the plotting pool,
+# returns dict with the render time in seconds per graph
+def plot_results(series, results, multicast, file_id, logger, workers=None,
+                 max_points=None, throughput_window=None):
+    jobs = []
+    shared = {}
+    try:
+        if "latency" in series:
+            for key in ["latency", "count", "count_sec", "ipdv", "pdv"]:
+                shared[key] = SharedArray(series[key])
+            every = " of DUT for every " + multicast + ". packet"
+            for values, index, title, x_label, y_label, name, adjust_y_ax in [
+                    ("latency", "count", "Latency", "Packets", "Latency",
+                     "latency", False),
+                    ("latency", "count_sec", "Latency", "t[s]", "Latency",
+                     "latency_sec", False),
+                    ("latency", "count", "Latency", "Packets", "Latency",
+                     "latency_y0", True),
+                    ("latency", "count_sec", "Latency", "t[s]", "Latency",
+                     "latency_sec_y0", True),
+                    ("ipdv", "count", "IPDVs", "IPDV", "Packets",
+                     "ipdv", False),
+                    ("ipdv", "count_sec", "IPDVs", "t[s]", "IPDV",
+                     "ipdv_sec", False),
+                    ("pdv", "count", "PDVs", "Packets", "PDV", "pdv", False),
+                    ("pdv", "count_sec", "PDVs", "t[s]", "PDV",
+                     "pdv_sec", False)]:
+                jobs.append((name, "plot_graph", (
+                    shared[values], shared[index], title + every, x_label,
+                    y_label, name, True, adjust_y_ax, file_id, max_points)))
+        if "latency_histogram" in results:
+            jobs.append(("latency_bar", "plot_histogram", (
+                results["latency_histogram"], "latency_bar", "Latency",
+                "Packets", file_id)))
+        if "latency_windows" in series:
+            jobs.append(("latency_windows", "plot_latency_windows", (
+                series["latency_windows"], "latency_windows", file_id)))
+
+        if throughput_window is None:
+            throughput_window = THROUGHPUT_WINDOW
+        for values, title, y_label, name in [
+                ("mbit", "Throughput of DUT for every " + multicast +
+                 ". packet", "Megabit/s", "speed"),
+                ("upsc_mbit", "Upscaled throughput of DUT", "Megabit/s",
+                 "speed_upscaled"),
+                ("upsc_packet", "Upscaled rate jitter of DUT", "Packet/s",
+                 "packet_rate_upscaled"),
+                ("packet", "Rate jitter of DUT for every " + multicast +
+                 ". packet", "Packet/s", "packet_rate")]:
+            jobs.append((name, "plot_graph", (
+                series[values],
+                np.arange(len(series[values])) * throughput_window / 1e9,
+                title, "t[s]", y_label, name, False, False, file_id,
+                max_points)))
+
+        # graphs of older results are cached by plot_graph, but outdated now
+        for name, func, args in jobs:
+            if write_to_cwd:
+                break
+            try:
+                os.remove(project_path + "/results/" + str(file_id) +
+                          "/generated/" + name + ".svg")
+            except OSError:
+                pass
+
+        start = time.time()
+        pool = get_plot_pool(workers)
+        pending = [(name, pool.apply_async(plot_job, (func, args)))
+                   for name, func, args in jobs]
+        timings = {}
+        for name, res in pending:
+            try:
+                timings[name] = res.get()
+                logger.debug("Rendered " + name + ".svg in " +
+                             str(round(timings[name], 3)) + " s")
+            except Exception as e:
+                logger.error("Rendering " + name + ".svg failed: " + str(e))
+        end = time.time()
+        logger.debug("MULTIP: It took " + str(end - start) +
+                     " s to plot graphs in analytics.")
+        return timings
+    finally:
+        for shared_array in shared.values():
+            shared_array.release()
+
+
+# returns the persistent plotting pool, recreated if the number of
+# workers changes
+def get_plot_pool(workers=None):
+    global plot_pool, plot_pool_workers
+    if workers is None:
+        workers = PLOT_WORKERS
+    workers = max(1, int(workers))
+    if multiprocessing.current_process().daemon:
+        # processes of a pool (e.g. batch_analyze) can not start another
+        # pool, the graphs are rendered by one thread (plotting is locked)
+        if not isinstance(plot_pool, ThreadPool):
+            plot_pool = ThreadPool(1)
+            plot_pool_workers = 1
+        return plot_pool
+    if plot_pool is None or plot_pool_workers != workers:
+        if plot_pool is not None:
+            plot_pool.close()
+            plot_pool.join()
+        plot_pool = multiprocessing.Pool(workers)
+        plot_pool_workers = workers
+    return plot_pool
+
+
+# executed in the plotting pool, maps the shared arrays and renders one graph
+# returns the render time in seconds
+def plot_job(func, args):
+    start = time.time()
+    attached = []
+    real_args = []
+    try:
+        for arg in args:
+            if isinstance(arg, SharedArray):
+                shm, array = arg.attach()
+                attached.append(shm)
+                real_args.append(array)
+            else:
+                real_args.append(arg)
+        {"plot_bar": plot_bar, "plot_graph": plot_graph,
+         "plot_histogram": plot_histogram,
+         "plot_latency_windows": plot_latency_windows}[func](*real_args)
+    finally:
+        real_args = None
+        for shm in attached:
+            shm.close()
+    return time.time() - start
+
+
+# numpy array copied once to shared memory and mapped by the plotting
+# processes without pickling the data
+class SharedArray:
+    def __init__(self, array):
+        array = np.ascontiguousarray(array)
+        self.shape = array.shape
+        self.dtype = array.dtype.str
+        self.shm = shared_memory.SharedMemory(create=True,
+                                              size=max(array.nbytes, 1))
+        self.name = self.shm.name
+        np.ndarray(self.shape, self.dtype, buffer=self.shm.buf)[:] = array
+
+    def __getstate__(self):
+        return {"shape": self.shape, "dtype": self.dtype, "name": self.name}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.shm = None
+
+    # the plotting processes share the resource tracker of the creating
+    # process, which unlinks the segment in release()
+    def attach(self):
+        shm = shared_memory.SharedMemory(name=self.name)
+        return shm, np.ndarray(self.shape, self.dtype, buffer=shm.buf)
+
+    def release(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+# calculates all external host statistics with numpy in a few vectorized
+# passes; returns the results dict and the per packet series for the graphs
+# (series is None if the timestamp lists are not usable)
+def calculate_statistics(timestamp1_list, timestamp2_list, packet_sizes,
+                         multicast, histogram_bins=None, histogram_scale=None,
+                         throughput_window=None, iat_gap=None):
+    timestamp1 = np.asarray(timestamp1_list, dtype=np.int64)
+    timestamp2 = np.asarray(timestamp2_list, dtype=np.int64)
+    packet_sizes = np.asarray(packet_sizes, dtype=np.int64)
+
+    # python ints to keep the divisions below identical to the pure
+    # python implementation and to keep the results json serializable
+    results = empty_results(int(packet_sizes.sum()))
+
+    num = len(timestamp1)
+    if num == 0 or len(timestamp2) == 0 or timestamp1[0] <= 0 \
+            or num != len(timestamp2):
+        return results, None
+
+    latency = timestamp2 - timestamp1
+    # sets the start time to 0
+    time_diff = timestamp2 - timestamp2[0]
+    count_list_sec = time_diff / 1000000000
+
+    min_latency = int(latency.min())
+    max_latency = int(latency.max())
+    pdv = latency - min_latency
+    # first packet has no predecessor => ipdv 0
+    ipdv = np.empty_like(latency)
+    ipdv[0] = 0
+    np.subtract(latency[1:], latency[:-1], out=ipdv[1:])
+
+    ave_latency = round(int(latency.sum()) / num, 2)
+    # standard deviation of latency, equal values count to positive
+    sqr_dev = latency - ave_latency
+    np.multiply(sqr_dev, sqr_dev, out=sqr_dev)
+    pos = latency >= ave_latency
+    pos_counter = int(np.count_nonzero(pos))
+    neg_counter = num - pos_counter
+    total_sqr_dev = float(sqr_dev.sum())
+    pos_sqr_dev = float(sqr_dev.sum(where=pos))
+    neg_sqr_dev = total_sqr_dev - pos_sqr_dev
+    del sqr_dev, pos
+
+    latency_variance = total_sqr_dev / num
+    results.update({
+        "num_processed_packets": num,
+        "min_latency": min_latency, "max_latency": max_latency,
+        "avg_latency": ave_latency,
+        "min_ipdv": int(ipdv.min()), "max_ipdv": int(ipdv.max()),
+        "avg_ipdv": round(int(ipdv.sum()) / num),
+        "avg_abs_ipdv": round(int(np.abs(ipdv).sum()) / num),
+        "min_pdv": int(pdv.min()), "max_pdv": int(pdv.max()),
+        "avg_pdv": round(int(pdv.sum()) / num),
+        "latency_std_deviation": latency_variance ** 0.5,
+        "pos_latency_std_deviation":
+            (pos_sqr_dev / pos_counter) ** 0.5 if pos_counter > 0 else 0,
+        "neg_latency_std_deviation":
+            (neg_sqr_dev / neg_counter) ** 0.5 if neg_counter > 0 else 0,
+        "latency_variance": latency_variance,
+        "latency_histogram": latency_histogram(
+            latency, min_latency, max_latency, histogram_bins,
+            histogram_scale),
+        "latency_percentiles": latency_percentiles(latency),
+        "packet_order": packet_order(timestamp1),
+        "inter_arrival_times": inter_arrival_times(timestamp1, timestamp2,
+                                                   histogram_bins, iat_gap)})
+
+    if throughput_window is None:
+        throughput_window = THROUGHPUT_WINDOW
+    byte_counts, packet_counts = window_counts(
+        timestamp2, packet_sizes, int(timestamp2[0]), throughput_window)
+    mbit_list, packet_list = throughput_series(byte_counts, packet_counts,
+                                               throughput_window)
+    series = packet_rate_results(results, mbit_list, packet_list, multicast,
+                                 packet_counts, throughput_window)
+    series.update({"latency": latency, "count": np.arange(num),
+                   "count_sec": count_list_sec, "ipdv": ipdv, "pdv": pdv,
+                   "latency_windows": latency_windows(
+                       timestamp2, latency, int(timestamp2[0]),
+                       throughput_window)})
+    return results, series
+
+
+# inter-arrival times at ingress (timestamp1, burstiness of the generator)
+# and at egress (timestamp2, shaping of the DUT), see InterArrivalTimes
+def inter_arrival_times(timestamp1, timestamp2, histogram_bins=None,
+                        iat_gap=None):
+    results = {}
+    for name, timestamps in [("ingress", timestamp1), ("egress", timestamp2)]:
+        iat = InterArrivalTimes(histogram_bins, iat_gap)
+        iat.update(timestamps)
+        results[name] = iat.results()
+    return results
+
+
+# distribution of the times between consecutive packets of one timestamp,
+# updated chunk by chunk: the packets are sorted by the timestamp (only
+# within a chunk, a packet reordered across a chunk border counts with 0 ns)
+# and every inter-arrival time value is counted, so histogram, coefficient of
+# variation and percentiles are exact; packets following each other within
+# less than the gap threshold form a burst
+class InterArrivalTimes:
+    def __init__(self, histogram_bins=None, gap_threshold=None):
+        self.histogram_bins = histogram_bins
+        if gap_threshold is None:
+            gap_threshold = IAT_GAP_THRESHOLD
+        self.gap_threshold = int(gap_threshold)
+        self.last = None
+        self.values = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        # inter-arrival times not counted yet, counted together once there
+        # are STREAM_CHUNK_SIZE of them (small chunks of live analytics)
+        self.pending = []
+        self.pending_len = 0
+        self.bursts = 0
+        self.burst_packets = 0
+        self.max_burst = 0
+        # inter-arrival times below the gap threshold at the end of the
+        # chunks so far, the burst continues in the next chunk
+        self.open_burst = 0
+
+    def update(self, timestamps):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if len(timestamps) == 0:
+            return
+        if self.last is None:
+            iat = np.diff(timestamps)
+        else:
+            iat = np.diff(timestamps, prepend=self.last)
+        if np.any(iat < 0):
+            timestamps = np.sort(timestamps)
+            if self.last is None:
+                iat = np.diff(timestamps)
+            else:
+                iat = np.diff(timestamps, prepend=self.last)
+                iat[0] = max(iat[0], 0)
+        self.last = int(timestamps[-1])
+        if len(iat) == 0:
+            return
+        self.pending.append(iat)
+        self.pending_len += len(iat)
+        if self.pending_len >= STREAM_CHUNK_SIZE:
+            self.count_pending()
+
+        # runs of inter-arrival times below the gap threshold
+        edges = np.diff(np.concatenate((
+            [0], (iat < self.gap_threshold).view(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        lengths = ends - starts
+        if self.open_burst > 0:
+            if len(starts) > 0 and starts[0] == 0:
+                lengths[0] += self.open_burst
+            else:
+                self.add_bursts([self.open_burst])
+        self.open_burst = 0
+        if len(ends) > 0 and ends[-1] == len(iat):
+            self.open_burst = int(lengths[-1])
+            lengths = lengths[:-1]
+        self.add_bursts(lengths)
+
+    # counts of the common small values with bincount, sorting only the rest
+    # (e.g. pauses)
+    def count_pending(self):
+        if self.pending_len == 0:
+            return
+        iat = np.concatenate(self.pending)
+        self.pending = []
+        self.pending_len = 0
+        small = iat < IAT_DENSE_LIMIT
+        dense = np.bincount(iat[small])
+        values = np.flatnonzero(dense)
+        rest_values, rest_counts = np.unique(iat[~small], return_counts=True)
+        self.values, self.counts = merge_value_counts(
+            self.values, self.counts,
+            np.concatenate((values, rest_values)),
+            np.concatenate((dense[values], rest_counts)))
+
+    # bursts of lengths + 1 packets (lengths = inter-arrival times each)
+    def add_bursts(self, lengths):
+        lengths = np.asarray(lengths, dtype=np.int64)
+        if len(lengths) > 0:
+            self.bursts += len(lengths)
+            self.burst_packets += int(lengths.sum()) + len(lengths)
+            self.max_burst = max(self.max_burst, int(lengths.max()) + 1)
+
+    def results(self):
+        self.count_pending()
+        num = int(self.counts.sum())
+        if num == 0:
+            return {}
+        bursts = self.bursts
+        burst_packets = self.burst_packets
+        max_burst = self.max_burst
+        if self.open_burst > 0:
+            bursts += 1
+            burst_packets += self.open_burst + 1
+            max_burst = max(max_burst, self.open_burst + 1)
+        values = self.values.astype(np.float64)
+        avg = float(np.dot(values, self.counts)) / num
+        variance = float(np.dot((values - avg) ** 2, self.counts)) / num
+        min_iat = int(self.values[0])
+        max_iat = int(self.values[-1])
+        histogram = new_histogram(min_iat, max_iat, self.histogram_bins,
+                                  IAT_HISTOGRAM_SCALE, unit_from_counters(
+                                      int(self.counts[self.values >= 1000]
+                                          .sum()),
+                                      int(self.counts[self.values >= 1000000]
+                                          .sum()), num))
+        add_to_histogram(histogram, self.values, self.counts)
+        return {"num_inter_arrival_times": num,
+                "min": min_iat, "max": max_iat, "avg": round(avg, 2),
+                "std_deviation": variance ** 0.5,
+                # coefficient of variation, 1 for poisson traffic and 0 for
+                # a constant rate
+                "cov": variance ** 0.5 / avg if avg > 0 else 0,
+                "percentiles": value_count_percentiles(self.values,
+                                                       self.counts),
+                "histogram": histogram,
+                "gap_threshold": self.gap_threshold,
+                "bursts": bursts, "burst_packets": burst_packets,
+                "max_burst_packets": max_burst,
+                "avg_burst_packets":
+                    round(burst_packets / bursts, 2) if bursts > 0 else 0}
+
+
+# min, WINDOW_PERCENTILES, max and mean of the latencies per window of
+# timestamp2 (same windows as the throughput graphs, windows without packets
+# are left out); the latencies are sorted once by window and latency (packed
+# in one int64 key if possible) and grouped with reduceat
+def latency_windows(timestamp2, latency, origin, window, percentiles=None):
+    if percentiles is None:
+        percentiles = WINDOW_PERCENTILES
+    index = np.maximum(np.asarray(timestamp2) - origin, 0) // window
+    latency = np.asarray(latency, dtype=np.int64)
+    windows = {"window": int(window), "unit": "nanoseconds", "time": [],
+               "packets": [], "min": [], "max": [], "mean": []}
+    for percentile in percentiles:
+        windows[percentile_name(percentile)] = []
+    if len(latency) == 0:
+        return windows
+    min_latency = int(latency.min())
+    span = int(latency.max()) - min_latency + 1
+    if (int(index.max()) + 1) * span < 2**62:
+        key = index * span
+        key += latency
+        key -= min_latency
+        key.sort()
+        index, values = np.divmod(key, span)
+        values += min_latency
+        del key
+    else:
+        order = np.lexsort((latency, index))
+        index, values = index[order], latency[order]
+        del order
+    starts = np.flatnonzero(np.diff(index, prepend=-1))
+    counts = np.diff(np.append(starts, len(values)))
+    windows.update({
+        "time": (index[starts] * window / 1e9).tolist(),
+        "packets": counts.tolist(),
+        "min": values[starts].tolist(),
+        "max": values[starts + counts - 1].tolist(),
+        "mean": np.round(np.add.reduceat(values, starts) / counts,
+                         2).tolist()})
+    for percentile in percentiles:
+        # linear interpolation between the closest ranks like np.percentile
+        pos = starts + percentile / 100 * (counts - 1)
+        lower = np.floor(pos).astype(np.int64)
+        upper = np.ceil(pos).astype(np.int64)
+        windows[percentile_name(percentile)] = np.round(
+            values[lower] + (values[upper] - values[lower]) * (pos - lower),
+            2).tolist()
+    return windows
+
+
+# reordering (RFC 4737), duplicates and loss bursts from the ingress
+# timestamps (timestamp1) in the order the packets arrived at the external
+# host, O(n log n) with numpy
+def packet_order(timestamp1):
+    timestamp1 = np.asarray(timestamp1, dtype=np.int64)
+    num = len(timestamp1)
+    # highest ingress timestamp received so far, a packet is reordered if it
+    # was sent before it
+    prefix_max = np.maximum.accumulate(timestamp1)
+    reordered = np.flatnonzero(timestamp1[1:] < prefix_max[:-1]) + 1
+    # reorder extent: distance to the first packet which arrived before
+    # although it was sent later, prefix_max is sorted
+    extent = reordered - np.searchsorted(prefix_max, timestamp1[reordered],
+                                         side="right")
+    sorted_ts1 = np.sort(timestamp1)
+    gaps = np.diff(sorted_ts1)
+    duplicates = int(np.count_nonzero(gaps == 0))
+    gaps = gaps[gaps > 0]
+    # loss bursts: gaps much longer than the usual packet spacing, the lost
+    # packets are estimated assuming a constant packet rate
+    median_gap = float(np.median(gaps)) if len(gaps) > 0 else 0.0
+    lost = np.zeros(0, dtype=np.int64)
+    if median_gap > 0:
+        bursts = gaps[gaps > LOSS_GAP_FACTOR * median_gap]
+        lost = np.rint(bursts / median_gap).astype(np.int64) - 1
+    return {"reordered_packets": len(reordered),
+            "reordered_percent": round(len(reordered) / num * 100, 4)
+            if num > 0 else 0,
+            "max_reorder_extent": int(extent.max()) if len(extent) > 0 else 0,
+            "avg_reorder_extent": round(float(extent.mean()), 2)
+            if len(extent) > 0 else 0,
+            "duplicate_packets": duplicates,
+            "loss_bursts": len(lost),
+            "max_loss_burst": int(lost.max()) if len(lost) > 0 else 0,
+            "estimated_lost_packets": int(lost.sum())}
+
+
+# results dict of a run without (valid) timestamps
+def empty_results(total_throughput):
+    return {"num_processed_packets": 0,
+            "total_throughput": round(total_throughput/1000000, 2),
+            "min_latency": 0, "max_latency": 0, "avg_latency": 0,
+            "min_ipdv": 0, "max_ipdv": 0, "avg_ipdv": 0,
+            "avg_abs_ipdv": 0, "min_pdv": 0, "max_pdv": 0, "avg_pdv": 0,
+            "min_packets_per_second": 0, "max_packets_per_second": 0,
+            "avg_packets_per_second": 0,
+            "latency_std_deviation": 0, "pos_latency_std_deviation": 0,
+            "neg_latency_std_deviation": 0, "latency_variance": 0}
+
+
+# stores the packet rate statistics in results and returns the
+# speed and packet rate series for the graphs; packet_counts of all windows
+# including the last one give the average of runs without a complete window
+def packet_rate_results(results, mbit_list, packet_list, multicast,
+                        packet_counts, throughput_window):
+    # round by 9 digits after , float could result in weird fractions
+    upsc_mbit_list = [round(x*int(multicast), 9) for x in mbit_list]
+    upsc_packet_list = [x*int(multicast) for x in packet_list]
+    # ignores the first and last second to prevent min = 0
+    results["min_packets_per_second"] = min(packet_list[1:-1], default=0)
+    results["max_packets_per_second"] = max(packet_list, default=0)
+    if len(packet_list) != 2:
+        # packets of the complete windows, without the 0 at start and end
+        results["avg_packets_per_second"] = round(
+            sum(packet_list[1:-1]) / (len(packet_list)-2), 2)
+    elif len(packet_counts) > 0:
+        # all packets over the duration of the started windows
+        results["avg_packets_per_second"] = round(
+            int(np.sum(packet_counts)) * 1e9 /
+            (len(packet_counts) * throughput_window), 2)
+    return {"mbit": mbit_list, "packet": packet_list,
+            "upsc_mbit": upsc_mbit_list, "upsc_packet": upsc_packet_list}
+
+
+# bytes and packets per throughput window, the windows start at origin
+# (timestamp2 of the first packet), empty windows (pauses) count 0
+def window_counts(timestamp2, packet_sizes, origin, throughput_window):
+    if not MIN_THROUGHPUT_WINDOW <= throughput_window <= \
+            MAX_THROUGHPUT_WINDOW:
+        raise ValueError("throughput window must be between " +
+                         str(MIN_THROUGHPUT_WINDOW) + " and " +
+                         str(MAX_THROUGHPUT_WINDOW) + " ns")
+    # packets timestamped before the first one count to the first window
+    index = np.maximum(np.asarray(timestamp2) - origin, 0) // throughput_window
+    num = int(index.max()) + 1 if len(index) > 0 else 0
+    # float64 weights are exact below 2^53 bytes
+    byte_counts = np.bincount(index, weights=packet_sizes, minlength=num)
+    return byte_counts.astype(np.int64), np.bincount(index, minlength=num)
+
+
+# adds window counts of another chunk, both arrays start at the origin
+def add_window_counts(counts, chunk_counts):
+    if len(chunk_counts) > len(counts):
+        counts, chunk_counts = chunk_counts.copy(), counts
+    counts[:len(chunk_counts)] += chunk_counts
+    return counts
+
+
+# speed (Mbit/s) and packet rate (packets/s) lists of the complete windows,
+# the last window is still running when the capture stops and is left out
+def throughput_series(byte_counts, packet_counts, throughput_window):
+    byte_counts = byte_counts[:-1]
+    packet_counts = packet_counts[:-1]
+    # bits per microsecond = megabit per second
+    mbit_list = (byte_counts * 8 / (throughput_window / 1000)).tolist()
+    if 1000000000 % throughput_window == 0:
+        packet_list = (packet_counts *
+                       (1000000000 // throughput_window)).tolist()
+    else:
+        packet_list = (packet_counts * 1e9 / throughput_window).tolist()
+    # 0 at start and end of the graphs
+    return [0] + mbit_list + [0], [0] + packet_list + [0]
+
+
+# running aggregates over chunks of a run for analytics in bounded memory,
+# update() is the first pass over all chunks, update_deviation() the second
+# one, which needs the average latency to split the standard deviation;
+# exact_values: counts every latency value instead, so the deviation and the
+# histogram are calculated from the counts without a second pass
+class RunningStatistics:
+    def __init__(self, multicast, histogram_bins=None, histogram_scale=None,
+                 throughput_window=None, exact_values=False, iat_gap=None):
+        self.multicast = multicast
+        self.valid = True
+        self.num = 0
+        self.total_throughput = 0
+        self.latency_sum = 0
+        self.min_latency = None
+        self.max_latency = None
+        # Welford / Chan et al. running mean and sum of squared deviations
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.last_latency = None
+        self.ipdv_sum = 0
+        self.abs_ipdv_sum = 0
+        self.min_ipdv = 0  # first packet has ipdv 0
+        self.max_ipdv = 0
+        self.first_timestamp2 = None
+        if throughput_window is None:
+            throughput_window = THROUGHPUT_WINDOW
+        self.throughput_window = throughput_window
+        self.byte_counts = np.zeros(0, dtype=np.int64)
+        self.packet_counts = np.zeros(0, dtype=np.int64)
+        self.pos_counter = 0
+        self.pos_sqr_dev = 0.0
+        # unit of the latencies like find_unit, decided after the first pass
+        self.microsec_counter = 0
+        self.millisec_counter = 0
+        self.histogram_bins = histogram_bins
+        self.histogram_scale = histogram_scale
+        self.histogram = None
+        self.sketch = LatencySketch()
+        self.ingress_iat = InterArrivalTimes(histogram_bins, iat_gap)
+        self.egress_iat = InterArrivalTimes(histogram_bins, iat_gap)
+        self.latency_values = None
+        self.latency_value_counts = None
+        if exact_values:
+            self.latency_values = np.zeros(0, dtype=np.int64)
+            self.latency_value_counts = np.zeros(0, dtype=np.int64)
+
+    def update(self, timestamp1, timestamp2, packet_sizes):
+        timestamp1 = np.asarray(timestamp1, dtype=np.int64)
+        timestamp2 = np.asarray(timestamp2, dtype=np.int64)
+        packet_sizes = np.asarray(packet_sizes, dtype=np.int64)
+        self.total_throughput += int(packet_sizes.sum())
+        if len(timestamp1) != len(timestamp2) or \
+                len(packet_sizes) != len(timestamp1):
+            self.valid = False
+        if not self.valid or len(timestamp1) == 0:
+            return
+        if self.first_timestamp2 is None:
+            if timestamp1[0] <= 0:
+                self.valid = False
+                return
+            self.first_timestamp2 = int(timestamp2[0])
+
+        latency = timestamp2 - timestamp1
+        num = len(latency)
+        self.latency_sum += int(latency.sum())
+        chunk_min = int(latency.min())
+        chunk_max = int(latency.max())
+        if self.min_latency is None:
+            self.min_latency, self.max_latency = chunk_min, chunk_max
+        else:
+            self.min_latency = min(self.min_latency, chunk_min)
+            self.max_latency = max(self.max_latency, chunk_max)
+
+        chunk_mean = float(latency.mean())
+        chunk_m2 = float(np.square(latency - chunk_mean).sum())
+        delta = chunk_mean - self.mean
+        total = self.num + num
+        self.mean += delta * num / total
+        self.m2 += chunk_m2 + delta * delta * self.num * num / total
+        abs_latency = np.abs(latency)
+        self.microsec_counter += int(np.count_nonzero(abs_latency >= 1000))
+        self.millisec_counter += int(np.count_nonzero(abs_latency >= 1000000))
+        del abs_latency
+        self.sketch.add(latency)
+        if self.latency_values is not None:
+            values, counts = np.unique(latency, return_counts=True)
+            self.latency_values, self.latency_value_counts = \
+                merge_value_counts(self.latency_values,
+                                   self.latency_value_counts, values, counts)
+
+        # ipdv across the chunk border uses the last latency of the chunk before
+        if self.last_latency is None:
+            ipdv = np.diff(latency)
+        else:
+            ipdv = np.diff(latency, prepend=self.last_latency)
+        if len(ipdv) > 0:
+            self.ipdv_sum += int(ipdv.sum())
+            self.abs_ipdv_sum += int(np.abs(ipdv).sum())
+            self.min_ipdv = min(self.min_ipdv, int(ipdv.min()))
+            self.max_ipdv = max(self.max_ipdv, int(ipdv.max()))
+        self.last_latency = int(latency[-1])
+        self.num = total
+        self.ingress_iat.update(timestamp1)
+        self.egress_iat.update(timestamp2)
+
+        byte_counts, packet_counts = window_counts(
+            timestamp2, packet_sizes, self.first_timestamp2,
+            self.throughput_window)
+        self.byte_counts = add_window_counts(self.byte_counts, byte_counts)
+        self.packet_counts = add_window_counts(self.packet_counts,
+                                               packet_counts)
+
+    def average_latency(self):
+        return round(self.latency_sum / self.num, 2) if self.num > 0 else 0
+
+    def update_deviation(self, timestamp1, timestamp2):
+        if not self.valid or self.num == 0:
+            return
+        ave_latency = self.average_latency()
+        latency = np.asarray(timestamp2, dtype=np.int64) - \
+            np.asarray(timestamp1, dtype=np.int64)
+        pos = latency[latency >= ave_latency] - ave_latency
+        self.pos_counter += len(pos)
+        self.pos_sqr_dev += float(np.dot(pos, pos))
+        if self.histogram is None:
+            unit = unit_from_counters(self.microsec_counter,
+                                      self.millisec_counter, self.num)
+            self.histogram = new_histogram(
+                self.min_latency, self.max_latency, self.histogram_bins,
+                self.histogram_scale, unit)
+        add_to_histogram(self.histogram, latency)
+
+    # update_deviation() over the counted latency values (exact_values),
+    # can be called again after further updates
+    def update_deviation_from_values(self):
+        if not self.valid or self.num == 0:
+            return
+        ave_latency = self.average_latency()
+        pos = self.latency_values >= ave_latency
+        pos_counts = self.latency_value_counts[pos]
+        deviation = self.latency_values[pos] - ave_latency
+        self.pos_counter = int(pos_counts.sum())
+        self.pos_sqr_dev = float(np.dot(deviation * deviation, pos_counts))
+        unit = unit_from_counters(self.microsec_counter,
+                                  self.millisec_counter, self.num)
+        self.histogram = new_histogram(
+            self.min_latency, self.max_latency, self.histogram_bins,
+            self.histogram_scale, unit)
+        add_to_histogram(self.histogram, self.latency_values,
+                         self.latency_value_counts)
+
+    # returns results dict and the series for the speed and packet rate graphs
+    def results(self):
+        results = empty_results(self.total_throughput)
+        if not self.valid or self.num == 0:
+            return results, None
+        num = self.num
+        ave_latency = self.average_latency()
+        # sum of squared deviations from the rounded average latency
+        total_sqr_dev = self.m2 + num * (self.mean - ave_latency) ** 2
+        neg_counter = num - self.pos_counter
+        neg_sqr_dev = max(total_sqr_dev - self.pos_sqr_dev, 0.0)
+        latency_variance = total_sqr_dev / num
+        results.update({
+            "num_processed_packets": num,
+            "min_latency": self.min_latency, "max_latency": self.max_latency,
+            "avg_latency": ave_latency,
+            "min_ipdv": self.min_ipdv, "max_ipdv": self.max_ipdv,
+            "avg_ipdv": round(self.ipdv_sum / num),
+            "avg_abs_ipdv": round(self.abs_ipdv_sum / num),
+            "min_pdv": 0, "max_pdv": self.max_latency - self.min_latency,
+            "avg_pdv": round((self.latency_sum - num * self.min_latency) / num),
+            "latency_std_deviation": latency_variance ** 0.5,
+            "pos_latency_std_deviation":
+                (self.pos_sqr_dev / self.pos_counter) ** 0.5
+                if self.pos_counter > 0 else 0,
+            "neg_latency_std_deviation":
+                (neg_sqr_dev / neg_counter) ** 0.5 if neg_counter > 0 else 0,
+            "latency_variance": latency_variance,
+            "latency_histogram": self.histogram,
+            "latency_percentiles": self.sketch.percentiles(
+                self.min_latency, self.max_latency),
+            "inter_arrival_times": {"ingress": self.ingress_iat.results(),
+                                    "egress": self.egress_iat.results()}})
+        mbit_list, packet_list = throughput_series(
+            self.byte_counts, self.packet_counts, self.throughput_window)
+        series = packet_rate_results(results, mbit_list, packet_list,
+                                     self.multicast, self.packet_counts,
+                                     self.throughput_window)
+        series["latency_sketch"] = self.sketch
+        return results, series
+
+
+# merges two sets of sorted unique values with their counts
+def merge_value_counts(values, counts, other_values, other_counts):
+    values, index = np.unique(np.concatenate((values, other_values)),
+                              return_inverse=True)
+    # float64 weights are exact below 2^53 packets
+    counts = np.bincount(index, weights=np.concatenate((counts, other_counts)),
+                         minlength=len(values))
+    return values, counts.astype(np.int64)
+
+
+# calculates the statistics of a run chunk by chunk in bounded memory,
+# reads the timestamp files twice
+def calculate_statistics_streaming(logger, results_path, file_id, multicast,
+                                   chunk_size=None, histogram_bins=None,
+                                   histogram_scale=None,
+                                   throughput_window=None, iat_gap=None):
+    if chunk_size is None:
+        chunk_size = STREAM_CHUNK_SIZE
+    stats = RunningStatistics(multicast, histogram_bins, histogram_scale,
+                              throughput_window, iat_gap=iat_gap)
+    for ts1, ts2, sizes in itertools.zip_longest(
+            iter_timestamp_chunks(logger, results_path, "timestamp1_list",
+                                  file_id, chunk_size),
+            iter_timestamp_chunks(logger, results_path, "timestamp2_list",
+                                  file_id, chunk_size),
+            iter_chunks(logger, results_path, "packet_sizes", file_id,
+                        chunk_size)):
+        if ts1 is None or ts2 is None or sizes is None:
+            stats.valid = False
+            if sizes is not None:
+                stats.total_throughput += int(sizes.sum())
+            continue
+        stats.update(ts1, ts2, sizes)
+    if stats.valid:
+        for ts1, ts2 in zip(
+                iter_timestamp_chunks(logger, results_path, "timestamp1_list",
+                                      file_id, chunk_size),
+                iter_timestamp_chunks(logger, results_path, "timestamp2_list",
+                                      file_id, chunk_size)):
+            stats.update_deviation(ts1, ts2)
+    return stats.results()
+
+
+# folds the chunk snapshots a receiver writes while capturing into running
+# statistics, so the results are ready right after the capture stops;
+# chunk_<id>_<n>.csv (n = 0, 1, ...) holds "timestamp1,timestamp2,packet size"
+# lines or chunk_<id>_<n>.bin the binary chunk of a receiver in spill mode
+# (see read_chunk), chunks_<id>.json the number of chunks and
+# packets of the complete capture (written by the receiver when it stops)
+class LiveAnalytics:
+    def __init__(self, file_id, multicast, results_path, histogram_bins=None,
+                 histogram_scale=None, throughput_window=None):
+        self.file_id = str(file_id)
+        self.multicast = multicast
+        self.results_path = results_path
+        self.chunk_path = os.path.join(results_path, LIVE_CHUNK_DIR)
+        self.histogram_bins = histogram_bins
+        self.histogram_scale = histogram_scale
+        self.throughput_window = throughput_window
+        self.stats = RunningStatistics(multicast, histogram_bins,
+                                       histogram_scale, throughput_window,
+                                       exact_values=True)
+        self.num_chunks = 0
+        self.num_packets = 0
+        multi, tsmax = read_timestamp_format(results_path, file_id)
+        self.unwrap_timestamp1 = TimestampUnwrapper(multi, tsmax)
+        self.unwrap_timestamp2 = TimestampUnwrapper(multi, tsmax)
+
+    def chunk_file(self, number, ending=".csv"):
+        return os.path.join(self.chunk_path, "chunk_" + self.file_id + "_" +
+                            str(number) + ending)
+
+    # folds the new chunks in order up to the first missing one,
+    # returns the number of folded chunks
+    def fold(self, logger):
+        folded = 0
+        while True:
+            path = self.chunk_file(self.num_chunks, ".bin")
+            if not os.path.isfile(path):
+                path = self.chunk_file(self.num_chunks)
+                if not os.path.isfile(path):
+                    break
+            try:
+                if path.endswith(".bin"):
+                    timestamp1, timestamp2, packet_sizes = read_chunk(path)[0]
+                else:
+                    chunk = np.loadtxt(path, delimiter=",", dtype=np.int64,
+                                       ndmin=2)
+                    timestamp1, timestamp2, packet_sizes = chunk.T
+                self.stats.update(self.unwrap_timestamp1.unwrap(timestamp1),
+                                  self.unwrap_timestamp2.unwrap(timestamp2),
+                                  packet_sizes)
+                self.num_packets += len(timestamp1)
+            except (ValueError, IndexError) as e:
+                logger.error("invalid chunk " + str(self.num_chunks) +
+                             " of run " + self.file_id + ": " + str(e))
+                self.stats.valid = False
+            self.num_chunks += 1
+            folded += 1
+        return folded
+
+    # results dict and series of the chunks folded so far
+    def results(self):
+        self.stats.update_deviation_from_values()
+        return self.stats.results()
+
+    # True if all chunks of the stopped capture are folded
+    def complete(self):
+        try:
+            with open(os.path.join(self.chunk_path, "chunks_" + self.file_id +
+                                   ".json"), "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return self.stats.valid and \
+            manifest.get("chunks") == self.num_chunks and \
+            manifest.get("packets") == self.num_packets
+
+    # folds the new chunks and refreshes generated/live_results.json and the
+    # partial throughput, packet rate and histogram graphs
+    # returns the partial results or None if there was no new chunk
+    def refresh(self, logger, plot_workers=None):
+        if self.fold(logger) == 0:
+            return None
+        results, series = self.results()
+        results["num_chunks"] = self.num_chunks
+        path = project_path + "/results/" + self.file_id + "/generated"
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, LIVE_RESULTS_FILE), "w") as f:
+            json.dump(results, f, indent=4)
+        if series is not None:
+            plot_results(series, results, self.multicast, self.file_id,
+                         logger, plot_workers, None, self.throughput_window)
+        return results
+
+    # stores the final results like main() once the receiver files are
+    # copied to the results folder; returns None if main() has to analyze the
+    # run: chunks missing or a run below STREAMING_THRESHOLD which gets the
+    # per packet graphs (streaming as in main)
+    def finish(self, logger, streaming=None, plot_workers=None):
+        self.fold(logger)
+        if not self.complete():
+            logger.info("Chunks of run " + self.file_id + " incomplete.")
+            return None
+        if streaming is None:
+            streaming = estimate_packet_count(
+                self.results_path, self.file_id) > STREAMING_THRESHOLD
+        if not streaming:
+            return None
+        raw_packet_counter = int(read_csv(logger, self.results_path,
+                                          "raw_packet_counter",
+                                          self.file_id)[0])
+        results, series = self.results()
+        results = {"num_raw_packets": raw_packet_counter, **results}
+        if series is not None:
+            plot_results(series, results, self.multicast, self.file_id,
+                         logger, plot_workers, None, self.throughput_window)
+        results["analytics_cache"] = results_cache_key(
+            self.results_path, self.file_id, self.multicast,
+            self.histogram_bins, self.histogram_scale, self.throughput_window)
+        save_results(self.file_id, results, np.zeros(0, dtype=np.int64))
+        return results
+
+
+# name of a percentile in the results json, e.g. 99.9 => "p99.9"
+def percentile_name(percentile):
+    return "p" + "%g" % percentile
+
+
+# exact percentiles of the latencies (linear interpolation between the
+# closest ranks like np.percentile), only partially sorts the latencies
+def latency_percentiles(latency, percentiles=None):
+    if percentiles is None:
+        percentiles = PERCENTILES
+    latency = np.asarray(latency)
+    if len(latency) == 0:
+        return {}
+    positions = [p / 100 * (len(latency) - 1) for p in percentiles]
+    kth = sorted({int(np.floor(pos)) for pos in positions} |
+                 {int(np.ceil(pos)) for pos in positions})
+    partitioned = np.partition(latency, kth)
+    results = {}
+    for percentile, pos in zip(percentiles, positions):
+        lower = int(partitioned[int(np.floor(pos))])
+        upper = int(partitioned[int(np.ceil(pos))])
+        results[percentile_name(percentile)] = round(
+            lower + (upper - lower) * float(pos - np.floor(pos)), 2)
+    return results
+
+
+# percentiles like latency_percentiles of sorted values counted counts times
+def value_count_percentiles(values, counts, percentiles=None):
+    if percentiles is None:
+        percentiles = PERCENTILES
+    cumulative = np.cumsum(counts)
+    if len(cumulative) == 0 or cumulative[-1] == 0:
+        return {}
+    results = {}
+    for percentile in percentiles:
+        pos = percentile / 100 * (int(cumulative[-1]) - 1)
+        lower, upper = values[np.searchsorted(
+            cumulative, [np.floor(pos), np.ceil(pos)], side="right")]
+        results[percentile_name(percentile)] = round(
+            int(lower) + (int(upper) - int(lower)) * float(pos - np.floor(pos)),
+            2)
     return results
 
 
+# DDSketch (Masson et al., VLDB 2019) of the latencies for the percentiles in
+# streaming mode: counts per logarithmic bucket, every percentile is
+# estimated with the relative accuracy, sketches of chunks can be merged
+class LatencySketch:
+    def __init__(self, relative_accuracy=PERCENTILE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.num = 0
+        self.zero_count = 0
+        # (first bucket key, numpy array of counts) of the positive and
+        # the absolute negative values, None if empty
+        self.positive = None
+        self.negative = None
+
+    def add(self, values):
+        values = np.asarray(values)
+        self.num += len(values)
+        self.zero_count += int(np.count_nonzero(values == 0))
+        self.positive = merge_stores(
+            self.positive, self.new_store(values[values > 0]))
+        self.negative = merge_stores(
+            self.negative, self.new_store(-values[values < 0]))
+
+    def merge(self, other):
+        self.num += other.num
+        self.zero_count += other.zero_count
+        self.positive = merge_stores(self.positive, other.positive)
+        self.negative = merge_stores(self.negative, other.negative)
+
+    def new_store(self, values):
+        if len(values) == 0:
+            return None
+        keys = np.ceil(np.log(values) / self.log_gamma).astype(np.int64)
+        first = int(keys.min())
+        return first, np.bincount(keys - first)
+
+    # value represented by the bucket keys, relative error to all values in
+    # the bucket at most relative_accuracy
+    def bucket_values(self, store):
+        if store is None:
+            return np.zeros(0), np.zeros(0, dtype=np.int64)
+        keys = np.arange(store[0], store[0] + len(store[1]))
+        return 2 * self.gamma ** keys / (self.gamma + 1), store[1]
+
+    # ascending bucket values and their counts
+    def distribution(self):
+        neg_values, neg_counts = self.bucket_values(self.negative)
+        pos_values, pos_counts = self.bucket_values(self.positive)
+        values = np.concatenate((-neg_values[::-1], [0], pos_values))
+        counts = np.concatenate((neg_counts[::-1], [self.zero_count],
+                                 pos_counts))
+        return values, counts
+
+    # percentiles like latency_percentiles, clipped to the exact min and max
+    def percentiles(self, min_value, max_value, percentiles=None):
+        if percentiles is None:
+            percentiles = PERCENTILES
+        if self.num == 0:
+            return {}
+        values, counts = self.distribution()
+        ranks = [p / 100 * (self.num - 1) for p in percentiles]
+        index = np.searchsorted(np.cumsum(counts), ranks, side="right")
+        estimates = np.clip(values[index], min_value, max_value)
+        return {percentile_name(p): round(float(v), 2)
+                for p, v in zip(percentiles, estimates)}
+
+
+# two sample Kolmogorov-Smirnov test of the latency distributions of two
+# runs on their sketches (same relative accuracy), returns the statistic D
+# (max. distance of the CDFs) and the asymptotic p-value that both runs have
+# the same latency distribution
+def ks_test(sketch, other):
+    if sketch.num == 0 or other.num == 0:
+        return 0.0, 1.0
+    values, counts = sketch.distribution()
+    other_values, other_counts = other.distribution()
+    points = np.union1d(values, other_values)
+    cdfs = []
+    for run_values, run_counts, num in [(values, counts, sketch.num),
+                                        (other_values, other_counts,
+                                         other.num)]:
+        cdf = np.concatenate(([0], np.cumsum(run_counts))) / num
+        cdfs.append(cdf[np.searchsorted(run_values, points, side="right")])
+    statistic = float(np.max(np.abs(cdfs[0] - cdfs[1])))
+    # Kolmogorov distribution, Numerical Recipes 14.3
+    effective = sketch.num * other.num / (sketch.num + other.num)
+    lam = (effective ** 0.5 + 0.12 + 0.11 / effective ** 0.5) * statistic
+    if lam < 0.2:
+        return statistic, 1.0
+    k = np.arange(1, 101)
+    p_value = 2 * np.sum((-1.0) ** (k - 1) * np.exp(-2 * k * k * lam * lam))
+    return statistic, float(np.clip(p_value, 0, 1))
+
+
+# adds the bucket counts of two DDSketch stores, None is an empty store
+def merge_stores(store, other):
+    if store is None:
+        return other
+    if other is None:
+        return store
+    first = min(store[0], other[0])
+    last = max(store[0] + len(store[1]), other[0] + len(other[1]))
+    counts = np.zeros(last - first, dtype=np.int64)
+    for key, store_counts in [store, other]:
+        counts[key - first:key - first + len(store_counts)] += store_counts
+    return first, counts
+
+
+# histogram of the latencies as dict with the bucket edges (in unit), the
+# number of packets per bucket and the layout, stored in the results json
+def latency_histogram(latency, min_latency, max_latency, bins=None,
+                      scale=None):
+    histogram = new_histogram(min_latency, max_latency, bins, scale,
+                              array_unit(latency))
+    add_to_histogram(histogram, latency)
+    return histogram
+
+
+# empty histogram between min and max (nanoseconds), counts are added
+# chunk by chunk with add_to_histogram
+def new_histogram(min, max, bins=None, scale=None, unit="nanoseconds"):
+    if bins is None:
+        bins = HISTOGRAM_BINS
+    if scale is None:
+        scale = HISTOGRAM_SCALE
+    if scale not in HISTOGRAM_SCALES:
+        raise ValueError("unknown histogram scale: " + str(scale))
+    bins = int(bins)
+    if bins < 1:
+        raise ValueError("histogram needs at least one bucket")
+    if scale == "linear":
+        # same buckets as the bar chart always had: compared to the values
+        # in unit rounded to 2 digits, lower edge excluded
+        if unit == "microseconds":
+            min = float(min) / 1000
+            max = float(max) / 1000
+        elif unit == "milliseconds":
+            min = float(min) / 1000000
+            max = float(max) / 1000000
+        min = min - 0.1
+        max = max + 0.1
+        stepwidth = round(((max - min) / bins) + 0.1, 1)
+        base = round(min, 1)
+        edges = [round(base + (i * stepwidth), 1) for i in range(bins + 1)]
+    else:
+        # compared to the values in nanoseconds (edges in the json are in
+        # unit like for linear), upper edge excluded except
+        # for the last bucket
+        if scale == "log":
+            lower = np.maximum(min, 1)
+            edges = np.geomspace(lower, np.maximum(max, lower + 1),
+                                 bins + 1)
+        else:
+            edges = hdr_edges(np.maximum(min, 0), max)
+        if min < edges[0]:
+            # zero and negative latencies (unsynchronized clocks)
+            edges[0] = min
+        edges = (edges / UNIT_FACTORS[unit]).tolist()
+    return {"scale": scale, "unit": unit, "edges": edges,
+            "counts": [0] * (len(edges) - 1)}
+
+
+# bucket edges of the HdrHistogram layout covering lower to upper (ns):
+# 1 ns buckets below HDR_SUB_BUCKETS, above HDR_SUB_BUCKETS buckets of equal
+# width per power of two
+def hdr_edges(lower, upper):
+    edges = list(range(HDR_SUB_BUCKETS))
+    start = HDR_SUB_BUCKETS
+    width = 1
+    while start <= upper:
+        edges.extend(range(start, 2 * start, width))
+        start *= 2
+        width *= 2
+    edges.append(start)
+    edges = np.array(edges, dtype=np.float64)
+    first = max(0, int(np.searchsorted(edges, lower, side="right")) - 1)
+    return edges[first:]
+
+
+# adds the latencies (nanoseconds) to the counts of the histogram,
+# weights: number of packets per latency (None = 1 each)
+def add_to_histogram(histogram, latency, weights=None):
+    latency = np.asarray(latency)
+    edges = np.array(histogram["edges"])
+    num_bins = len(edges) - 1
+    if histogram["scale"] == "linear":
+        values = scale_to_unit(latency, histogram["unit"])
+        index = np.searchsorted(edges, values, side="left") - 1
+    else:
+        edges = edges * UNIT_FACTORS[histogram["unit"]]
+        if histogram["scale"] == "hdr":
+            edges = np.rint(edges)
+        index = np.searchsorted(edges, latency, side="right") - 1
+        index[latency == edges[-1]] = num_bins - 1
+    valid = (index >= 0) & (index < num_bins)
+    if weights is None:
+        counts = np.bincount(index[valid], minlength=num_bins)
+    else:
+        counts = np.bincount(index[valid],
+                             weights=np.asarray(weights)[valid],
+                             minlength=num_bins).astype(np.int64)
+    histogram["counts"] = [a + int(b) for a, b in zip(histogram["counts"],
+                                                      counts)]
+
+
+# yields the elements of a result file as numpy arrays of chunk_size
+def iter_chunks(logger, results_path, file_name, file_id, chunk_size):
+    path = os.path.join(results_path, file_name + "_" + str(file_id))
+    try:
+        if os.path.isfile(path + ".bin"):
+            values = read_binary(path + ".bin")
+            for i in range(0, len(values), chunk_size):
+                yield np.asarray(values[i:i + chunk_size], dtype=np.int64)
+        else:
+            with open(path + ".csv", "r") as csv_input:
+                while True:
+                    lines = list(itertools.islice(csv_input, chunk_size))
+                    if len(lines) == 0:
+                        break
+                    yield np.array([int(line.split(",")[0])
+                                    for line in lines], dtype=np.int64)
+    except Exception as e:
+        logger.error("exception in chunk reader:" + str(e))
+        yield np.array([-1], dtype=np.int64)
+
+
+# timestamp files of a run with the overflows of the stamper timestamps
+# corrected, see TimestampUnwrapper
+def read_timestamps(logger, results_path, file_name, file_id):
+    timestamps = read_csv(logger, results_path, file_name, file_id)
+    return TimestampUnwrapper(*read_timestamp_format(
+        results_path, file_id)).unwrap(timestamps)
+
+
+# iter_chunks of a timestamp file with the overflows corrected
+def iter_timestamp_chunks(logger, results_path, file_name, file_id,
+                          chunk_size):
+    unwrapper = TimestampUnwrapper(*read_timestamp_format(results_path,
+                                                          file_id))
+    for chunk in iter_chunks(logger, results_path, file_name, file_id,
+                             chunk_size):
+        yield unwrapper.unwrap(chunk)
+
+
+# (multi, tsmax) the external host was started with, from the header of a
+# binary timestamp file or the stamping capabilities of the target stored in
+# config_<id>.json, (0, 0) if unknown
+def read_timestamp_format(results_path, file_id):
+    try:
+        header = read_binary_header(os.path.join(
+            results_path, "timestamp1_list_" + str(file_id) + ".bin"))
+        if header["tsmax"] > 0:
+            return max(header["multi"], 1), header["tsmax"]
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(os.path.join(results_path, "config_" + str(file_id) +
+                               ".json"), "r") as f:
+            capabilities = json.load(f)["stamping_capabilities"]
+        return int(capabilities["timestamp-multi"]), \
+            int(capabilities["timestamp-max"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return 0, 0
+
+
+# corrects the overflows of the stamper timestamps (counter of tsmax + 1
+# values times multi ns = one epoch) chunk by chunk: a step back by more than
+# half an epoch is an overflow, a step forward by more than half an epoch a
+# packet from before the last overflow; wraps are found with one diff and
+# summed up with cumsum. Timestamps of an epoch or more were unwrapped by the
+# receiver already (results of older P4STA versions) and are kept.
+class TimestampUnwrapper:
+    def __init__(self, multi, tsmax):
+        self.epoch = (int(tsmax) + 1) * int(multi)
+        self.offset = 0
+        self.last = None
+        self.unwrapped = int(tsmax) <= 0 or int(multi) <= 0
+
+    def unwrap(self, timestamps):
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if self.unwrapped or len(timestamps) == 0:
+            return timestamps
+        if int(timestamps.max()) >= self.epoch:
+            self.unwrapped = True
+            return timestamps
+        if self.last is None:
+            self.last = int(timestamps[0])
+        diff = np.diff(timestamps, prepend=self.last)
+        wraps = (diff < -self.epoch / 2).astype(np.int64)
+        wraps -= diff > self.epoch / 2
+        np.cumsum(wraps, out=wraps)
+        wraps += self.offset
+        self.offset = int(wraps[-1])
+        self.last = int(timestamps[-1])
+        return timestamps + wraps * self.epoch
+
+
+# number of packets of a run without reading the whole files,
+# estimated from the file size for csv files
+def estimate_packet_count(results_path, file_id):
+    path = os.path.join(results_path, "timestamp1_list_" + str(file_id))
+    try:
+        if os.path.isfile(path + ".bin"):
+            return read_binary_header(path + ".bin")["count"]
+        # one 19 digit timestamp and line break per packet
+        return os.path.getsize(path + ".csv") // 20
+    except Exception:
+        return 0
+
+
+# returns matplotlib.pyplot with the Agg backend (no display needed),
+# imported on the first call
+def get_pyplot():
+    global plt
+    with lock:
+        if plt is None:
+            import matplotlib
+            matplotlib.use("Agg")
+            import matplotlib.pyplot
+            plt = matplotlib.pyplot
+    return plt
+
+
+# returns the optional pyarrow module, imported on the first call
+def get_pyarrow():
+    global pyarrow
+    with lock:
+        if pyarrow is None:
+            try:
+                import pyarrow.ipc
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError("the export needs pyarrow, install it with "
+                                  "'pip3 install pyarrow'")
+            pyarrow = sys.modules["pyarrow"]
+    return pyarrow
+
+
 # plots the line charts
+# max_points: graphs with more points are decimated to at most max_points
+# keeping the minimum and maximum of every bucket (None = PLOT_MAX_POINTS,
+# 0 = plot all points)
 def plot_graph(value_list_input, index_list, titel, x_label, y_label,
-               filename, adjust_unit, adjust_y_ax, file_id):
+               filename, adjust_unit, adjust_y_ax, file_id, max_points=None):
     fpath = project_path + "/results/" + str(
                     file_id) + "/generated/" + filename + ".svg"
-    if not os.path.isfile(fpath) or __name__ == "__main__":
+    if not os.path.isfile(fpath) or write_to_cwd:
         with lock:
-            if adjust_unit:
+            if max_points is None:
+                max_points = PLOT_MAX_POINTS
+            plot_values = value_list_input
+            if 0 < max_points < len(value_list_input):
+                value_list_input = np.asarray(value_list_input)
+                index_list, plot_values = decimate_min_max(
+                    index_list, value_list_input, max_points)
+            if adjust_unit and isinstance(value_list_input, np.ndarray):
+                # unit of all values, not only of the decimated ones
+                unit = array_unit(value_list_input)
+                value_list = scale_to_unit(plot_values, unit)
+            elif adjust_unit:
                 value_list, unit = find_unit(value_list_input)
             else:
-                value_list = value_list_input
+                value_list = plot_values
                 unit = ""
+            plt = get_pyplot()
             fig, ax = plt.subplots()
             ax.plot(index_list, value_list)
             plt.title(titel)
@@ -365,7 +1995,7 @@ def plot_graph(value_list_input, index_list, titel, x_label, y_label,
             # if adjust_y_ax is True sets y-axis to 0
             if adjust_y_ax:
                 try:
-                    temp = max(value_list_input)
+                    temp = np.max(value_list_input)
                     if adjust_unit:
                         if unit == "microseconds":
                             temp = temp / 1000
@@ -381,7 +2011,7 @@ def plot_graph(value_list_input, index_list, titel, x_label, y_label,
             plt.xlabel(x_label, fontsize=12)
             plt.ylabel(y_label, fontsize=12)
             plt.tight_layout()
-            if __name__ == "__main__":
+            if write_to_cwd:
                 fig.savefig(filename + ".svg", format="svg")
             else:
                 try:
@@ -400,6 +2030,8 @@ def plot_graph(value_list_input, index_list, titel, x_label, y_label,
 # input: list
 # returns list and string with unit
 def find_unit(value_list_input):
+    if isinstance(value_list_input, np.ndarray):
+        return find_unit_array(value_list_input)
     if type(value_list_input) != list:
         value_list_input = [value_list_input]
     try:
@@ -431,6 +2063,65 @@ def find_unit(value_list_input):
         return value_list_input, unit
 
 
+# same as find_unit but vectorized for numpy arrays, returns array and unit
+def find_unit_array(value_array):
+    unit = array_unit(value_array)
+    return scale_to_unit(value_array, unit), unit
+
+
+# unit of find_unit for a numpy array
+def array_unit(value_array):
+    if len(value_array) == 0:
+        return "nanoseconds"
+    abs_values = np.abs(value_array)
+    return unit_from_counters(np.count_nonzero(abs_values >= 1000),
+                              np.count_nonzero(abs_values >= 1000000),
+                              len(value_array))
+
+
+# unit of find_unit from the number of values >= 1 microsec and 1 millisec
+def unit_from_counters(microsec_counter, millisec_counter, num):
+    # if more than 95% of the values are bigger than 1 millisec = millisec
+    if millisec_counter > (0.95 * num):
+        return "milliseconds"
+    elif microsec_counter > (0.95 * num):
+        return "microseconds"
+    return "nanoseconds"
+
+
+# scales a numpy array of nanoseconds to the unit
+def scale_to_unit(value_array, unit):
+    if unit == "milliseconds":
+        return np.round(np.asarray(value_array) / 1000000, 2)
+    elif unit == "microseconds":
+        return np.round(np.asarray(value_array) / 1000, 2)
+    return value_array
+
+
+# reduces a line to at most max_points points by splitting it in buckets of
+# equal size and keeping the minimum and maximum of every bucket (plus the
+# first and last point), so spikes stay visible; returns index and values
+def decimate_min_max(index_list, value_list, max_points):
+    values = np.asarray(value_list)
+    index = np.asarray(index_list)
+    num = len(values)
+    if max_points <= 0 or num <= max_points:
+        return index, values
+    # two points per bucket, two for first and last point
+    buckets = max(1, (max_points - 2) // 2)
+    size = -(-num // buckets)
+    full = (num // size) * size
+    starts = np.arange(0, full, size)
+    body = values[:full].reshape(-1, size)
+    keep = [np.array([0, num - 1]), starts + body.argmin(axis=1),
+            starts + body.argmax(axis=1)]
+    if full < num:
+        keep.append(np.array([full + values[full:].argmin(),
+                              full + values[full:].argmax()]))
+    keep = np.unique(np.concatenate(keep))
+    return index[keep], values[keep]
+
+
 # b_type = "bit" or "byte"
 def find_unit_bit_byte(value, b_type):
     unit = b_type
@@ -466,44 +2157,35 @@ def find_unit_sqr(value_ns2):
         return value_ns2, unit
 
 
-# plots bar chart
+# plots bar chart of the value distribution
+# scale: bucket layout of the histogram, see HISTOGRAM_SCALES
 def plot_bar(value_list_input, min, max, filename,
-             x, y, slices, adjust_unit, file_id):
+             x, y, slices, adjust_unit, file_id, scale="linear"):
+    value_list = np.asarray(value_list_input)
+    unit = array_unit(value_list) if adjust_unit else "nanoseconds"
+    histogram = new_histogram(min, max, slices, scale, unit)
+    add_to_histogram(histogram, value_list)
+    plot_histogram(histogram, filename, x, y, file_id, adjust_unit)
+
+
+# plots bar chart of a histogram from new_histogram/latency_histogram
+def plot_histogram(histogram, filename, x, y, file_id, adjust_unit=True):
     fpath = project_path + "/results/" + str(
         file_id) + "/generated/" + filename + ".svg"
-    if not os.path.isfile(fpath) or __name__ == "__main__":
+    if not os.path.isfile(fpath) or write_to_cwd:
         with lock:
-            if adjust_unit:
-                value_list, unit = find_unit(value_list_input)
-                if unit == "microseconds":
-                    min = float(min) / 1000
-                    max = float(max) / 1000
-                elif unit == "milliseconds":
-                    min = float(min) / 1000000
-                    max = float(max) / 1000000
-            else:
-                value_list = value_list_input
-                unit = ""
-
-            min = min - 0.1
-            max = max + 0.1
-            total_range = max - min
-            parts = []
-            stepwidth = round((total_range / slices)+0.1, 1)
-            base = round(min, 1)
-            for i in range(0, slices+1):
-                parts.append(round(base + (i*stepwidth), 1))
-            result = []
-            for i in range(0, slices):
-                result.append(0)
+            unit = histogram["unit"]
+            parts = histogram["edges"]
+            result = histogram["counts"]
             label = []
             for i in range(0, len(parts) - 1):
-                label.append(str(
-                    round(parts[i]+0.01, 2))+"-\n" + str(parts[i+1]))
-            for z in value_list:
-                for i in range(0, len(parts) - 1):
-                    if parts[i] < z <= parts[i+1]:
-                        result[i] = result[i] + 1
+                if histogram["scale"] == "linear":
+                    label.append(str(
+                        round(parts[i]+0.01, 2))+"-\n" + str(parts[i+1]))
+                else:
+                    label.append(str(round(parts[i], 2)) + "-\n" +
+                                 str(round(parts[i+1], 2)))
+            plt = get_pyplot()
             fig2 = plt.figure()
             index = np.arange(len(label))
             plt.bar(index, result)
@@ -515,11 +2197,14 @@ def plot_bar(value_list_input, min, max, filename,
             else:
                 plt.xlabel(x, fontsize=10)
             plt.ylabel(y, fontsize=10)
-            plt.xticks(index, label, fontsize=8, rotation=30)
+            # hdr layouts have many buckets, label only some of them
+            step = -(-len(label) // 20)
+            plt.xticks(index[::step], label[::step], fontsize=8, rotation=30)
             plt.tight_layout()
-            for a, b in zip(index, result):
-                plt.text(a, b, str(b), fontsize=8)
-            if __name__ == "__main__":
+            if step == 1:
+                for a, b in zip(index, result):
+                    plt.text(a, b, str(b), fontsize=8)
+            if write_to_cwd:
                 fig2.savefig(filename + ".svg", format="svg")
             else:
                 try:
@@ -535,18 +2220,70 @@ def plot_bar(value_list_input, min, max, filename,
         # print("Using cached version of " + fpath)
         pass
 
-# reads csv file and returns list with elements from csv file
+
+# band chart of the latency percentiles per window: min-max and the
+# WINDOW_PERCENTILES bands around the median over the time of the run
+def plot_latency_windows(windows, filename, file_id):
+    fpath = project_path + "/results/" + str(
+        file_id) + "/generated/" + filename + ".svg"
+    if not os.path.isfile(fpath) or write_to_cwd:
+        with lock:
+            unit = array_unit(np.asarray(windows["max"]))
+            time_list = windows["time"]
+            names = [percentile_name(p) for p in WINDOW_PERCENTILES
+                     if percentile_name(p) in windows]
+            plt = get_pyplot()
+            fig, ax = plt.subplots()
+            ax.fill_between(time_list,
+                            scale_to_unit(np.asarray(windows["min"]), unit),
+                            scale_to_unit(np.asarray(windows["max"]), unit),
+                            step="post", alpha=0.2, label="min - max")
+            for low, high in zip(names, names[1:]):
+                ax.fill_between(
+                    time_list, scale_to_unit(np.asarray(windows[low]), unit),
+                    scale_to_unit(np.asarray(windows[high]), unit),
+                    step="post", alpha=0.4, label=low + " - " + high)
+            if len(names) > 0:
+                ax.step(time_list,
+                        scale_to_unit(np.asarray(windows[names[0]]), unit),
+                        where="post", label=names[0])
+            plt.title("Latency percentiles per " +
+                      "%g" % (windows["window"] / 1000000) + " ms")
+            plt.xlabel("t[s]", fontsize=12)
+            plt.ylabel("Latency [" + unit + "]", fontsize=12)
+            ax.legend(fontsize=8)
+            plt.tight_layout()
+            if write_to_cwd:
+                fig.savefig(filename + ".svg", format="svg")
+            else:
+                os.makedirs(os.path.dirname(fpath), exist_ok=True)
+                fig.savefig(fpath, format="svg")
+            plt.close('all')
+
+
+# reads the binary file if available, otherwise the csv file
+# returns numpy array with the elements of the file
 def read_csv(logger, results_path, file_name, file_id, thread_return=[], thr_id=-1):
-    temp = []
-    try:
-        with open(os.path.join(results_path, file_name + "_" + str(file_id)
-                               + ".csv"), "r") as csv_input:
-            reader = csv.reader(csv_input, lineterminator="\n")
-            for elem in reader:
-                temp.append(int(elem[0]))
-    except Exception as e:
-        logger.error("exception in csv reader:" + str(e))
-        temp.append(-1)
+    bin_path = os.path.join(results_path, file_name + "_" + str(file_id)
+                            + ".bin")
+    if os.path.isfile(bin_path):
+        try:
+            temp = read_binary(bin_path)
+        except Exception as e:
+            logger.error("exception in binary reader:" + str(e))
+            temp = np.array([-1], dtype=np.int64)
+    else:
+        temp = []
+        try:
+            with open(os.path.join(results_path, file_name + "_" + str(file_id)
+                                   + ".csv"), "r") as csv_input:
+                reader = csv.reader(csv_input, lineterminator="\n")
+                for elem in reader:
+                    temp.append(int(elem[0]))
+        except Exception as e:
+            logger.error("exception in csv reader:" + str(e))
+            temp.append(-1)
+        temp = np.array(temp, dtype=np.int64)
     # if thread id is set use passed list to store results
     if thr_id > -1:
         thread_return[thr_id] = temp
@@ -554,6 +2291,253 @@ def read_csv(logger, results_path, file_name, file_id, thread_return=[], thr_id=
         return temp
 
 
+# returns dict with dtype, count, multi and tsmax of a binary result file
+def read_binary_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(BIN_HEADER.size)
+    return unpack_binary_header(raw, path)
+
+
+def unpack_binary_header(raw, path):
+    if len(raw) < BIN_HEADER.size:
+        raise ValueError(path + " is too short for a P4STA binary header")
+    magic, version, dtype, count, multi, tsmax = BIN_HEADER.unpack(raw)
+    if magic != BIN_MAGIC:
+        raise ValueError(path + " is not a P4STA binary result file")
+    if version > BIN_VERSION:
+        raise ValueError(path + " has unsupported format version "
+                         + str(version))
+    return {"dtype": np.dtype(dtype.rstrip(b"\0").decode()), "count": count,
+            "multi": multi, "tsmax": tsmax}
+
+
+# maps a binary result file into memory without copying it,
+# unsigned 64 bit values are returned as int64 view (timestamps < 2^63)
+def read_binary(path):
+    header = read_binary_header(path)
+    if header["count"] == 0:
+        return np.zeros(0, dtype=header["dtype"])
+    values = np.memmap(path, dtype=header["dtype"], mode="r",
+                       offset=BIN_HEADER.size, shape=(header["count"],))
+    if header["dtype"] == np.dtype("<u8"):
+        values = values.view("<i8")
+    return values
+
+
+# writes values as binary result file, dtype e.g. "<i8" or "<u2"
+def write_binary(path, values, dtype, multi=0, tsmax=0):
+    values = np.asarray(values, dtype=dtype)
+    with open(path, "wb") as f:
+        f.write(BIN_HEADER.pack(BIN_MAGIC, BIN_VERSION,
+                                np.dtype(dtype).str.encode(), len(values),
+                                int(multi), int(tsmax)))
+        values.tofile(f)
+
+
+# converts the csv files of an (old) results folder to the binary format
+# with the dtypes the receivers write, chunk_size lines at a time; the count
+# in the header is written when all chunks are converted
+def convert_csv_to_binary(logger, results_path, file_id, multi=0, tsmax=0,
+                          remove_csv=False, chunk_size=None):
+    if chunk_size is None:
+        chunk_size = STREAM_CHUNK_SIZE
+    converted = []
+    for file_name, dtype in [("timestamp1_list", "<u8"),
+                             ("timestamp2_list", "<u8"),
+                             ("packet_sizes", "<u2"),
+                             ("raw_packet_counter", "<u8"),
+                             ("only_timestamp1_list", "<u8"),
+                             ("only_tstamp1_packet_sizes", "<u2"),
+                             ("only_tstamp1_raw_packet_counter", "<u8")]:
+        csv_path = os.path.join(results_path, file_name + "_" + str(file_id)
+                                + ".csv")
+        if not os.path.isfile(csv_path):
+            continue
+        count = 0
+        with open(csv_path, "r") as csv_input, \
+                open(csv_path[:-4] + ".bin", "wb") as output:
+            output.seek(BIN_HEADER.size)
+            while True:
+                lines = list(itertools.islice(csv_input, chunk_size))
+                if len(lines) == 0:
+                    break
+                values = np.loadtxt(lines, delimiter=",", dtype=np.int64,
+                                    usecols=0, ndmin=1)
+                values.astype(dtype).tofile(output)
+                count += len(values)
+            output.seek(0)
+            output.write(BIN_HEADER.pack(BIN_MAGIC, BIN_VERSION,
+                                         np.dtype(dtype).str.encode(), count,
+                                         int(multi), int(tsmax)))
+        if remove_csv:
+            os.remove(csv_path)
+        converted.append(file_name)
+        logger.info("Converted " + csv_path + " to binary format.")
+    return converted
+
+
+# returns the timestamp1, timestamp2 and packet size arrays of a binary
+# chunk (see CHUNK_SECTIONS) and the header of its first section
+def read_chunk(path):
+    sections = []
+    headers = []
+    with open(path, "rb") as f:
+        for name in CHUNK_SECTIONS:
+            header = unpack_binary_header(f.read(BIN_HEADER.size), path)
+            values = np.fromfile(f, dtype=header["dtype"],
+                                 count=header["count"])
+            if len(values) < header["count"]:
+                raise ValueError(path + " is truncated")
+            if len(sections) > 0 and len(values) != len(sections[0]):
+                raise ValueError(path + " has sections of different length")
+            if header["dtype"] == np.dtype("<u8"):
+                values = values.view("<i8")
+            sections.append(values)
+            headers.append(header)
+    return sections, headers[0]
+
+
+# writes timestamp1_list, timestamp2_list and packet_sizes of a receiver in
+# spill mode from its binary chunks in chunk_path (default
+# results/<id>/chunks), in order and without loading more than one chunk;
+# chunks_<id>.json has to list all of them. Returns the number of packets
+def merge_chunks(logger, results_path, file_id, chunk_path=None):
+    if chunk_path is None:
+        chunk_path = os.path.join(results_path, LIVE_CHUNK_DIR)
+    with open(os.path.join(chunk_path, "chunks_" + str(file_id) + ".json"),
+              "r") as f:
+        manifest = json.load(f)
+    dtypes = dict(CHUNK_DTYPES)
+    count = multi = tsmax = 0
+    files = {}
+    try:
+        for name in CHUNK_SECTIONS:
+            files[name] = open(os.path.join(
+                results_path, name + "_" + str(file_id) + ".tmp"), "wb")
+            # header written when the number of values is known
+            files[name].write(bytes(BIN_HEADER.size))
+        for number in range(manifest["chunks"]):
+            path = os.path.join(chunk_path, "chunk_" + str(file_id) + "_" +
+                                str(number) + ".bin")
+            sections, header = read_chunk(path)
+            for name, values in zip(CHUNK_SECTIONS, sections):
+                values.tofile(files[name])
+            count += len(sections[0])
+            multi, tsmax = header["multi"], header["tsmax"]
+        if count != manifest["packets"]:
+            raise ValueError("chunks of run " + str(file_id) + " hold " +
+                             str(count) + " of " + str(manifest["packets"]) +
+                             " packets")
+        for name in CHUNK_SECTIONS:
+            files[name].seek(0)
+            files[name].write(BIN_HEADER.pack(
+                BIN_MAGIC, BIN_VERSION, np.dtype(dtypes[name]).str.encode(),
+                count, int(multi), int(tsmax)))
+    except Exception:
+        for name, f in files.items():
+            f.close()
+            os.remove(f.name)
+        raise
+    for f in files.values():
+        f.close()
+    for name in CHUNK_SECTIONS:
+        path = os.path.join(results_path, name + "_" + str(file_id))
+        os.replace(path + ".tmp", path + ".bin")
+    logger.info("Merged " + str(manifest["chunks"]) + " chunks (" +
+                str(count) + " packets) of run " + str(file_id) + ".")
+    return count
+
+
+# writes the per packet data of a run (ingress and egress timestamp with the
+# overflows corrected, latency and packet size) as compressed columnar file
+# for external tools, chunk by chunk without loading the whole run;
+# config_<id>.json of the run is stored as "p4sta_config" in the schema
+# metadata. file_format: "parquet" or "arrow" (IPC file), output_path: None
+# = results/<id>/generated/packets_<id>.parquet/.arrow; returns the path
+def export_run(logger, results_path, file_id, file_format="parquet",
+               output_path=None, chunk_size=None):
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError("unknown export format: " + str(file_format))
+    pa = get_pyarrow()
+    if chunk_size is None:
+        chunk_size = STREAM_CHUNK_SIZE
+    if output_path is None:
+        output_path = os.path.join(
+            project_path, "results", str(file_id), "generated",
+            "packets_" + str(file_id) + EXPORT_FORMATS[file_format])
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    try:
+        with open(os.path.join(results_path, "config_" + str(file_id) +
+                               ".json"), "r") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {}
+    metadata = {"p4sta_config": json.dumps(config),
+                "p4sta_id": str(file_id),
+                "p4sta_analytics_version": str(ANALYTICS_VERSION)}
+    schema = pa.schema([("timestamp1", pa.int64()),
+                        ("timestamp2", pa.int64()),
+                        ("latency", pa.int64()),
+                        ("packet_size", pa.uint16())], metadata=metadata)
+    if file_format == "parquet":
+        writer = pa.parquet.ParquetWriter(output_path, schema,
+                                          compression=EXPORT_COMPRESSION)
+    else:
+        writer = pa.ipc.new_file(output_path, schema,
+                                 options=pa.ipc.IpcWriteOptions(
+                                     compression=EXPORT_COMPRESSION))
+    num = 0
+    try:
+        for ts1, ts2, sizes in itertools.zip_longest(
+                iter_timestamp_chunks(logger, results_path,
+                                      "timestamp1_list", file_id, chunk_size),
+                iter_timestamp_chunks(logger, results_path,
+                                      "timestamp2_list", file_id, chunk_size),
+                iter_chunks(logger, results_path, "packet_sizes", file_id,
+                            chunk_size)):
+            # the chunk readers return [-1] if a file is missing
+            if ts1 is None or ts2 is None or sizes is None or \
+                    not len(ts1) == len(ts2) == len(sizes) or \
+                    (num == 0 and len(ts1) > 0 and ts1[0] < 0):
+                raise ValueError("result files of run " + str(file_id) +
+                                 " are missing or differ in length")
+            writer.write_batch(pa.record_batch(
+                [ts1, ts2, ts2 - ts1, sizes.astype(np.uint16)],
+                schema=schema))
+            num += len(ts1)
+    except Exception:
+        # no incomplete file is left behind
+        writer.close()
+        os.remove(output_path)
+        raise
+    writer.close()
+    logger.info("Exported " + str(num) + " packets of run " + str(file_id) +
+                " to " + output_path)
+    return output_path
+
+
+# multicast of a run from results/<id>/config_<id>.json or
+# data/config_<id>.json for standalone execution
+def read_standalone_multicast(id, logger):
+    dir_path = os.path.dirname(os.path.realpath(__file__))
+    try:
+        with open(os.path.join(project_path, "results", id, "config_" + id +
+                               ".json"), "r") as cfg:
+            return json.load(cfg)["multicast"]
+    except Exception:
+        pass
+    try:
+        with open(dir_path[0:dir_path.find("analytics")]+"/data/config_"
+                  + id + ".json", "r") as cfg:
+            config = json.load(cfg)
+            return config["multicast"]
+    except Exception:
+        logger.warning("config.json not found. path: " + dir_path[0:dir_path.find(
+            "analytics")]+"/data/config_" + id + ".json")
+        return ""
+
+
 # entry point if analytics gets execute directly as a script
 # and NOT as an included module
 if __name__ == "__main__":
@@ -561,31 +2545,131 @@ if __name__ == "__main__":
         description='CSV reader for external host results.')
     parser.add_argument(
         '--id', help='ID of the csv files. Not set: use cfg file in /data',
-        type=str, action="store", required=True)
+        type=str, action="store")
+    parser.add_argument(
+        '--compare', help='IDs of runs to compare, results are written to '
+                          'results/comparisons/<first ID>_<last ID>',
+        type=str, nargs="+")
+    parser.add_argument(
+        '--batch', help='IDs or glob patterns (e.g. "16*") of runs to '
+                        'analyze in parallel, writes a summary of all runs',
+        type=str, nargs="+")
+    parser.add_argument(
+        '--jobs', help='Number of runs analyzed in parallel (--batch)',
+        type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        '--no-plots', help='Only calculate the results, no graphs (--batch)',
+        action="store_true")
+    parser.add_argument(
+        '--summary', help='Path of the summary without ending (--batch), '
+                          '.json and .csv are written',
+        type=str, default=os.path.join(project_path, "results",
+                                       "batch_summary"))
+    parser.add_argument(
+        '--convert', help='Convert the csv files of the results folder to '
+                          'the binary format and exit',
+        action="store_true")
+    parser.add_argument(
+        '--stream', help='Analyze chunk by chunk in bounded memory '
+                         '(no per packet graphs)',
+        action="store_true", default=None)
+    parser.add_argument(
+        '--chunk-size', help='Packets per chunk in streaming mode',
+        type=int, default=STREAM_CHUNK_SIZE)
+    parser.add_argument(
+        '--plot-workers', help='Number of processes rendering the graphs',
+        type=int, default=PLOT_WORKERS)
+    parser.add_argument(
+        '--plot-points', help='Maximum points per line chart, spikes are '
+                              'kept (0 = all points)',
+        type=int, default=PLOT_MAX_POINTS)
+    parser.add_argument(
+        '--window', help='Window of the throughput and packet rate graphs '
+                         'in seconds (0.00001 to 1)',
+        type=float, default=THROUGHPUT_WINDOW / 1e9)
+    parser.add_argument(
+        '--bins', help='Number of buckets of the latency histogram '
+                       '(linear and log scale)',
+        type=int, default=HISTOGRAM_BINS)
+    parser.add_argument(
+        '--bin-scale', help='Bucket layout of the latency histogram',
+        choices=HISTOGRAM_SCALES, default=HISTOGRAM_SCALE)
+    parser.add_argument(
+        '--export', help='Write the per packet data of --id as compressed '
+                         'columnar file (needs pyarrow)',
+        choices=list(EXPORT_FORMATS))
+    parser.add_argument(
+        '--iat-gap', help='Inter-arrival times below it form a burst, in ns',
+        type=int, default=IAT_GAP_THRESHOLD)
+    parser.add_argument(
+        '--multi', help='Timestamp multi stored in converted binary files',
+        type=int, default=0)
+    parser.add_argument(
+        '--tsmax', help='Timestamp max stored in converted binary files',
+        type=int, default=0)
     args = parser.parse_args()
 
     logger = get_fallback_logger()
 
     logger.info("Start standalone analytics")
 
-    if args.id is None:
+    if args.compare is not None:
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        results = dir_path[0:dir_path.find("analytics")] + "results/"
+        runs = [(id, read_standalone_multicast(id, logger), results + id)
+                for id in args.compare]
+        if all(len(multicast) > 0 for id, multicast, path in runs):
+            comparison = compare_runs(
+                runs, results + "comparisons/" + args.compare[0] + "_" +
+                args.compare[-1], logger, args.plot_workers,
+                int(round(args.window * 1e9)))
+            for test in comparison["ks_tests"]:
+                logger.info("KS test " + test["run"] + " vs " +
+                            test["other_run"] + ": D = " +
+                            str(test["statistic"]) + ", p = " +
+                            str(test["p_value"]))
+        else:
+            logger.error("Aborted execution.")
+    elif args.batch is not None:
+        results = os.path.join(project_path, "results")
+        runs = [(id, read_standalone_multicast(id, logger),
+                 os.path.join(results, id))
+                for id in batch_run_ids(results, args.batch)]
+        logger.info("Analyzing " + str(len(runs)) + " runs with " +
+                    str(args.jobs) + " processes.")
+        if len(runs) > 0:
+            summary = batch_analyze(
+                runs, args.summary, logger, args.jobs, not args.no_plots,
+                args.stream, args.chunk_size, args.plot_points, args.bins,
+                args.bin_scale, int(round(args.window * 1e9)), args.iat_gap)
+            failed = [row["id"] for row in summary["runs"]
+                      if row["status"] != "ok"]
+            logger.info("Summary written to " + args.summary +
+                        ".json/.csv, failed runs: " + str(failed))
+            if len(failed) > 0:
+                sys.exit(1)
+    elif args.id is None:
         logger.info("No ID given")
+    elif args.convert:
+        dir_path = os.path.dirname(os.path.realpath(__file__))
+        path = dir_path[0:dir_path.find("analytics")]+"results/"+str(args.id)
+        convert_csv_to_binary(logger, path, args.id, args.multi, args.tsmax)
+    elif args.export is not None:
+        path = os.path.join(project_path, "results", str(args.id))
+        export_run(logger, path, args.id, args.export,
+                   "packets_" + str(args.id) + EXPORT_FORMATS[args.export],
+                   args.chunk_size)
     else:
         id = args.id
-        multicast = "n/a"
         dir_path = os.path.dirname(os.path.realpath(__file__))
-        try:
-            with open(dir_path[0:dir_path.find("analytics")]+"/data/config_"
-                      + id + ".json", "r") as cfg:
-                config = json.load(cfg)
-                multicast = config["multicast"]
-        except Exception:
-            multicast = ""
-            logger.warning("config.json not found. path: " + dir_path[0:dir_path.find(
-                "analytics")]+"/data/config_" + id + ".json")
+        multicast = read_standalone_multicast(id, logger)
 
         if len(id) > 0 and len(multicast) > 0:
             path = dir_path[0:dir_path.find("analytics")]+"results/"+str(id)
-            results = main(id, multicast, path, logger)
+            write_to_cwd = True
+            results = main(id, multicast, path, logger, args.stream,
+                           args.chunk_size, args.plot_workers,
+                           args.plot_points, args.bins, args.bin_scale,
+                           int(round(args.window * 1e9)), True, args.iat_gap)
         else:
             logger.error("Aborted execution.")
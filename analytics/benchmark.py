@@ -0,0 +1,352 @@
+# Copyright 2019-present Ralf Kundel, Fridolin Siegmund
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+###############################################
+# Benchmarks of the analytics module, the     #
+# results are printed and stored as json      #
+# python benchmark.py startup                 #
+# python benchmark.py pipeline                #
+###############################################
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+dir_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.dirname(dir_path))
+from analytics import analytics  # noqa: E402
+
+STARTUP_REPEAT = 5
+
+PIPELINE_PACKETS = [1000000, 10000000, 100000000]
+PIPELINE_STAGES = ["load", "statistics", "binning", "histogram", "plotting"]
+GENERATE_CHUNK_SIZE = 10000000
+PACKET_INTERVAL = 1000
+LATENCY = 25000
+JITTER = 500
+PAUSE_LENGTH = 350000000
+PACKET_SIZES = [64, 512, 1500]
+
+# measures the import in a fresh interpreter and prints the seconds
+IMPORT_CODE = """
+import sys
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+# median seconds of code executed in repeat fresh python interpreters
+def time_fresh_interpreter(code, repeat=STARTUP_REPEAT):
+    durations = []
+    for i in range(repeat):
+        res = subprocess.run(
+            [sys.executable, "-c", IMPORT_CODE.format(code=code)],
+            cwd=dir_path, stdout=subprocess.PIPE, check=True)
+        durations.append(float(res.stdout.decode().strip().split("\n")[-1]))
+    return statistics.median(durations)
+
+
+# import time of analytics as used by the core and the Django views (no
+# graph rendered) and with the plotting backend loaded by the first graph
+def benchmark_startup(repeat=STARTUP_REPEAT):
+    import_analytics = time_fresh_interpreter(
+        "import analytics\n"
+        "assert 'matplotlib' not in sys.modules", repeat)
+    import_with_pyplot = time_fresh_interpreter(
+        "import analytics\n"
+        "analytics.get_pyplot()", repeat)
+    return {"repeat": repeat,
+            "import_analytics_seconds": round(import_analytics, 4),
+            "import_analytics_and_pyplot_seconds": round(import_with_pyplot,
+                                                         4),
+            "saved_seconds": round(import_with_pyplot - import_analytics, 4)}
+
+
+# writes a synthetic run as binary result files to results_path: one packet
+# every PACKET_INTERVAL ns and a latency of LATENCY ns (both +- jitter ns),
+# pauses of pause_length ns evenly distributed over the run and a stamper
+# counter which overflows wraps times (timestamps modulo one epoch like the
+# raw timestamps of a receiver), generated chunk by chunk in bounded memory
+def generate_run(results_path, file_id, packets, jitter=JITTER, wraps=0,
+                 pauses=0, pause_length=PAUSE_LENGTH, seed=1):
+    if jitter >= PACKET_INTERVAL:
+        raise ValueError("jitter must be below the packet interval of " +
+                         str(PACKET_INTERVAL) + " ns")
+    duration = packets * PACKET_INTERVAL + pauses * pause_length
+    if wraps > 0:
+        # the run starts in the middle of the first epoch
+        epoch = duration // wraps
+        # steps of more than half an epoch can not be told from overflows
+        if epoch <= 2 * (pause_length + PACKET_INTERVAL + LATENCY +
+                         2 * jitter):
+            raise ValueError("too many wraps for " + str(packets) +
+                             " packets")
+        multi, tsmax, start = 1, epoch - 1, epoch // 2
+    else:
+        epoch, multi, tsmax, start = 0, 0, 0, 1600000000000000000
+    pause_at = {(i + 1) * packets // (pauses + 1) for i in range(pauses)}
+
+    os.makedirs(results_path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    files = {}
+    try:
+        for file_name, dtype in [("timestamp1_list", "<i8"),
+                                 ("timestamp2_list", "<i8"),
+                                 ("packet_sizes", "<u2")]:
+            files[file_name] = open(os.path.join(
+                results_path, file_name + "_" + str(file_id) + ".bin"), "wb")
+            files[file_name].write(analytics.BIN_HEADER.pack(
+                analytics.BIN_MAGIC, analytics.BIN_VERSION,
+                np.dtype(dtype).str.encode(), packets, multi, tsmax))
+        last = start
+        for first in range(0, packets, GENERATE_CHUNK_SIZE):
+            num = min(GENERATE_CHUNK_SIZE, packets - first)
+            timestamp1 = rng.integers(PACKET_INTERVAL - jitter,
+                                      PACKET_INTERVAL + jitter + 1, num)
+            for index in pause_at:
+                if first <= index < first + num:
+                    timestamp1[index - first] += pause_length
+            timestamp1[0] += last
+            np.cumsum(timestamp1, out=timestamp1)
+            last = int(timestamp1[-1])
+            timestamp2 = timestamp1 + rng.integers(LATENCY - jitter,
+                                                   LATENCY + jitter + 1, num)
+            if epoch > 0:
+                timestamp1 %= epoch
+                timestamp2 %= epoch
+            timestamp1.astype("<i8").tofile(files["timestamp1_list"])
+            timestamp2.astype("<i8").tofile(files["timestamp2_list"])
+            rng.choice(PACKET_SIZES, num).astype("<u2").tofile(
+                files["packet_sizes"])
+    finally:
+        for f in files.values():
+            f.close()
+    analytics.write_binary(os.path.join(
+        results_path, "raw_packet_counter_" + str(file_id) + ".bin"),
+        [packets], "<u8")
+
+
+# resets the peak resident memory (VmHWM) of this process, Linux only
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+# peak resident memory of this process in MB, since the last reset_peak_rss
+# or (if it is not supported) since the start of the process
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+# timestamps and packet sizes of a run in memory (the binary files are only
+# mapped by read_csv), the timestamps are unwrapped as in analyze_run
+def load_run(logger, results_path, file_id):
+    return (np.array(analytics.read_timestamps(
+        logger, results_path, "timestamp1_list", file_id)),
+        np.array(analytics.read_timestamps(
+            logger, results_path, "timestamp2_list", file_id)),
+        np.array(analytics.read_csv(logger, results_path, "packet_sizes",
+                                    file_id), dtype=np.int64))
+
+
+# executes one stage of the analytics pipeline, the inputs are prepared
+# first and only the stage itself is measured; runs above the
+# STREAMING_THRESHOLD are analyzed in streaming mode like by analyze_run
+def run_stage(stage, results_path, file_id, plot_workers=None):
+    logger = analytics.get_fallback_logger()
+    analytics.project_path = os.path.dirname(os.path.dirname(results_path))
+    streaming = analytics.estimate_packet_count(
+        results_path, file_id) > analytics.STREAMING_THRESHOLD
+    run = None
+    if stage in ["binning", "histogram"] or \
+            (stage == "statistics" and not streaming):
+        run = load_run(logger, results_path, file_id)
+    if stage == "histogram":
+        latency = run[1] - run[0]
+        run = None
+    if stage == "plotting":
+        results, series = analytics.analyze_run(logger, results_path,
+                                                file_id, "1")
+
+    reset_peak_rss()
+    start = time.perf_counter()
+    if stage == "load":
+        run = load_run(logger, results_path, file_id)
+    elif stage == "statistics" and streaming:
+        analytics.calculate_statistics_streaming(logger, results_path,
+                                                 file_id, "1")
+    elif stage == "statistics":
+        analytics.calculate_statistics(*run, "1")
+    elif stage == "binning":
+        byte_counts, packet_counts = analytics.window_counts(
+            run[1], run[2], int(run[1][0]), analytics.THROUGHPUT_WINDOW)
+        analytics.throughput_series(byte_counts, packet_counts,
+                                    analytics.THROUGHPUT_WINDOW)
+    elif stage == "histogram":
+        analytics.latency_histogram(latency, int(latency.min()),
+                                    int(latency.max()))
+        analytics.latency_percentiles(latency)
+    elif stage == "plotting":
+        analytics.plot_results(series, results, "1", file_id, logger,
+                               plot_workers)
+    else:
+        raise ValueError("unknown stage " + stage)
+    seconds = time.perf_counter() - start
+
+    report = {"seconds": round(seconds, 4), "peak_rss_mb": peak_rss_mb(),
+              "streaming": streaming}
+    if stage == "plotting" and analytics.plot_pool is not None:
+        # the graphs are rendered in the plotting pool
+        analytics.plot_pool.close()
+        analytics.plot_pool.join()
+        report["workers_peak_rss_mb"] = round(resource.getrusage(
+            resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+    return report
+
+
+# generates a run per number of packets and executes every stage in a fresh
+# interpreter, so the peak memory of a stage is not hidden by the ones before
+def benchmark_pipeline(packets=None, stages=None, jitter=JITTER, wraps=0,
+                       pauses=0, pause_length=PAUSE_LENGTH, seed=1,
+                       plot_workers=None, workdir=None, logger=None):
+    if packets is None:
+        packets = PIPELINE_PACKETS
+    if stages is None:
+        stages = PIPELINE_STAGES
+    if logger is None:
+        logger = analytics.get_fallback_logger()
+    remove_workdir = workdir is None
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix="p4sta_benchmark_")
+    runs = []
+    try:
+        for num in packets:
+            file_id = "benchmark_" + str(num)
+            results_path = os.path.join(workdir, "results", file_id)
+            logger.info("Generating run of " + str(num) + " packets ...")
+            start = time.perf_counter()
+            generate_run(results_path, file_id, num, jitter, wraps, pauses,
+                         pause_length, seed)
+            run = {"packets": num, "jitter": jitter, "wraps": wraps,
+                   "pauses": pauses, "pause_length": pause_length,
+                   "generate_seconds": round(time.perf_counter() - start, 4),
+                   "stages": {}}
+            for stage in stages:
+                cmd = [sys.executable, os.path.realpath(__file__), "stage",
+                       stage, results_path, file_id]
+                if plot_workers is not None:
+                    cmd += ["--plot-workers", str(plot_workers)]
+                res = subprocess.run(cmd, cwd=dir_path, stdout=subprocess.PIPE)
+                if res.returncode != 0:
+                    run["stages"][stage] = {"error": "exit code " +
+                                            str(res.returncode)}
+                else:
+                    run["stages"][stage] = json.loads(
+                        res.stdout.decode().strip().split("\n")[-1])
+                logger.info(str(num) + " packets, " + stage + ": " +
+                            str(run["stages"][stage]))
+            shutil.rmtree(results_path)
+            runs.append(run)
+    finally:
+        if remove_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {"cpu_count": os.cpu_count(), "runs": runs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Benchmarks of the P4STA analytics.')
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    startup = subparsers.add_parser(
+        "startup", help='Import time of analytics without and with the '
+                        'plotting backend')
+    startup.add_argument(
+        '--repeat', help='Number of fresh interpreters per measurement',
+        type=int, default=STARTUP_REPEAT)
+    pipeline = subparsers.add_parser(
+        "pipeline", help='Wall time and peak memory of the analytics stages '
+                         'on synthetic runs')
+    pipeline.add_argument(
+        '--packets', help='Number of packets of the synthetic runs',
+        type=int, nargs="+", default=PIPELINE_PACKETS)
+    pipeline.add_argument(
+        '--stages', help='Stages to measure', nargs="+",
+        choices=PIPELINE_STAGES, default=PIPELINE_STAGES)
+    pipeline.add_argument(
+        '--jitter', help='Jitter of packet interval and latency in ns',
+        type=int, default=JITTER)
+    pipeline.add_argument(
+        '--wraps', help='Overflows of the stamper timestamps per run',
+        type=int, default=0)
+    pipeline.add_argument(
+        '--pauses', help='Pauses in the traffic per run',
+        type=int, default=0)
+    pipeline.add_argument(
+        '--pause-length', help='Length of a pause in ns',
+        type=int, default=PAUSE_LENGTH)
+    pipeline.add_argument(
+        '--seed', help='Seed of the synthetic runs', type=int, default=1)
+    pipeline.add_argument(
+        '--plot-workers', help='Number of processes rendering the graphs',
+        type=int, default=None)
+    pipeline.add_argument(
+        '--workdir', help='Directory for the synthetic runs (default: a '
+                          'temporary directory)', type=str, default=None)
+    # one stage in this interpreter, executed by benchmark_pipeline
+    stage = subparsers.add_parser("stage")
+    stage.add_argument('stage', choices=PIPELINE_STAGES)
+    stage.add_argument('results_path')
+    stage.add_argument('file_id')
+    stage.add_argument('--plot-workers', type=int, default=None)
+    parser.add_argument(
+        '--output', help='Path of the json report',
+        type=str, default="benchmark.json")
+    args = parser.parse_args()
+
+    if args.benchmark == "stage":
+        print(json.dumps(run_stage(args.stage, args.results_path,
+                                   args.file_id, args.plot_workers)))
+        sys.exit(0)
+    if args.benchmark == "startup":
+        report = {"startup": benchmark_startup(args.repeat)}
+    elif args.benchmark == "pipeline":
+        logger = analytics.get_fallback_logger()
+        report = {"pipeline": benchmark_pipeline(
+            args.packets, args.stages, args.jitter, args.wraps, args.pauses,
+            args.pause_length, args.seed, args.plot_workers, args.workdir,
+            logger)}
+    print(json.dumps(report, indent=4))
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
@@ -17,8 +17,13 @@
 
 import os
 import P4STA_utils
+import shutil
+import subprocess
+import tempfile
 import threading
 
+from analytics import analytics
+
 
 class AbstractExtHost:
     def __init__(self, host_cfg, dir_on_exec_host, logger):
@@ -35,6 +40,65 @@ class AbstractExtHost:
     def stop_external(self, file_id):
         return
 
+    # copies new chunk snapshots of the running capture to target_dir for
+    # the live analytics, returns the number of new files
+    # or None if the external host does not write chunks
+    def fetch_chunks(self, file_id, target_dir):
+        return None
+
+    # copies the chunk files (binary chunks, csv snapshots of older
+    # receivers) and chunks_<id>.json written by the receiver in
+    # ~/p4sta/externalHost/<dir_on_exec_host> since the last call to
+    # target_dir, returns the number of new files (chunk files are renamed
+    # by the receiver when complete, the copies are moved to target_dir only
+    # after scp finished so that the analytics never reads a partial copy)
+    def copy_chunks(self, file_id, target_dir):
+        cfg = P4STA_utils.read_current_cfg()
+        remote_path = "/home/" + cfg["ext_host_user"] + \
+                      "/p4sta/externalHost/" + self.dir_on_exec_host + "/"
+        names = P4STA_utils.execute_ssh(
+            cfg["ext_host_user"], cfg["ext_host_ssh"],
+            "cd " + remote_path + "; ls chunk_" + file_id + "_*.csv chunk_" +
+            file_id + "_*.bin chunks_" + file_id + ".json 2> /dev/null")
+        new_names = [name for name in names if name != "" and
+                     not os.path.isfile(os.path.join(target_dir, name))]
+        if len(new_names) == 0:
+            return 0
+        copy_dir = tempfile.mkdtemp(prefix=".copy_", dir=target_dir)
+        try:
+            result = subprocess.run(["scp"] + [
+                cfg["ext_host_user"] + "@" + cfg["ext_host_ssh"] + ":" +
+                remote_path + name for name in new_names] + [copy_dir],
+                stdout=subprocess.PIPE)
+            if result.returncode != 0:
+                # copied again by the next call
+                return 0
+            for name in new_names:
+                os.rename(os.path.join(copy_dir, name),
+                          os.path.join(target_dir, name))
+        finally:
+            shutil.rmtree(copy_dir, ignore_errors=True)
+        return len(new_names)
+
+    # receivers in spill mode keep only the current chunk in memory and
+    # write the full ones to binary chunk files: copies the remaining chunks
+    # to results/<id>/chunks and merges them into the result files, the
+    # folder is removed afterwards unless the live analytics uses it
+    def merge_spilled_chunks(self, file_id):
+        results_path = P4STA_utils.get_results_path(file_id)
+        chunk_path = os.path.join(results_path, analytics.LIVE_CHUNK_DIR)
+        live = os.path.isdir(chunk_path)
+        os.makedirs(chunk_path, exist_ok=True)
+        self.copy_chunks(file_id, chunk_path)
+        try:
+            analytics.merge_chunks(self.logger, results_path, file_id,
+                                   chunk_path)
+        except (OSError, ValueError) as e:
+            self.logger.error("Merging the chunks of run " + str(file_id) +
+                              " failed: " + str(e))
+        if not live:
+            shutil.rmtree(chunk_path, ignore_errors=True)
+
     def get_server_install_script(self, user_name, ip):
         lst = []
         lst.append('echo "====================================="')
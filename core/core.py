@@ -58,6 +58,14 @@ class P4staCore(rpyc.Service):
     # current state of stop_external_background thread
     stop_ext_bckgrd_thread = None
 
+    # live analytics of the running capture (analytics.LiveAnalytics),
+    # its polling thread and the event stopping it
+    live_analytics = None
+    live_analytics_thread = None
+    live_analytics_stop = None
+    # seconds between two fetches of chunk snapshots from the external host
+    live_analytics_interval = 2
+
     def get_project_path(self):
         return project_path
 
@@ -1087,10 +1095,18 @@ class P4staCore(rpyc.Service):
         # backup current config (e.g. ports, speed) to results directory of *CURRENT* run
         if not os.path.exists(self.get_current_results_path()):
             os.makedirs(self.get_current_results_path())
-        shutil.copy(project_path + "/data/config.json",
-                    os.path.join(self.get_current_results_path(),
-                                 "config_" + str(
-                                     P4staCore.measurement_id) + ".json"))
+        with open(project_path + "/data/config.json", "r") as f:
+            cfg = json.load(f)
+        # timestamp multi and max of the stamper to correct the timestamp
+        # overflows in the analytics, see analytics.read_timestamp_format
+        target_cfg = self.get_target_cfg()
+        if target_cfg is not None:
+            cfg["stamping_capabilities"] = target_cfg.get(
+                "stamping_capabilities", {})
+        with open(os.path.join(self.get_current_results_path(),
+                               "config_" + str(P4staCore.measurement_id) +
+                               ".json"), "w") as f:
+            json.dump(cfg, f, indent=4)
 
     def start_external(self):
         file_id = str(P4staCore.measurement_id)
@@ -1117,8 +1133,62 @@ class P4staCore(rpyc.Service):
                                                                    tsmax=tsmax)
         if errors != ():
             self.logger.error(errors)
+        elif running:
+            self.start_live_analytics(file_id, cfg)
         return running, errors
 
+    # folds the chunk snapshots of the external host into the results while
+    # capturing, so they are ready right after stopping
+    def start_live_analytics(self, file_id, cfg):
+        self.finish_live_analytics()
+        ext_host = self.get_current_extHost_obj()
+        live = analytics.LiveAnalytics(file_id, cfg["multicast"],
+                                       P4STA_utils.get_results_path(file_id))
+        os.makedirs(live.chunk_path, exist_ok=True)
+        if ext_host.fetch_chunks(file_id, live.chunk_path) is None:
+            os.rmdir(live.chunk_path)
+            return
+        stop = threading.Event()
+
+        def live_thread():
+            while not stop.wait(P4staCore.live_analytics_interval):
+                try:
+                    if ext_host.fetch_chunks(file_id, live.chunk_path) > 0:
+                        live.refresh(self.logger)
+                except Exception:
+                    self.logger.error(traceback.format_exc())
+
+        P4staCore.live_analytics = live
+        P4staCore.live_analytics_stop = stop
+        P4staCore.live_analytics_thread = threading.Thread(target=live_thread)
+        P4staCore.live_analytics_thread.start()
+
+    # stops fetching and folding chunks, called before the external host
+    # driver copies the last chunks so that no chunk is copied or read twice
+    def stop_live_analytics(self):
+        if P4staCore.live_analytics_thread is None:
+            return
+        P4staCore.live_analytics_stop.set()
+        P4staCore.live_analytics_thread.join()
+        P4staCore.live_analytics_thread = None
+
+    # stores the final results after the external host stopped if all chunks
+    # arrived, see analytics.LiveAnalytics
+    def finish_live_analytics(self):
+        self.stop_live_analytics()
+        live = P4staCore.live_analytics
+        if live is None:
+            return
+        P4staCore.live_analytics = None
+        try:
+            if live.finish(self.logger) is not None:
+                self.logger.info("Results of run " + live.file_id +
+                                 " calculated from live analytics.")
+        except Exception:
+            self.logger.error(traceback.format_exc())
+        # the chunks are a copy of the receiver files
+        shutil.rmtree(live.chunk_path, ignore_errors=True)
+
     # classic approach with blocking UI
     def stop_external(self):
         self.read_stamperice()
@@ -1126,7 +1196,9 @@ class P4staCore(rpyc.Service):
             if int(P4staCore.measurement_id) == -1:
                 raise Exception
 
+            self.stop_live_analytics()
             stoppable = self.get_current_extHost_obj().stop_external(P4staCore.measurement_id)
+            self.finish_live_analytics()
         except Exception:
             stoppable = False
 
@@ -1149,7 +1221,9 @@ class P4staCore(rpyc.Service):
                 if int(P4staCore.measurement_id) == -1:
                     raise Exception("Measurement ID is -1.")
                 slf.write_live_stats_json(live_stats_list)
+                slf.stop_live_analytics()
                 stoppable = slf.get_current_extHost_obj().stop_external(P4staCore.measurement_id)
+                slf.finish_live_analytics()
             except Exception:
                 stoppable = False
 
@@ -1202,6 +1276,32 @@ class P4staCore(rpyc.Service):
             analytics.find_unit(extH_results["avg_latency"])[0][
                 0]) + " " + str(
             analytics.find_unit(extH_results["avg_latency"])[1]) + "\n")
+        if extH_results.get("latency_percentiles"):
+            f.write("Latency percentiles:")
+            for name, value in extH_results["latency_percentiles"].items():
+                f.write(" " + name + ": " + str(
+                    analytics.find_unit(value)[0][0]) + " " + str(
+                    analytics.find_unit(value)[1]))
+            f.write("\n")
+        if extH_results.get("packet_order"):
+            order = extH_results["packet_order"]
+            f.write("Reordered packets: " + str(order["reordered_packets"]) +
+                    " (" + str(order["reordered_percent"]) + " %)" +
+                    " Max reorder extent: " +
+                    str(order["max_reorder_extent"]) +
+                    " Duplicate packets: " + str(order["duplicate_packets"]) +
+                    " Loss bursts: " + str(order["loss_bursts"]) +
+                    " (estimated lost packets: " +
+                    str(order["estimated_lost_packets"]) + ")\n")
+        for name, iat in extH_results.get("inter_arrival_times",
+                                          {}).items():
+            if not iat:
+                continue
+            f.write("Inter-arrival times " + name + ": avg " + str(
+                analytics.find_unit(iat["avg"])[0][0]) + " " + str(
+                analytics.find_unit(iat["avg"])[1]) + " CoV: " +
+                str(round(iat["cov"], 4)) + " Bursts: " + str(iat["bursts"]) +
+                " (max " + str(iat["max_burst_packets"]) + " packets)\n")
         f.write("Min IPDV: " + str(
             analytics.find_unit(extH_results["min_ipdv"])[0][0]) + " " + str(
             analytics.find_unit(extH_results["min_ipdv"])[1]) + "\n")
@@ -1231,6 +1331,21 @@ class P4staCore(rpyc.Service):
             extH_results["avg_packets_per_second"]) + "\n")
         f.close()
 
+    # compares the external host results of several runs, writes the
+    # comparison table and overlay graphs to results/comparisons/
+    def compare_external_results(self, measurement_ids):
+        runs = []
+        for measurement_id in measurement_ids:
+            cfg = self.read_result_cfg(str(measurement_id))
+            runs.append((str(measurement_id), cfg["multicast"],
+                         P4STA_utils.get_results_path(measurement_id)))
+        output_path = os.path.join(
+            project_path, "results", "comparisons",
+            str(measurement_ids[0]) + "_" + str(measurement_ids[-1]))
+        comparison = analytics.compare_runs(runs, output_path, self.logger)
+        comparison["path"] = output_path
+        return comparison
+
     def fetch_interface(self, ssh_user, ssh_ip, iface, namespace=""):
         return P4STA_utils.fetch_interface(ssh_user, ssh_ip, iface, namespace)
     
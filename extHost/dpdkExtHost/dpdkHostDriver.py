@@ -40,7 +40,11 @@ class ExtHostImpl(AbstractExtHost):
             cmd += " --vdev=eth_af_packet42,iface=" + self.cfg[
                 "ext_host_if"] + ",blocksz=4096,framesz=2048,framecnt=512," \
                                  "qpairs=1,qdisc_bypass=0"
-        cmd += " -- --name " + file_id + " > log.out 2> log.err < /dev/null &"
+        cmd += " -- --name " + file_id
+        if self.spill_enabled():
+            # full chunks are written to binary chunk files while capturing
+            cmd += " --spill " + str(self.host_cfg["spill_chunk_packets"])
+        cmd += " > log.out 2> log.err < /dev/null &"
         self.logger.debug(cmd)
         res = P4STA_utils.execute_ssh(self.cfg["ext_host_user"],
                                       self.cfg["ext_host_ssh"], cmd)
@@ -78,28 +82,36 @@ class ExtHostImpl(AbstractExtHost):
                         "/p4sta/externalHost/dpdkExtHost/raw_packet_counter_"
                         + file_id + ".csv",
                         P4STA_utils.get_results_path(file_id)])
-        subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
-            "ext_host_ssh"] + ":/home/" + self.cfg["ext_host_user"] +
-                        "/p4sta/externalHost/dpdkExtHost/packet_sizes_" +
-                        file_id + ".csv",
-                        P4STA_utils.get_results_path(file_id)])
-        subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
-            "ext_host_ssh"] + ":/home/" + self.cfg["ext_host_user"] +
-                        "/p4sta/externalHost/dpdkExtHost/timestamp1_list_" +
-                        file_id + ".csv",
-                        P4STA_utils.get_results_path(file_id)])
-        subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
-            "ext_host_ssh"] + ":/home/" + self.cfg["ext_host_user"] +
-                        "/p4sta/externalHost/dpdkExtHost/timestamp2_list_" +
-                        file_id + ".csv",
-                        P4STA_utils.get_results_path(file_id)])
+        if self.spill_enabled():
+            # the timestamps are only in the binary chunk files
+            self.merge_spilled_chunks(file_id)
+        else:
+            for name in ["packet_sizes", "timestamp1_list",
+                         "timestamp2_list"]:
+                subprocess.run(["scp", self.cfg["ext_host_user"] + "@" +
+                                self.cfg["ext_host_ssh"] + ":/home/" +
+                                self.cfg["ext_host_user"] +
+                                "/p4sta/externalHost/dpdkExtHost/" + name +
+                                "_" + file_id + ".csv",
+                                P4STA_utils.get_results_path(file_id)])
         time.sleep(1)
         P4STA_utils.execute_ssh(self.cfg["ext_host_user"],
                                 self.cfg["ext_host_ssh"],
                                 "cd /home/" + self.cfg["ext_host_user"] +
-                                "/p4sta/externalHost/dpdkExtHost/; rm *.csv")
+                                "/p4sta/externalHost/dpdkExtHost/; rm -f "
+                                "*.csv chunk_*.bin chunks_*.json")
         return True
 
+    def spill_enabled(self):
+        return self.host_cfg.get("spill_chunk_packets", 0) > 0
+
+    # binary chunk files written in spill mode for the live analytics, see
+    # AbstractExtHost.copy_chunks
+    def fetch_chunks(self, file_id, target_dir):
+        if not self.spill_enabled():
+            return None
+        return self.copy_chunks(file_id, target_dir)
+
     def get_server_install_script(self, user_name, ip):
         add_sudo_rights_str = "current_user=$USER\nadd_sudo_rights() {\n  " \
             "current_user=$USER\n  if " \
@@ -8,6 +8,8 @@
 #include <rte_lcore.h>
 #include <rte_mbuf.h>
 
+#include "spill.h"
+
 #define RX_RING_SIZE 1024
 #define TX_RING_SIZE 1024
 
@@ -45,6 +47,9 @@ static const struct rte_eth_conf port_conf_default = {
 };
 
 char* fname;
+// 0: timestamps kept in a list and written to csv files after capturing,
+// otherwise chunk size of the spill mode (see spill.h)
+uint32_t spill_packets = 0;
 
 /*
  * Initializes a given port using global settings and with the RX buffers
@@ -158,6 +163,9 @@ static void lcore_main(void) {
 	fprintf(status, "False");
 	fclose(status);
 
+	if (spill_packets > 0 && spill_start(fname, spill_packets) != 0)
+		rte_exit(EXIT_FAILURE, "Cannot start spill writer\n");
+
 	/* Run until the application is quit or killed. */
 	for (;;) {
 
@@ -220,7 +228,17 @@ static void lcore_main(void) {
                 }
 
 
-			    if(opt_pos != 0) {
+			    if(opt_pos != 0 && spill_packets > 0) {
+					uint16_t packet_size;
+					uint64_t t_stamp1 = 0;
+					uint64_t t_stamp2 = 0;
+					memcpy(&packet_size, &start[opt_pos], 2);
+					memcpy(&t_stamp1, &start[opt_pos+2+2], 6);
+					memcpy(&t_stamp2, &start[opt_pos+10+2], 6);
+					spill_add((be64toh(t_stamp1) >> 16) & 0x0000ffffffffffff,
+						(be64toh(t_stamp2) >> 16) & 0x0000ffffffffffff,
+						be16toh(packet_size));
+			    } else if(opt_pos != 0) {
 				    struct packet_data *p = (struct packet_data*) malloc(sizeof(struct packet_data));
 					// start at byte 0 for ext host stats => original packet size as 2byte value
 					memcpy( &(p->packet_size), &start[opt_pos], 2);
@@ -268,6 +286,11 @@ static void lcore_main(void) {
 	fprintf(raw_pkt_cntr, "%"PRIu64, raw_packet_counter);
 	fclose(raw_pkt_cntr);
 
+	if (spill_packets > 0) {
+		// only the last chunk is left, the timestamps are in the chunk files
+		printf("spilled packets: %"PRIu64"\n", spill_stop());
+	}
+
 	if (first != NULL){
 		//create files
 		strcpy(filename, "packet_sizes_");
@@ -324,10 +347,14 @@ int main(int argc, char *argv[]) {
 	argv += ret;
 	
 	printf("argc %u\n", argc);
-	if ((argc == 4) && (0 == strcmp( argv[2], "--name")) ) {
-        fname = argv[3];
-	} else
-        fname = "1234";
+	fname = "1234";
+	int i;
+	for (i = 1; i + 1 < argc; i++) {
+		if (0 == strcmp(argv[i], "--name"))
+			fname = argv[i + 1];
+		else if (0 == strcmp(argv[i], "--spill"))
+			spill_packets = strtoul(argv[i + 1], NULL, 10);
+	}
 
 
 	/* Creates a new mempool in memory to hold the mbufs. */
@@ -0,0 +1,163 @@
+#include <endian.h>
+#include <inttypes.h>
+#include <pthread.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#include "spill.h"
+
+struct spill_buffer {
+	uint64_t *t_stamp1;
+	uint64_t *t_stamp2;
+	uint16_t *packet_size;
+	uint32_t count;
+};
+
+static struct spill_buffer buffers[SPILL_BUFFERS];
+static struct spill_buffer *current;
+static uint32_t chunk_size;
+static const char *spill_name;
+static uint64_t spilled_packets;
+
+/* chunks handed to the writer and chunks written, buffers are used in turn */
+static uint64_t filled;
+static uint64_t written;
+static int stopping;
+static pthread_mutex_t lock = PTHREAD_MUTEX_INITIALIZER;
+static pthread_cond_t changed = PTHREAD_COND_INITIALIZER;
+static pthread_t writer;
+
+/* header "<8sH6sQQQ": magic, version, numpy dtype, count, multi and tsmax
+ * (0 = taken from the config by the analytics) */
+static void write_header(FILE *f, const char *dtype, uint32_t count) {
+	unsigned char header[40];
+	uint16_t version = htole16(1);
+	uint64_t count_le = htole64(count);
+
+	memset(header, 0, sizeof(header));
+	memcpy(header, "P4STABIN", 8);
+	memcpy(&header[8], &version, 2);
+	memcpy(&header[10], dtype, strlen(dtype));
+	memcpy(&header[16], &count_le, 8);
+	fwrite(header, 1, sizeof(header), f);
+}
+
+/* sections timestamp1, timestamp2 and packet sizes, renamed when complete so
+ * that the chunk is never read partially */
+static void write_chunk(struct spill_buffer *b, uint64_t number) {
+	char tmp_name[120];
+	char filename[140];
+	uint32_t i;
+
+	snprintf(tmp_name, sizeof(tmp_name), "chunk_%s.spill", spill_name);
+	snprintf(filename, sizeof(filename), "chunk_%s_%" PRIu64 ".bin",
+			spill_name, number);
+	FILE *f = fopen(tmp_name, "wb");
+	if (f == NULL) {
+		perror(tmp_name);
+		return;
+	}
+	for (i = 0; i < b->count; i++) {
+		b->t_stamp1[i] = htole64(b->t_stamp1[i]);
+		b->t_stamp2[i] = htole64(b->t_stamp2[i]);
+		b->packet_size[i] = htole16(b->packet_size[i]);
+	}
+	write_header(f, "<u8", b->count);
+	fwrite(b->t_stamp1, sizeof(uint64_t), b->count, f);
+	write_header(f, "<u8", b->count);
+	fwrite(b->t_stamp2, sizeof(uint64_t), b->count, f);
+	write_header(f, "<u2", b->count);
+	fwrite(b->packet_size, sizeof(uint16_t), b->count, f);
+	fclose(f);
+	if (rename(tmp_name, filename) != 0)
+		perror(filename);
+}
+
+static void *spill_writer(void *arg) {
+	(void) arg;
+	pthread_mutex_lock(&lock);
+	for (;;) {
+		while (written == filled && !stopping)
+			pthread_cond_wait(&changed, &lock);
+		if (written == filled)
+			break;
+		uint64_t number = written;
+		pthread_mutex_unlock(&lock);
+
+		write_chunk(&buffers[number % SPILL_BUFFERS], number);
+
+		pthread_mutex_lock(&lock);
+		written++;
+		pthread_cond_broadcast(&changed);
+	}
+	pthread_mutex_unlock(&lock);
+	return NULL;
+}
+
+int spill_start(const char *name, uint32_t chunk_packets) {
+	int i;
+
+	spill_name = name;
+	chunk_size = chunk_packets;
+	for (i = 0; i < SPILL_BUFFERS; i++) {
+		buffers[i].t_stamp1 = malloc(chunk_packets * sizeof(uint64_t));
+		buffers[i].t_stamp2 = malloc(chunk_packets * sizeof(uint64_t));
+		buffers[i].packet_size = malloc(chunk_packets * sizeof(uint16_t));
+		buffers[i].count = 0;
+		if (buffers[i].t_stamp1 == NULL || buffers[i].t_stamp2 == NULL ||
+				buffers[i].packet_size == NULL)
+			return -1;
+	}
+	current = &buffers[0];
+	return pthread_create(&writer, NULL, spill_writer, NULL);
+}
+
+/* hands the current chunk to the writer and waits for a free buffer */
+static void spill_chunk(void) {
+	pthread_mutex_lock(&lock);
+	spilled_packets += current->count;
+	filled++;
+	pthread_cond_broadcast(&changed);
+	while (filled - written >= SPILL_BUFFERS)
+		pthread_cond_wait(&changed, &lock);
+	pthread_mutex_unlock(&lock);
+	current = &buffers[filled % SPILL_BUFFERS];
+	current->count = 0;
+}
+
+void spill_add(uint64_t t_stamp1, uint64_t t_stamp2, uint16_t packet_size) {
+	current->t_stamp1[current->count] = t_stamp1;
+	current->t_stamp2[current->count] = t_stamp2;
+	current->packet_size[current->count] = packet_size;
+	current->count++;
+	if (current->count == chunk_size)
+		spill_chunk();
+}
+
+uint64_t spill_stop(void) {
+	char filename[140];
+	int i;
+
+	if (current->count > 0)
+		spill_chunk();
+	pthread_mutex_lock(&lock);
+	stopping = 1;
+	pthread_cond_broadcast(&changed);
+	pthread_mutex_unlock(&lock);
+	pthread_join(writer, NULL);
+
+	snprintf(filename, sizeof(filename), "chunks_%s.json", spill_name);
+	FILE *manifest = fopen(filename, "w");
+	if (manifest != NULL) {
+		fprintf(manifest, "{\"chunks\": %" PRIu64 ", \"packets\": %" PRIu64 "}",
+				filled, spilled_packets);
+		fclose(manifest);
+	}
+	for (i = 0; i < SPILL_BUFFERS; i++) {
+		free(buffers[i].t_stamp1);
+		free(buffers[i].t_stamp2);
+		free(buffers[i].packet_size);
+	}
+	return spilled_packets;
+}
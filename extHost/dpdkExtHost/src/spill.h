@@ -0,0 +1,20 @@
+#ifndef SPILL_H
+#define SPILL_H
+
+#include <stdint.h>
+
+/*
+ * Spill mode of the receiver: the timestamps are collected in chunks of
+ * chunk_packets, every full chunk is written by a writer thread to
+ * chunk_<name>_<number>.bin (binary format of analytics.py) while capturing.
+ * Only SPILL_BUFFERS chunks are in memory, the capture waits if the writer
+ * is that far behind.
+ */
+#define SPILL_BUFFERS 3
+
+int spill_start(const char *name, uint32_t chunk_packets);
+void spill_add(uint64_t t_stamp1, uint64_t t_stamp2, uint16_t packet_size);
+/* writes the last chunk and chunks_<name>.json, returns the packet count */
+uint64_t spill_stop(void);
+
+#endif
@@ -93,7 +93,8 @@ class ExtHostImpl(AbstractExtHost):
 
         call = "sudo /home/" + self.cfg["ext_host_user"] + \
                "/p4sta/externalHost/go/go/bin/go run extHostHTTPServer.go goUdpSocketExtHost.go --name " + file_id + \
-               " --ip_port " + self.cfg["ext_host_ip"] + ":41111 --ip " + self.cfg["ext_host_ip"]  # + " --multi " + str(multi) + " --tsmax " + str(tsmax)
+               " --ip_port " + self.cfg["ext_host_ip"] + ":41111 --ip " + self.cfg["ext_host_ip"] + \
+               " --spill_packets " + str(self.host_cfg.get("spill_chunk_packets", 0))  # + " --multi " + str(multi) + " --tsmax " + str(tsmax)
         args = "cd /home/" + self.cfg["ext_host_user"] + \
                "/p4sta/externalHost/go/; nohup " + call + \
                " > log.out 2> log.err < /dev/null &"
@@ -173,22 +174,26 @@ class ExtHostImpl(AbstractExtHost):
                         "/p4sta/externalHost/go/raw_packet_counter_" +
                         file_id + ".csv",
                         P4STA_utils.get_results_path(file_id)])
-        subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
-            "ext_host_ssh"] + ":/home/" + self.cfg[
-                            "ext_host_user"] +
-                        "/p4sta/externalHost/go/packet_sizes_" +
-                        file_id + ".csv",
-                        P4STA_utils.get_results_path(file_id)])
-        subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
-            "ext_host_ssh"] + ":/home/" + self.cfg["ext_host_user"] +
-                        "/p4sta/externalHost/go/timestamp1_list_" +
-                        file_id + ".csv",
-                        P4STA_utils.get_results_path(file_id)])
-        subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
-            "ext_host_ssh"] + ":/home/" + self.cfg["ext_host_user"] +
-                        "/p4sta/externalHost/go/timestamp2_list_" +
-                        file_id + ".csv",
-                        P4STA_utils.get_results_path(file_id)])
+        if self.spill_enabled():
+            # the timestamps are only in the binary chunk files
+            self.merge_spilled_chunks(file_id)
+        else:
+            subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
+                "ext_host_ssh"] + ":/home/" + self.cfg[
+                                "ext_host_user"] +
+                            "/p4sta/externalHost/go/packet_sizes_" +
+                            file_id + ".csv",
+                            P4STA_utils.get_results_path(file_id)])
+            subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
+                "ext_host_ssh"] + ":/home/" + self.cfg["ext_host_user"] +
+                            "/p4sta/externalHost/go/timestamp1_list_" +
+                            file_id + ".csv",
+                            P4STA_utils.get_results_path(file_id)])
+            subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
+                "ext_host_ssh"] + ":/home/" + self.cfg["ext_host_user"] +
+                            "/p4sta/externalHost/go/timestamp2_list_" +
+                            file_id + ".csv",
+                            P4STA_utils.get_results_path(file_id)])
         
         
         if self.EXT_HOST_T1_DUPLICATION:
@@ -212,10 +217,20 @@ class ExtHostImpl(AbstractExtHost):
         P4STA_utils.execute_ssh(self.cfg["ext_host_user"],
                 self.cfg["ext_host_ssh"],
                 "cd /home/" + self.cfg["ext_host_user"] +
-                "/p4sta/externalHost/go; rm *.csv")
+                "/p4sta/externalHost/go; rm -f *.csv chunk_*.bin chunks_*.json")
         
         return True
 
+    def spill_enabled(self):
+        return self.host_cfg.get("spill_chunk_packets", 0) > 0
+
+    # binary chunk files written in spill mode for the live analytics, see
+    # AbstractExtHost.copy_chunks
+    def fetch_chunks(self, file_id, target_dir):
+        if not self.spill_enabled():
+            return None
+        return self.copy_chunks(file_id, target_dir)
+
     def get_server_install_script(self, user_name, ip):
         add_sudo_rights_str = "current_user=$USER\nadd_sudo_rights() {\n  " \
             "current_user=$USER\n  if " \
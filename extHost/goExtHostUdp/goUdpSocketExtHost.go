@@ -1,6 +1,7 @@
 package main
 
 import (
+	"bufio"
 	"bytes"
 	"encoding/binary"
 	"encoding/csv"
@@ -11,6 +12,7 @@ import (
 	"os/signal"
 	"strconv"
 	"strings"
+	"sync"
 	"syscall"
 	"time"
 )
@@ -26,6 +28,94 @@ var save *bool
 var start_time time.Time
 var current_run_state string
 
+// spill mode: full chunks of spill_packets timestamps are handed to a
+// goroutine writing them to binary chunk files while capturing, only the
+// current chunk is kept in memory (see BIN_HEADER in analytics.py)
+var spill_packets *int
+var spill_queue chan spill_chunk
+var spill_done sync.WaitGroup
+var chunk_counter int
+var spilled_packets uint64
+
+type spill_chunk struct {
+	number       int
+	timestamp1   []uint64
+	timestamp2   []uint64
+	packet_sizes []uint16
+}
+
+// little-endian header of a binary section "<8sH6sQQQ": magic, version,
+// numpy dtype, count, multi and tsmax (0 = taken from the config)
+func write_binary_header(w *bufio.Writer, dtype string, count int) {
+	var header [40]byte
+	copy(header[0:8], "P4STABIN")
+	binary.LittleEndian.PutUint16(header[8:10], 1)
+	copy(header[10:16], dtype)
+	binary.LittleEndian.PutUint64(header[16:24], uint64(count))
+	w.Write(header[:])
+}
+
+// chunk_<name>_<number>.bin: the sections timestamp1, timestamp2 and
+// packet sizes, renamed when complete so that it is never read partially
+func write_spill_chunk(chunk spill_chunk) {
+	tmp_name := fmt.Sprintf("chunk_%s.spill", *name)
+	file, err := os.Create(tmp_name)
+	if err != nil {
+		fmt.Println(err)
+		return
+	}
+	w := bufio.NewWriter(file)
+	var value [8]byte
+	for _, list := range [][]uint64{chunk.timestamp1, chunk.timestamp2} {
+		write_binary_header(w, "<u8", len(list))
+		for _, v := range list {
+			binary.LittleEndian.PutUint64(value[:], v)
+			w.Write(value[:])
+		}
+	}
+	write_binary_header(w, "<u2", len(chunk.packet_sizes))
+	for _, v := range chunk.packet_sizes {
+		binary.LittleEndian.PutUint16(value[:2], v)
+		w.Write(value[:2])
+	}
+	if err := w.Flush(); err != nil {
+		fmt.Println(err)
+	}
+	file.Close()
+	if err := os.Rename(tmp_name, fmt.Sprintf("chunk_%s_%d.bin", *name, chunk.number)); err != nil {
+		fmt.Println(err)
+	}
+}
+
+func spill_writer() {
+	defer spill_done.Done()
+	for chunk := range spill_queue {
+		write_spill_chunk(chunk)
+	}
+}
+
+// hands the captured timestamps to the writer and starts a new chunk,
+// blocks if the writer is more than cap(spill_queue) chunks behind
+func spill_current_chunk() {
+	spill_queue <- spill_chunk{chunk_counter, timestamp1_list, timestamp2_list, packet_size_list}
+	chunk_counter++
+	spilled_packets += uint64(len(timestamp1_list))
+	timestamp1_list = make([]uint64, 0, *spill_packets)
+	timestamp2_list = make([]uint64, 0, *spill_packets)
+	packet_size_list = make([]uint16, 0, *spill_packets)
+}
+
+// last chunk and chunks_<name>.json as written for the live analytics
+func finish_spill() {
+	if len(timestamp1_list) > 0 {
+		spill_current_chunk()
+	}
+	close(spill_queue)
+	spill_done.Wait()
+	overwrite_textfile(fmt.Sprintf("chunks_%s.json", *name),
+		fmt.Sprintf("{\"chunks\": %d, \"packets\": %d}", chunk_counter, spilled_packets))
+}
+
 func write_csv_uint_list(filename string, to_write []uint64) {
 	file, err := os.Create(fmt.Sprintf("%s_%s.csv", filename, *name))
 	if err != nil {
@@ -110,14 +200,19 @@ func save_data(tstamp1_only *string) {
 				fmt.Println(err)
 			}
 
-			write_csv_uint_list("timestamp1_list", timestamp1_list)
-			write_csv_uint_list("timestamp2_list", timestamp2_list)
+			if *spill_packets > 0 {
+				// the timestamps are only in the chunk files
+				finish_spill()
+			} else {
+				write_csv_uint_list("timestamp1_list", timestamp1_list)
+				write_csv_uint_list("timestamp2_list", timestamp2_list)
 
-			var packet_size_list_64 []uint64
-			for i := 0; i < len(packet_size_list); i++ {
-				packet_size_list_64 = append(packet_size_list_64, uint64(packet_size_list[i]))
+				var packet_size_list_64 []uint64
+				for i := 0; i < len(packet_size_list); i++ {
+					packet_size_list_64 = append(packet_size_list_64, uint64(packet_size_list[i]))
+				}
+				write_csv_uint_list("packet_sizes", packet_size_list_64)
 			}
-			write_csv_uint_list("packet_sizes", packet_size_list_64)
 			overwrite_textfile("receiver_finished.log", "True")
 		}
 
@@ -138,12 +233,17 @@ func main() {
 	var ip = flag.String("ip", "0.0.0.0", "IP the IP socket binds to")
 	var tstamp1_only = flag.String("tstamp1only", "no", "Set to yes if only tstamp1 should be captured")
 	save = flag.Bool("save", true, "(Default true): If set to false, no csv files will be stored after sniffing")
+	spill_packets = flag.Int("spill_packets", 0, "(Default 0 = off): Write every chunk of this many timestamps to a binary chunk file while sniffing, not used with tstamp1only")
 	flag.Parse()
+	if *tstamp1_only == "yes" || !*save {
+		*spill_packets = 0
+	}
 
 	fmt.Println("name has value", *name)
 	fmt.Println("ip_port has value", *ip_port)
 	fmt.Println("ip has value", *ip)
 	fmt.Println("tstamp1_only has value", *tstamp1_only)
+	fmt.Println("spill_packets has value", *spill_packets)
 
 	current_run_state = "Starting HTTP API ..."
 	// in extHostHTTPServer, use "go run extHostHTTPServer.go goUdpSocketExtHost.go"
@@ -159,16 +259,16 @@ func main() {
 		overwrite_textfile("golangUdpSocketExtHost.log", "Started\n")
 	}
 
-	// signals handler for SIGTERM and SIGINT
-	c := make(chan os.Signal)
+	// signals handler for SIGTERM and SIGINT, closes stop_capture: the
+	// capture loop stops and saves the data itself, so the timestamp lists
+	// and the spill queue are only used by one goroutine
+	c := make(chan os.Signal, 1)
 	signal.Notify(c, os.Interrupt, syscall.SIGTERM)
 	signal.Notify(c, os.Interrupt, syscall.SIGINT)
+	stop_capture := make(chan struct{})
 	go func() {
 		<-c
-		save_data(tstamp1_only)
-		stop_api()
-		fmt.Println("GoLang Ext Host was running for ", time.Since(start_time), " seconds")
-		os.Exit(0) //success
+		close(stop_capture)
 	}()
 
 	udp_addr, err := net.ResolveUDPAddr("udp", strings.ReplaceAll(*ip_port, " ", ""))
@@ -192,12 +292,33 @@ func main() {
 	var padding = []byte{0, 0} // to fill 6 byte timestamp into uint64
 	packet_counter = 0
 
+	if *spill_packets > 0 {
+		// one chunk in the queue while the next one is captured
+		spill_queue = make(chan spill_chunk, 2)
+		spill_done.Add(1)
+		go spill_writer()
+	}
+
+	// closing the socket ends the blocking read of the capture loop
+	go func() {
+		<-stop_capture
+		conn.Close()
+	}()
+
 	current_run_state = "UP and listening"
 	// Read from UDP listener in endless loop
 	for {
 		var buf [100]byte
 		_, _, err := conn.ReadFromUDP(buf[0:]) //_, addr
 		if err != nil {
+			select {
+			case <-stop_capture:
+				save_data(tstamp1_only)
+				stop_api()
+				fmt.Println("GoLang Ext Host was running for ", time.Since(start_time), " seconds")
+				os.Exit(0) //success
+			default:
+			}
 			fmt.Println(err)
 
 			if *tstamp1_only == "yes" {
@@ -221,6 +342,9 @@ func main() {
 			timestamp1_list = append(timestamp1_list, timestamp1)
 			timestamp2_list = append(timestamp2_list, timestamp2)
 			packet_size_list = append(packet_size_list, paket_len_original)
+			if *spill_packets > 0 && len(timestamp1_list) >= *spill_packets {
+				spill_current_chunk()
+			}
 		}
 	}
 }
@@ -0,0 +1,232 @@
+# Copyright 2019-2022-present Ralf Kundel, Fridolin Siegmund, Kadir Eryigit
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+###############################################
+# Classic BPF socket filter for the python    #
+# receiver: only frames which packet_parser   #
+# could accept are copied to user space,      #
+# generated by the driver, attached by the    #
+# receiver (SO_ATTACH_FILTER)                 #
+###############################################
+import ctypes
+import socket
+import struct
+
+from packet_parser import TIMESTAMP_OPTION, ETHER_TYPE_IPV4, \
+    ETHER_TYPE_VLAN, ETHER_TYPE_PPPOE, PPPOE_HEADER_LEN, IP_PROTO_TCP, \
+    IP_PROTO_UDP, GTP_U_PORT, GTP_U_OFFSET, GTP_U_EXTENSION_LEN
+
+# linux/filter.h
+BPF_LD = 0x00
+BPF_LDX = 0x01
+BPF_ST = 0x02
+BPF_ALU = 0x04
+BPF_JMP = 0x05
+BPF_RET = 0x06
+BPF_MISC = 0x07
+BPF_W = 0x00
+BPF_H = 0x08
+BPF_B = 0x10
+BPF_ABS = 0x20
+BPF_IND = 0x40
+BPF_MEM = 0x60
+BPF_MSH = 0xa0
+BPF_ADD = 0x00
+BPF_RSH = 0x70
+BPF_JA = 0x00
+BPF_JEQ = 0x10
+BPF_JGT = 0x20
+BPF_JSET = 0x40
+BPF_K = 0x00
+BPF_TAX = 0x00
+BPF_TXA = 0x80
+SO_ATTACH_FILTER = 26
+SOL_PACKET = 263
+PACKET_STATISTICS = 6
+
+# VLAN tags in front of the ether type followed by the filter, frames with
+# more tags are dropped (the receiver parser accepts any number)
+MAX_VLANS = 2
+# bytes of an accepted frame passed to the socket
+ACCEPT_LEN = 262144
+# scratch memory slots of the filter
+MEM_PROTOCOL = 0
+MEM_TCP_OFFSET = 1
+TCP_MAX_OPTION_WORDS = 10
+
+
+# instruction (code, jt, jf, k), jt and jf are labels or None for the
+# next instruction
+def stmt(code, k=0):
+    return code, None, None, k
+
+
+def jump(code, k, jt, jf):
+    return code, jt, jf, k
+
+
+# replaces the labels ("label", name) by the jump offsets, returns the list
+# of (code, jt, jf, k)
+def assemble(items):
+    labels = {}
+    program = []
+    for item in items:
+        if item[0] == "label":
+            labels[item[1]] = len(program)
+        else:
+            program.append(item)
+    result = []
+    for i, (code, jt, jf, k) in enumerate(program):
+        offsets = []
+        for target in [jt, jf]:
+            offset = 0 if target is None else labels[target] - i - 1
+            if not 0 <= offset <= 255:
+                raise ValueError("BPF jump to " + str(target) +
+                                 " out of range")
+            offsets.append(offset)
+        if code == BPF_JMP | BPF_JA | BPF_K and jt is not None:
+            # unconditional jumps use k as offset
+            k, offsets = offsets[0], [0, 0]
+        result.append((code, offsets[0], offsets[1], k))
+    return result
+
+
+# socket filter accepting the IPv4 UDP/TCP frames with the timestamp
+# option at the offsets packet_parser.parse_packet checks (plain, up to
+# MAX_VLANS VLAN tags, PPPoE and GTP-U as enabled), the same checks and
+# length conditions, the timestamp values are checked by the receiver
+def generate_filter(gtp=False, pppoe=False):
+    items = []
+    l3_starts = []
+    for vlans in range(MAX_VLANS + 1):
+        offset = 12 + 4 * vlans
+        items.append(("label", "ether_" + str(vlans)))
+        items.append(stmt(BPF_LD | BPF_H | BPF_ABS, offset))
+        items.append(jump(BPF_JMP | BPF_JEQ | BPF_K, ETHER_TYPE_IPV4,
+                          "ipv4_" + str(offset + 2), None))
+        l3_starts.append(offset + 2)
+        if pppoe:
+            l3_start = offset + 2 + PPPOE_HEADER_LEN
+            items.append(jump(BPF_JMP | BPF_JEQ | BPF_K, ETHER_TYPE_PPPOE,
+                              "ipv4_" + str(l3_start), None))
+            l3_starts.append(l3_start)
+        if vlans < MAX_VLANS:
+            items.append(jump(BPF_JMP | BPF_JEQ | BPF_K, ETHER_TYPE_VLAN,
+                              "ether_" + str(vlans + 1), "drop"))
+        else:
+            items.append(jump(BPF_JMP | BPF_JA | BPF_K, 0, "drop", None))
+
+    # X = start of the l4 header, M[MEM_PROTOCOL] = ip protocol
+    for l3_start in sorted(set(l3_starts)):
+        items.append(("label", "ipv4_" + str(l3_start)))
+        items.append(stmt(BPF_LD | BPF_B | BPF_ABS, l3_start + 9))
+        items.append(stmt(BPF_ST, MEM_PROTOCOL))
+        items.append(stmt(BPF_LDX | BPF_B | BPF_MSH, l3_start))
+        items.append(stmt(BPF_MISC | BPF_TXA))
+        items.append(stmt(BPF_ALU | BPF_ADD | BPF_K, l3_start))
+        items.append(stmt(BPF_MISC | BPF_TAX))
+        items.append(jump(BPF_JMP | BPF_JA | BPF_K, 0, "gtp" if gtp else "l4",
+                          None))
+
+    if gtp:
+        # same 16 bytes as compared by packet_parser: 8 bytes of the outer
+        # UDP header equal to the 8 bytes after them with the value 2152
+        items.append(("label", "gtp"))
+        for offset, value in [(0, 0), (4, GTP_U_PORT), (8, 0),
+                              (12, GTP_U_PORT)]:
+            items.append(stmt(BPF_LD | BPF_W | BPF_IND, offset))
+            items.append(jump(BPF_JMP | BPF_JEQ | BPF_K, value, None, "l4"))
+        items.append(stmt(BPF_LD | BPF_B | BPF_IND, 16))
+        items.append(jump(BPF_JMP | BPF_JSET | BPF_K, 0x04, "gtp_extension",
+                          None))
+        items.append(stmt(BPF_MISC | BPF_TXA))
+        items.append(stmt(BPF_ALU | BPF_ADD | BPF_K, GTP_U_OFFSET))
+        items.append(stmt(BPF_MISC | BPF_TAX))
+        items.append(jump(BPF_JMP | BPF_JA | BPF_K, 0, "l4", None))
+        items.append(("label", "gtp_extension"))
+        items.append(stmt(BPF_MISC | BPF_TXA))
+        items.append(stmt(BPF_ALU | BPF_ADD | BPF_K,
+                          GTP_U_OFFSET + GTP_U_EXTENSION_LEN))
+        items.append(stmt(BPF_MISC | BPF_TAX))
+
+    items.append(("label", "l4"))
+    items.append(stmt(BPF_LD | BPF_MEM, MEM_PROTOCOL))
+    items.append(jump(BPF_JMP | BPF_JEQ | BPF_K, IP_PROTO_UDP, "udp", None))
+    items.append(jump(BPF_JMP | BPF_JEQ | BPF_K, IP_PROTO_TCP, "tcp",
+                      "drop"))
+
+    # loads beyond the end of the frame drop it, the first load is the
+    # minimum length of packet_parser
+    items.append(("label", "udp"))
+    items.append(stmt(BPF_LD | BPF_B | BPF_IND, 24))
+    items.append(stmt(BPF_LD | BPF_H | BPF_IND, 8))
+    items.append(jump(BPF_JMP | BPF_JEQ | BPF_K, TIMESTAMP_OPTION, None,
+                      "drop"))
+    items.append(stmt(BPF_LD | BPF_H | BPF_IND, 16))
+    items.append(jump(BPF_JMP | BPF_JEQ | BPF_K, 0, "accept", "drop"))
+
+    # option type at every 32 bit word of the tcp options
+    items.append(("label", "tcp"))
+    items.append(stmt(BPF_LD | BPF_B | BPF_IND, 36))
+    items.append(stmt(BPF_LD | BPF_B | BPF_IND, 12))
+    items.append(stmt(BPF_ALU | BPF_RSH | BPF_K, 4))
+    items.append(stmt(BPF_ST, MEM_TCP_OFFSET))
+    for word in range(TCP_MAX_OPTION_WORDS):
+        items.append(stmt(BPF_LD | BPF_MEM, MEM_TCP_OFFSET))
+        items.append(jump(BPF_JMP | BPF_JGT | BPF_K, 5 + word, None, "drop"))
+        items.append(stmt(BPF_LD | BPF_H | BPF_IND, 20 + 4 * word))
+        items.append(jump(BPF_JMP | BPF_JEQ | BPF_K, TIMESTAMP_OPTION,
+                          "accept", None))
+
+    items.append(("label", "drop"))
+    items.append(stmt(BPF_RET | BPF_K, 0))
+    items.append(("label", "accept"))
+    items.append(stmt(BPF_RET | BPF_K, ACCEPT_LEN))
+    return assemble(items)
+
+
+# "n,code jt jf k,..." like tcpdump -ddd, used as receiver argument
+def format_filter(program):
+    return ",".join([str(len(program))] + [
+        " ".join(str(value) for value in instruction)
+        for instruction in program])
+
+
+def parse_filter(text):
+    parts = text.split(",")
+    program = [tuple(int(value) for value in part.split())
+               for part in parts[1:]]
+    if len(program) != int(parts[0]) or \
+            any(len(instruction) != 4 for instruction in program):
+        raise ValueError("invalid BPF program: " + text)
+    return program
+
+
+# attaches the program to the socket, should happen before bind so that no
+# unfiltered frame is queued
+def attach_filter(sock, program):
+    instructions = (ctypes.c_ubyte * (8 * len(program))).from_buffer_copy(
+        b"".join(struct.pack("HBBI", *instruction)
+                 for instruction in program))
+    # struct sock_fprog: unsigned short len, struct sock_filter *filter
+    fprog = struct.pack("HL", len(program), ctypes.addressof(instructions))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+
+
+# (packets, drops) of the socket since the last call, packets are the
+# frames accepted by the filter including the dropped ones
+def socket_statistics(sock):
+    # struct tpacket_stats(_v3): tp_packets, tp_drops(, tp_freeze_q_cnt)
+    stats = sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 12)
+    return struct.unpack_from("II", stats)
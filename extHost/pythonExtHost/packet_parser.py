@@ -0,0 +1,118 @@
+# Copyright 2019-2022-present Ralf Kundel, Fridolin Siegmund, Kadir Eryigit
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+###############################################
+# Parser of the P4STA timestamps for the      #
+# python receiver, works on the received      #
+# bytes without copying them                  #
+###############################################
+import struct
+
+ETHER_TYPE = struct.Struct("!H")
+# 16bit 0x0f10, 48bit tstamp1, 16bit empty, 48bit tstamp2
+TIMESTAMPS = struct.Struct("!HHIHHI")
+TIMESTAMP_OPTION = 0x0f10
+
+ETHER_TYPE_IPV4 = 0x0800
+ETHER_TYPE_VLAN = 0x8100
+ETHER_TYPE_PPPOE = 0x8864
+PPPOE_HEADER_LEN = 8
+IP_PROTO_TCP = 6
+IP_PROTO_UDP = 17
+GTP_U_PORT = 2152
+# outer UDP (8) + GTP-U (8) + inner IPv4 (20) header
+GTP_U_OFFSET = 36
+GTP_U_EXTENSION_LEN = 8
+
+
+# returns (timestamp1, timestamp2) as stamped (not multiplied) if the first
+# n bytes of buf are a P4STA timestamped packet, None otherwise;
+# buf is e.g. the bytearray the packet was received into with recv_into
+def parse_packet(buf, n, gtp=False, pppoe=False):
+    offset = 12
+    l3_start = -1
+    while offset + 2 <= n:
+        ether_type = ETHER_TYPE.unpack_from(buf, offset)[0]
+        if pppoe and ether_type == ETHER_TYPE_PPPOE:
+            l3_start = offset + 2 + PPPOE_HEADER_LEN
+            break
+        elif ether_type == ETHER_TYPE_VLAN:
+            # vlan tag is 4 byte, the last two byte are the ether type
+            offset += 4
+        elif ether_type == ETHER_TYPE_IPV4:
+            l3_start = offset + 2
+            break
+        else:
+            break
+    # ip header up to the protocol field
+    if l3_start < 0 or l3_start + 10 > n:
+        return None
+
+    # ip header length in 32 bit words
+    ihl = buf[l3_start] & 0x0f
+    ipv4_protocol = buf[l3_start + 9]
+    l4_start = l3_start + ihl * 4
+
+    if gtp:
+        # same fields as compared by the hex string parser of earlier
+        # versions: 8 bytes from the outer UDP header and the 8 bytes after
+        if l4_start >= n:
+            return None
+        if l4_start + 16 <= n:
+            view = memoryview(buf)
+            if view[l4_start:l4_start + 8] == view[l4_start + 8:
+                                                   l4_start + 16] and \
+                    int.from_bytes(view[l4_start:l4_start + 8],
+                                   "big") == GTP_U_PORT:
+                if l4_start + 16 >= n:
+                    return None
+                l4_start += GTP_U_OFFSET
+                # extension header flag
+                if buf[l4_start - GTP_U_OFFSET + 16] & 0x04:
+                    l4_start += GTP_U_EXTENSION_LEN
+
+    if ipv4_protocol == IP_PROTO_TCP and n > l4_start + 36:
+        # tcp header length in 32 bit words, at least 5
+        options_len = (buf[l4_start + 12] >> 4) - 5
+        options_start = l4_start + 20
+        options_end = min(options_start + options_len * 4, n)
+        # only valid locations (32 bit aligned) for the option type
+        for option in range(options_start, options_start + options_len * 4,
+                            4):
+            if option + 2 <= options_end and \
+                    ETHER_TYPE.unpack_from(buf, option)[0] == \
+                    TIMESTAMP_OPTION:
+                if option + TIMESTAMPS.size > options_end:
+                    # cut by the end of the options (malformed packet), the
+                    # remaining bytes like the hex string parser
+                    return truncated_timestamps(buf, option, options_end)
+                _, ts1_high, ts1_low, _, ts2_high, ts2_low = \
+                    TIMESTAMPS.unpack_from(buf, option)
+                return (ts1_high << 32) | ts1_low, (ts2_high << 32) | ts2_low
+    # 14 byte eth + 20 IPv4 + 8 UDP (16 byte opt in payload!) = 42 byte
+    elif ipv4_protocol == IP_PROTO_UDP and n > l4_start + 24:
+        # only timestamps directly after the UDP header with empty field 0
+        option_type, ts1_high, ts1_low, empty, ts2_high, ts2_low = \
+            TIMESTAMPS.unpack_from(buf, l4_start + 8)
+        if option_type == TIMESTAMP_OPTION and empty == 0:
+            return (ts1_high << 32) | ts1_low, (ts2_high << 32) | ts2_low
+    return None
+
+
+# timestamps of an option cut at end, None if a timestamp has no byte left
+def truncated_timestamps(buf, option, end):
+    if option + 10 >= end:
+        return None
+    return int.from_bytes(buf[option + 2:min(option + 8, end)], "big"), \
+        int.from_bytes(buf[option + 10:end], "big")
@@ -0,0 +1,132 @@
+# Copyright 2019-2022-present Ralf Kundel, Fridolin Siegmund, Kadir Eryigit
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+###############################################
+# PACKET_MMAP (TPACKET_V3) receive ring for   #
+# the python receiver: the kernel fills whole #
+# blocks of frames which are walked in the    #
+# shared memory without a syscall per packet  #
+###############################################
+import mmap
+import select
+import socket
+import struct
+
+from bpf_filter import attach_filter
+
+# linux/if_packet.h
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+ETH_P_ALL = 3
+
+# struct tpacket_req3: block_size, block_nr, frame_size, frame_nr,
+# retire_blk_tov, sizeof_priv, feature_req_word
+TPACKET_REQ3 = struct.Struct("IIIIIII")
+# struct tpacket_block_desc: version, offset_to_priv and the start of
+# struct tpacket_hdr_v1: block_status, num_pkts, offset_to_first_pkt
+BLOCK_DESC = struct.Struct("IIIII")
+BLOCK_STATUS_OFFSET = 8
+# struct tpacket3_hdr: tp_next_offset, tp_sec, tp_nsec, tp_snaplen, tp_len,
+# tp_status, tp_mac
+FRAME_HDR = struct.Struct("IIIIIIH")
+
+# only used by the kernel to check the ring size in TPACKET_V3, frames are
+# packed into the blocks with their real length
+FRAME_SIZE = 2048
+# a block is handed to the receiver at the latest after this time (ms)
+# even if it is not full, keeps the ring responsive at low packet rates
+BLOCK_TIMEOUT = 100
+
+
+class PacketRing:
+    # raises OSError if the kernel does not support the ring (or the
+    # interface does not exist) and ValueError for an invalid block size,
+    # bpf is a socket filter program attached before the first frame
+    def __init__(self, interface, block_size, block_count, bpf=None):
+        if block_size <= 0 or block_size % mmap.PAGESIZE != 0 or \
+                block_size % FRAME_SIZE != 0:
+            raise ValueError("ring block size " + str(block_size) +
+                             " is not a multiple of the page size " +
+                             str(mmap.PAGESIZE) + " (and " +
+                             str(FRAME_SIZE) + ")")
+        if block_count <= 0:
+            raise ValueError("ring block count must be positive")
+        self.block_size = block_size
+        self.block_count = block_count
+        self.current = 0
+        self.sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW,
+                                  socket.htons(ETH_P_ALL))
+        try:
+            if bpf is not None:
+                attach_filter(self.sock, bpf)
+            self.sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+            self.sock.setsockopt(SOL_PACKET, PACKET_RX_RING, TPACKET_REQ3.pack(
+                block_size, block_count, FRAME_SIZE,
+                block_size // FRAME_SIZE * block_count, BLOCK_TIMEOUT, 0, 0))
+            self.ring = mmap.mmap(self.sock.fileno(), block_size * block_count,
+                                  mmap.MAP_SHARED,
+                                  mmap.PROT_READ | mmap.PROT_WRITE)
+            self.sock.bind((interface, 0))
+        except Exception:
+            self.sock.close()
+            raise
+        # frames are parsed in slices of this view, nothing is copied
+        self.view = memoryview(self.ring)
+        self.poll = select.poll()
+        self.poll.register(self.sock.fileno(), select.POLLIN | select.POLLERR)
+
+    # start offset of the next block handed over by the kernel, None if no
+    # block was retired within timeout seconds
+    def wait_block(self, timeout=0.1):
+        block = self.current * self.block_size
+        if BLOCK_DESC.unpack_from(self.ring, block)[2] & TP_STATUS_USER:
+            return block
+        self.poll.poll(timeout * 1000)
+        if BLOCK_DESC.unpack_from(self.ring, block)[2] & TP_STATUS_USER:
+            return block
+        return None
+
+    # (start, snaplen, len) of every frame in the block: the ethernet frame
+    # is view[start:start + snaplen], len is the length on the wire
+    def frames(self, block):
+        return block_frames(self.ring, block)
+
+    # returns the block to the kernel, the next one is waited for
+    def release(self, block):
+        struct.pack_into("I", self.ring, block + BLOCK_STATUS_OFFSET,
+                         TP_STATUS_KERNEL)
+        self.current = (self.current + 1) % self.block_count
+
+    def close(self):
+        self.view.release()
+        self.ring.close()
+        self.sock.close()
+
+
+# walks the frames of a retired TPACKET_V3 block starting at offset block of
+# ring, see PacketRing.frames
+def block_frames(ring, block):
+    num_pkts, first = BLOCK_DESC.unpack_from(ring, block)[3:5]
+    frames = []
+    frame = block + first
+    for i in range(num_pkts):
+        next_offset, _, _, snaplen, length, _, mac = FRAME_HDR.unpack_from(
+            ring, frame)
+        frames.append((frame + mac, snaplen, length))
+        frame += next_offset
+    return frames
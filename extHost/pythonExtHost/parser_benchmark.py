@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# Copyright 2019-2022-present Ralf Kundel, Fridolin Siegmund, Kadir Eryigit
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+###############################################
+# Packets per second of the python receiver   #
+# parser replaying a pcap file (or synthetic  #
+# packets), compared to the hex string parser #
+# of earlier versions                         #
+# ./parser_benchmark.py --pcap capture.pcap   #
+###############################################
+import argparse
+import json
+import random
+import struct
+import time
+
+from packet_parser import parse_packet
+
+PCAP_HEADER = struct.Struct("IHHiIII")
+PCAP_RECORD = struct.Struct("IIII")
+PCAP_MAGICS = [0xa1b2c3d4, 0xa1b23c4d]
+SNAPLEN = 4096
+
+
+# hex string parser of earlier receiver versions (s.recv(4096).hex()),
+# reference for the tests and the benchmark; returns (timestamp1,
+# timestamp2) as stamped or None
+def parse_packet_hex(message, gtp=False, pppoe=False):
+    try:
+        ether_type = message[24:28]
+        vlan_offset = 0
+        l3_start = -1
+        while True:
+            if pppoe and ether_type == "8864":
+                l3_start = 28 + 16 + vlan_offset
+                break
+            elif ether_type == "8100":
+                vlan_offset += 8
+                ether_type = message[24 + vlan_offset:28 + vlan_offset]
+                continue
+            elif ether_type == "0800":
+                l3_start = 28 + vlan_offset
+                break
+            else:
+                break
+        if l3_start < 0:
+            return None
+        ihl = int(message[l3_start + 1], 16)
+        ipv4_protocol = int(message[l3_start + 18:l3_start + 20], 16)
+        l4_start = l3_start + ihl * 4 * 2
+        if gtp:
+            udp_src_port = message[l4_start:l4_start + 16]
+            udp_dst_port = message[l4_start + 16:l4_start + 32]
+            if (udp_src_port == udp_dst_port) and \
+                    (int(udp_src_port, 16) == 2152):
+                add_offset = 72
+                if int(message[l4_start + 33:l4_start + 34], 16) & 0x04:
+                    add_offset = add_offset + 16
+                l4_start = l4_start + add_offset
+    except Exception:
+        return None
+    if ipv4_protocol == 6 and len(message) > 72 + l4_start:
+        try:
+            tcp_options_len = int(message[l4_start + 24], 16) - 5
+            tcp_options = message[l4_start + 40:
+                                  l4_start + 40 + tcp_options_len * 8]
+            for x in range(tcp_options_len):
+                if tcp_options[x * 8:x * 8 + 4] == "0f10":
+                    ts_start = x * 8
+                    return int(tcp_options[ts_start + 4:ts_start + 16], 16), \
+                        int(tcp_options[ts_start + 20:ts_start + 32], 16)
+        except Exception:
+            return None
+    elif ipv4_protocol == 17 and len(message) > 48 + l4_start:
+        try:
+            ts_start = l4_start + 16
+            timestamps_udp = message[ts_start:ts_start + 32]
+            if timestamps_udp[0:4] == "0f10" and \
+                    int(timestamps_udp[16:20], 16) == 0:
+                return int(timestamps_udp[4:16], 16), \
+                    int(timestamps_udp[20:], 16)
+        except Exception:
+            return None
+    return None
+
+
+# frames of a pcap file (classic format, micro or nanosecond timestamps,
+# both byte orders), truncated to the receive buffer size like recv(4096)
+def read_pcap(path):
+    packets = []
+    with open(path, "rb") as f:
+        header = f.read(PCAP_HEADER.size)
+        byte_order = "<"
+        if struct.unpack("<I", header[:4])[0] not in PCAP_MAGICS:
+            byte_order = ">"
+            if struct.unpack(">I", header[:4])[0] not in PCAP_MAGICS:
+                raise ValueError(path + " is not a pcap file")
+        record = struct.Struct(byte_order + PCAP_RECORD.format)
+        while True:
+            raw = f.read(record.size)
+            if len(raw) < record.size:
+                break
+            captured = record.unpack(raw)[2]
+            packets.append(f.read(captured)[:SNAPLEN])
+    return packets
+
+
+# P4STA timestamps (0x0f10, 48bit timestamp1, 16bit 0, 48bit timestamp2)
+def timestamp_option(timestamp1, timestamp2):
+    return struct.pack("!HHIHHI", 0x0f10, timestamp1 >> 32,
+                       timestamp1 & 0xffffffff, 0, timestamp2 >> 32,
+                       timestamp2 & 0xffffffff)
+
+
+# ethernet frame with an IPv4 header, vlans: number of 802.1Q tags
+def ipv4_frame(protocol, l4, vlans=0, pppoe=False):
+    eth = b"\x00\x11\x22\x33\x44\x55" + b"\x66\x77\x88\x99\xaa\xbb"
+    eth += b"\x81\x00\x00\x01" * vlans
+    if pppoe:
+        # pppoe session header and ppp protocol ipv4
+        eth += b"\x88\x64\x11\x00\x00\x01" + struct.pack(
+            "!H", 20 + len(l4) + 2) + b"\x00\x21"
+    else:
+        eth += b"\x08\x00"
+    ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(l4), 0, 0, 64,
+                     protocol, 0, b"\x0a\x00\x00\x01", b"\x0a\x00\x00\x02")
+    return eth + ip + l4
+
+
+def udp_packet(timestamp1, timestamp2, payload=64, vlans=0, pppoe=False):
+    data = timestamp_option(timestamp1, timestamp2) + bytes(payload)
+    udp = struct.pack("!HHHH", 5000, 5001, 8 + len(data), 0) + data
+    return ipv4_frame(17, udp, vlans, pppoe)
+
+
+# the timestamp option is preceded by options_before 4 byte NOP words
+def tcp_packet(timestamp1, timestamp2, payload=64, options_before=0,
+               vlans=0):
+    options = b"\x01\x01\x01\x01" * options_before + \
+        timestamp_option(timestamp1, timestamp2)
+    data_offset = 5 + len(options) // 4
+    tcp = struct.pack("!HHIIBBHHH", 5000, 5001, 1, 0, data_offset << 4,
+                      0x18, 1024, 0, 0) + options + bytes(payload)
+    return ipv4_frame(6, tcp, vlans)
+
+
+# mix of stamped UDP and TCP packets of the sizes of a load test and
+# unstamped traffic (ARP, plain UDP)
+def synthetic_packets(num, seed=1):
+    rnd = random.Random(seed)
+    arp = b"\xff" * 6 + b"\x66\x77\x88\x99\xaa\xbb\x08\x06" + bytes(28)
+    packets = []
+    timestamp = 1000000000
+    for i in range(num):
+        timestamp += rnd.randint(500, 1500)
+        kind = rnd.random()
+        if kind < 0.05:
+            packets.append(arp)
+        elif kind < 0.6:
+            packets.append(udp_packet(timestamp, timestamp + 25000,
+                                      rnd.choice([0, 400, 1400])))
+        else:
+            packets.append(tcp_packet(timestamp, timestamp + 25000,
+                                      rnd.choice([0, 400, 1400]),
+                                      rnd.randint(0, 2)))
+    return packets
+
+
+# packets per second of both parsers over the packets (repeated), the
+# receive is simulated by a copy into the buffer (recv_into) or a new bytes
+# object converted to hex (recv().hex())
+def benchmark(packets, repeat=3, gtp=False, pppoe=False):
+    results = {}
+    buf = bytearray(SNAPLEN)
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        for packet in packets:
+            n = len(packet)
+            buf[:n] = packet
+            parse_packet(buf, n, gtp, pppoe)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    results["recv_into_struct_pps"] = round(len(packets) / best)
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        for packet in packets:
+            parse_packet_hex(bytes(packet).hex(), gtp, pppoe)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    results["hex_string_pps"] = round(len(packets) / best)
+    results["speedup"] = round(results["recv_into_struct_pps"] /
+                               results["hex_string_pps"], 2)
+    results["packets"] = len(packets)
+    results["stamped_packets"] = sum(
+        1 for packet in packets
+        if parse_packet(packet, len(packet), gtp, pppoe) is not None)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Packets per second of the python receiver parser')
+    parser.add_argument('--pcap', help='pcap file to replay (default: '
+                                       'synthetic P4STA traffic)',
+                        type=str, default=None)
+    parser.add_argument('--packets', help='Number of synthetic packets',
+                        type=int, default=200000)
+    parser.add_argument('--repeat', help='Replays of the packets, the '
+                                         'fastest one counts',
+                        type=int, default=3)
+    parser.add_argument("--gtp", help="Enables GTP-U parsing",
+                        action='store_true')
+    parser.add_argument("--pppoe", help="Enables PPPoE parsing",
+                        action='store_true')
+    args = parser.parse_args()
+
+    if args.pcap is not None:
+        packets = read_pcap(args.pcap)
+    else:
+        packets = synthetic_packets(args.packets)
+    print(json.dumps(benchmark(packets, args.repeat, args.gtp, args.pppoe),
+                     indent=4))
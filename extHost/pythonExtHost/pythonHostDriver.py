@@ -12,13 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import os
+import sys
 import time
 import subprocess
 import P4STA_utils
 
 from abstract_extHost import AbstractExtHost
+from analytics import analytics
 
 dir_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(dir_path)
+import bpf_filter
 
 
 class ExtHostImpl(AbstractExtHost):
@@ -48,6 +52,10 @@ class ExtHostImpl(AbstractExtHost):
             "/p4sta/externalHost/python; sudo killall external_host_python_receiver")
 
         input = ["scp", ext_py_dir + "/pythonRawSocketExtHost.py",
+                 ext_py_dir + "/packet_parser.py",
+                 ext_py_dir + "/packet_ring.py",
+                 ext_py_dir + "/bpf_filter.py",
+                 ext_py_dir + "/result_writer.py",
                  self.cfg["ext_host_user"] + "@" + self.cfg[
                      "ext_host_ssh"] + ":/home/" + self.cfg[
                      "ext_host_user"] + "/p4sta/externalHost/python"]
@@ -76,8 +84,33 @@ class ExtHostImpl(AbstractExtHost):
         enable_pppoe = ""
         if ("enable_pppoe" in self.host_cfg and self.host_cfg["enable_pppoe"] == True):
             enable_pppoe = " --pppoe"
+        # chunk snapshots for the live analytics, see fetch_chunks; in spill
+        # mode the chunks are binary and not kept in memory
+        chunks = " --chunk-packets " + str(
+            self.host_cfg.get("live_chunk_packets", 0)) + \
+            " --chunk-seconds " + str(
+            self.host_cfg.get("live_chunk_seconds", 0)) + \
+            " --spill-packets " + str(
+            self.host_cfg.get("spill_chunk_packets", 0))
+        # optional PACKET_MMAP receive ring (e.g. 64 blocks), 0 blocks for the
+        # default socket mode
+        ring = " --ring-blocks " + str(
+            self.host_cfg.get("ring_blocks", 0)) + \
+            " --ring-block-size " + str(
+            self.host_cfg.get("ring_block_size", 1048576))
+        # optional socket filter in the kernel for the parser variant of the
+        # flags, other frames are not copied to the receiver. With the filter
+        # the raw packet counter only counts the timestamped frames (and the
+        # kernel drops) instead of all frames of the interface, and frames
+        # with more than bpf_filter.MAX_VLANS VLAN tags are dropped
+        bpf = ""
+        if self.host_cfg.get("bpf_filter", False):
+            bpf = " --bpf '" + bpf_filter.format_filter(
+                bpf_filter.generate_filter(
+                    self.host_cfg.get("enable_gtp", False) == True,
+                    self.host_cfg.get("enable_pppoe", False) == True)) + "'"
         call = "sudo -E ./pythonRawSocketExtHost.py --name " + file_id + \
-               " --interface " + self.cfg["ext_host_if"] + " --multi " + str(multi) + " --tsmax " + str(tsmax) + enable_gtpu + enable_pppoe
+               " --interface " + self.cfg["ext_host_if"] + " --multi " + str(multi) + " --tsmax " + str(tsmax) + enable_gtpu + enable_pppoe + chunks + ring + bpf
         args = "cd /home/" + self.cfg["ext_host_user"] + \
                "/p4sta/externalHost/python/; nohup " + call + \
                " > log.out 2> log.err < /dev/null &"
@@ -122,37 +155,40 @@ class ExtHostImpl(AbstractExtHost):
             result = res.decode()
             if result.find("1") > -1 or c > 59:
                 # if 1 is found by check_extH_status.sh at external host
-                # external Host has finished saving csv files
+                # external Host has finished saving the result files
                 break
-        subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
-            "ext_host_ssh"] + ":/home/" + self.cfg["ext_host_user"] +
-                        "/p4sta/externalHost/python/raw_packet_counter_" +
-                        file_id + ".csv",
-                        P4STA_utils.get_results_path(file_id)])
-        subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
-            "ext_host_ssh"] + ":/home/" + self.cfg[
-                            "ext_host_user"] +
-                        "/p4sta/externalHost/python/packet_sizes_" +
-                        file_id + ".csv",
-                        P4STA_utils.get_results_path(file_id)])
-        subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
-            "ext_host_ssh"] + ":/home/" + self.cfg["ext_host_user"] +
-                        "/p4sta/externalHost/python/timestamp1_list_" +
-                        file_id + ".csv",
-                        P4STA_utils.get_results_path(file_id)])
-        subprocess.run(["scp", self.cfg["ext_host_user"] + "@" + self.cfg[
-            "ext_host_ssh"] + ":/home/" + self.cfg["ext_host_user"] +
-                        "/p4sta/externalHost/python/timestamp2_list_" +
-                        file_id + ".csv",
-                        P4STA_utils.get_results_path(file_id)])
+        # binary result files (see BIN_HEADER in analytics.py)
+        remote_path = "/home/" + self.cfg["ext_host_user"] + \
+                      "/p4sta/externalHost/python/"
+        if self.host_cfg.get("spill_chunk_packets", 0) > 0:
+            # the timestamps are only in the chunks
+            names = ["raw_packet_counter"]
+            self.merge_spilled_chunks(file_id)
+        else:
+            names = ["raw_packet_counter", "packet_sizes", "timestamp1_list",
+                     "timestamp2_list"]
+            # last chunks for the live analytics if it is running
+            chunk_path = os.path.join(P4STA_utils.get_results_path(file_id),
+                                      analytics.LIVE_CHUNK_DIR)
+            if os.path.isdir(chunk_path):
+                self.fetch_chunks(file_id, chunk_path)
+        subprocess.run(["scp"] + [
+            self.cfg["ext_host_user"] + "@" + self.cfg["ext_host_ssh"] + ":" +
+            remote_path + name + "_" + file_id + ".bin" for name in names] + [
+            P4STA_utils.get_results_path(file_id)])
 
         P4STA_utils.execute_ssh(self.cfg["ext_host_user"],
                                 self.cfg["ext_host_ssh"],
                                 "cd /home/" + self.cfg["ext_host_user"] +
-                                "/p4sta/externalHost/python; rm *.csv")
+                                "/p4sta/externalHost/python; rm -f *.csv *.bin chunks_*.json")
 
         return True
 
+    # chunk snapshots (or binary chunks in spill mode) for the live
+    # analytics, see AbstractExtHost.copy_chunks
+    def fetch_chunks(self, file_id, target_dir):
+        return self.copy_chunks(file_id, target_dir)
+
     def get_server_install_script(self, user_name, ip):
         add_sudo_rights_str = "current_user=$USER\nadd_sudo_rights() {\n  " \
             "current_user=$USER\n  if " \
@@ -13,16 +13,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import argparse
-import csv
+from array import array
+import json
+import os
+import queue
 import setproctitle
 import signal
 import socket
 from socket import AF_PACKET, SOCK_RAW, htons
-import sys
+import threading
 import time
-import traceback
 
-csv.field_size_limit(sys.maxsize)
+from bpf_filter import attach_filter, parse_filter, socket_statistics
+from packet_parser import parse_packet
+from packet_ring import PacketRing
+from result_writer import write_values
 
 setproctitle.setproctitle("external_host_python_receiver")
 
@@ -40,21 +45,66 @@ parser.add_argument(
 parser.add_argument(
     '--tsmax',
     help='Maximal possible value of the timestamps '
-         '(e.g. 281474976710655 for whole 48bit)',
+         '(e.g. 281474976710655 for whole 48bit), the overflows are '
+         'corrected by the analytics',
     type=str, action="store", required=True)
 parser.add_argument("--gtp", help="Enables GTP-U Parsing in Ext Host", action='store_true')
 parser.add_argument("--pppoe", help="Enables PPPoE Parsing in Ext Host", action='store_true')
+parser.add_argument(
+    '--chunk-packets',
+    help='Writes a chunk snapshot for live analytics every n packets '
+         '(0 = disabled)',
+    type=int, action="store", default=0)
+parser.add_argument(
+    '--chunk-seconds',
+    help='Writes a chunk snapshot for live analytics every n seconds '
+         '(0 = disabled)',
+    type=float, action="store", default=0)
+parser.add_argument(
+    '--ring-blocks',
+    help='Number of blocks of the PACKET_MMAP receive ring '
+         '(0 = receive every packet with a socket call)',
+    type=int, action="store", default=0)
+parser.add_argument(
+    '--ring-block-size',
+    help='Size of a PACKET_MMAP ring block in byte (multiple of the page '
+         'size)',
+    type=int, action="store", default=1048576)
+parser.add_argument(
+    '--spill-packets',
+    help='Spill mode: only the current chunk of n packets is kept in memory, '
+         'full chunks are written to binary chunk files by a background '
+         'thread (0 = disabled, all packets are kept until the end)',
+    type=int, action="store", default=0)
+parser.add_argument(
+    '--bpf',
+    help='Socket filter program "n,code jt jf k,..." (tcpdump -ddd format) '
+         'passing only timestamped frames, generated by the driver; the raw '
+         'packet counter then counts the passed frames only',
+    type=str, action="store", default=None)
 args = parser.parse_args()
 
 ETH_P_ALL = 3
 place = 0
-timestamp1_array = []
-timestamp2_array = []
-packet_sizes = []
+# typed buffers, 8 (2) byte per value instead of an int object each
+timestamp1_array = array("Q")
+timestamp2_array = array("Q")
+packet_sizes = array("H")
 raw_packet_counter = 0
 time_throughput = []
 name = args.name
 go = True
+# packets before this index are written to a chunk snapshot
+chunk_end = 0
+spill = args.spill_packets > 0
+chunks_enabled = args.chunk_packets > 0 or args.chunk_seconds > 0 or spill
+chunk_counter = 0
+last_chunk_time = time.time()
+# packets in the chunks handed to the spill writer
+spilled_packets = 0
+# chunks waiting for the writer, bounds the memory if the disk is slow
+CHUNK_QUEUE = 2
+chunk_queue = queue.Queue(CHUNK_QUEUE)
 
 
 with open("receiver_finished.log", "w") as f:
@@ -64,11 +114,29 @@ with open("pythonRawSocketExtHost.log", "w") as f:
 
 # raw socket to listen for all packets
 # (but they need to have the right mac address OR broadcast ff:ff:ff...)
+# with --ring-blocks the kernel writes the packets into a ring shared with
+# this process, the socket mode is used if the ring is not available
+ring = None
+bpf = None
+if args.bpf is not None:
+    bpf = parse_filter(args.bpf)
+if args.ring_blocks > 0:
+    try:
+        ring = PacketRing(args.interface, args.ring_block_size,
+                          args.ring_blocks, bpf)
+    except (OSError, ValueError) as e:
+        with open("pythonRawSocketExtHost.log", "a") as f:
+            f.write("PACKET_MMAP ring not available, using socket mode: " +
+                    str(e) + "\n")
 try:
-    s = socket.socket(AF_PACKET, SOCK_RAW, htons(ETH_P_ALL))
-    # timeouts s.recv() after 0.1 sec to allow break of while loop
-    s.settimeout(0.1)
-    s.bind((args.interface, 0))
+    if ring is None:
+        s = socket.socket(AF_PACKET, SOCK_RAW, htons(ETH_P_ALL))
+        # right after the socket is created, no frame passes unfiltered
+        if bpf is not None:
+            attach_filter(s, bpf)
+        # timeouts s.recv() after 0.1 sec to allow break of while loop
+        s.settimeout(0.1)
+        s.bind((args.interface, 0))
     gtp_u = False
     pppoe_u = False
     if args.gtp:
@@ -84,7 +152,7 @@ except Exception as e:
     error = True
 
 
-# handles SIGTERM and SIGINT signals to write csv files when terminating
+# handles SIGTERM and SIGINT signals to write the result files when terminating
 def stop_signals_handler(signum, frame):
     global go
     go = False
@@ -94,161 +162,147 @@ signal.signal(signal.SIGINT, stop_signals_handler)
 signal.signal(signal.SIGTERM, stop_signals_handler)
 
 
-# checks if the K'th bit is set in n
-def is_bit_set(n, k):
-    if n & (1 << k):
-        return True
-    else:
-        return False
-
+# hands a copy of the packets since the last chunk to the chunk writer for
+# the live analytics of the core, nothing is written in the capture loop
+def write_chunk():
+    global chunk_counter, chunk_end, last_chunk_time
+    if spill:
+        spill_chunk(len(timestamp1_array))
+        return
+    start = chunk_end
+    chunk_end = len(timestamp1_array)
+    last_chunk_time = time.time()
+    if chunk_end == start:
+        return
+    chunk_queue.put((chunk_counter, [
+        values[start:chunk_end]
+        for values in [timestamp1_array, timestamp2_array, packet_sizes]]))
+    chunk_counter = chunk_counter + 1
 
 
-while go:
-    try:
-        # message contains whole packet (max 4096byte) as hex string
-        message = s.recv(4096).hex()
-        raw_packet_counter = raw_packet_counter + 1
-        ether_type = message[24:28]
+# hands the first end packets to the spill writer as chunk_<name>_<n>.bin,
+# the rest stays in memory as start of the next chunk
+def spill_chunk(end):
+    global timestamp1_array, timestamp2_array, packet_sizes, chunk_counter, \
+        spilled_packets, last_chunk_time
+    last_chunk_time = time.time()
+    if end == 0:
+        return
+    sections = []
+    rest = []
+    for values in [timestamp1_array, timestamp2_array, packet_sizes]:
+        sections.append(values if end == len(values) else values[:end])
+        rest.append(values[end:])
+    chunk_queue.put((chunk_counter, sections))
+    timestamp1_array, timestamp2_array, packet_sizes = rest
+    chunk_counter = chunk_counter + 1
+    spilled_packets = spilled_packets + end
 
-        vlan_offset = 0 # in  Niples
-        l3_start = -1 # L3 offset in Niples
 
-        while True:
-            if pppoe_u and ether_type == "8864":#PPPoEDataplane
-                # add 8 bytes pppoe header = 16 chars in hex
-                l3_start = 28 + 16 + vlan_offset
-                break
+# background thread writing the chunks of write_chunk and spill_chunk to
+# chunk_<name>_<n>.bin (timestamp1, timestamp2 and packet size section, see
+# read_chunk in analytics.py), renamed when complete to be copied only once;
+# stops at None
+def chunk_writer():
+    while True:
+        chunk = chunk_queue.get()
+        if chunk is None:
+            return
+        number, sections = chunk
+        with open("chunk_" + str(name) + ".tmp", "wb") as output:
+            for values, dtype in zip(sections, ["<u8", "<u8", "<u2"]):
+                write_values(output, values, dtype, args.multi, args.tsmax)
+        os.rename("chunk_" + str(name) + ".tmp",
+                  "chunk_" + str(name) + "_" + str(number) + ".bin")
 
-            elif ether_type == "8100": # VLAN
-                #vlan is 4 byte, last two byte is ether_type
-                vlan_offset += 8
-                ether_type = message[24 + vlan_offset : 28 + vlan_offset]
-                continue
 
-            elif ether_type == "0800":  #ipv4
-                l3_start = 28 + vlan_offset
-                break
-            else:
-                break
+# writes the array as binary result file <file_name>_<name>.bin
+def write_binary(file_name, values, dtype):
+    with open(file_name + "_" + str(name) + ".bin", "wb") as output:
+        write_values(output, values, dtype, args.multi, args.tsmax)
 
-        if l3_start >= 0:
 
-            # ip header length in 32 bit words
-            ihl = int(message[l3_start+1], 16)
-            # 17 = UDP and 6 = TCP
-            ipv4_protocol = int(message[l3_start+18:l3_start+20], 16)
-            # 28 is ethernet header length in bytes*2
-            l4_start = l3_start + ihl * 4 * 2
+# writes a chunk snapshot if enough packets or time passed since the last,
+# spills the full chunks in spill mode
+def check_chunk():
+    while spill and len(timestamp1_array) >= args.spill_packets:
+        spill_chunk(args.spill_packets)
+    if chunks_enabled and (
+            (not spill and args.chunk_packets > 0 and
+             len(timestamp1_array) - chunk_end >= args.chunk_packets) or
+            (args.chunk_seconds > 0 and
+             time.time() - last_chunk_time >= args.chunk_seconds)):
+        write_chunk()
 
-             #GTP-U CASE check
-            if gtp_u == True: 
-                udp_src_port = message[l4_start:l4_start+16]
-                udp_dst_port = message[l4_start+16:l4_start+32]
-                if (udp_src_port == udp_dst_port) and (int(udp_src_port, 16) == 2152):  # GTP-U src and dst ports => 2152
-                    # outer_ipv4 (20) + outer_udp (8) + gtpu (8) => 36 bytes
-                    add_offset = 72 # 36 bytes ip+udp+gtpu header in hex are 72 chars
-                        # bit<1>  spare;      /* reserved */
-                        # bit<1>  ex_flag;    /* next extension hdr present? */
-                        # bit<1>  seq_flag;   /* sequence no. */
-                        # bit<1>  npdu_flag;  /* n-pdn number present ? */
-                    # start at +33 and leave 1 byte 32:33 out (version + pt fields)
-                    gtpu_ex_flag_set = is_bit_set(int(message[l4_start+33:l4_start+34], 16), 2)
-                    if gtpu_ex_flag_set:
-                        # this case is not tested, but should work.
-                        add_offset = add_offset + 16
-                    
-                    # update l4_start with new offset, as GTP-U has outer IP, UDP, GTP-U headers
-                    l4_start = l4_start + add_offset
 
-
-            if ipv4_protocol == 6 and len(message) > 72+l4_start:  #TCP
-                try:
-                    # tcp header length in in 32 bit words
-                    tcp_data_offs = int(message[l4_start + 24], 16)
-                    # tcp header always has at least 5x32bit
-                    tcp_options_len = tcp_data_offs - 5
-                    tcp_options = message[l4_start + 40:
-                                          l4_start + 40 + tcp_options_len * 8]
-                    for x in range(tcp_options_len):
-                        # only check valid locations for option type
-                        if tcp_options[x*8:x*8+4] == "0f10":
-                            ts_start = x*8
-                            # one timestamp is 12 hex digits long (6 byte)
-                            timestamp1 = int(
-                                tcp_options[ts_start+4:ts_start+16], 16) * int(
-                                args.multi)
-                            timestamp2 = int(
-                                tcp_options[ts_start+20:ts_start+32], 16) * \
-                                int(args.multi)
-                            if timestamp1 > 0 and timestamp2 > 0:
-                                # divided by 2 because 2 hex digits = 1 byte
-                                packet_sizes.append(int(len(message) / 2))
-                                timestamp2_array.append(timestamp2)
-                                timestamp1_array.append(timestamp1)
-                            break
-                except Exception:
-                    print(traceback.format_exc())
-            # 14 byte eth + 20 IPv4 + 8 UDP (16 byte opt in payload!) = 42 byte
-            elif ipv4_protocol == 17 and len(message) > 48+l4_start:
-                try:
-                    # UDP header is 64 bit big (8 byte) => 64/4
-                    # => move 16 hex digits forward (4 bit = 1 hex digit)
-                    ts_start = l4_start + 16
-                    timestamps_udp = message[ts_start:ts_start+32]
-                    option_type = timestamps_udp[0:4]
-                    # needs to be 0 if it's a p4sta timestamp
-                    # (16bit 0x0f10, 48bit tstamp1, 16bit empty, 48bit tstamp2)
-                    empty = int(timestamps_udp[16:20], 16)
-                    # only parse timestamps if 0f10 directly
-                    # follows after UDP header
-                    if option_type == "0f10" and empty == 0:
-                        timestamp1 = int(timestamps_udp[4:16], 16) * int(args.multi)
-                        timestamp2 = int(timestamps_udp[20:], 16) * int(args.multi)
-                        if timestamp1 > 0 and timestamp2 > 0:
-                            # divided by 2 because 2 hex digits = 1 byte
-                            packet_sizes.append(int(len(message) / 2))
-                            timestamp2_array.append(timestamp2)
-                            timestamp1_array.append(timestamp1)
-                except Exception:
-                    print(traceback.format_exc())
-    # s.recv throws exception if it timeouts
+if chunks_enabled and not error:
+    chunk_thread = threading.Thread(target=chunk_writer)
+    chunk_thread.start()
+multi = int(args.multi)
+if ring is not None:
+    # frames are parsed in the ring, one poll per block instead of a
+    # syscall per packet
+    view = ring.view
+    while go:
+        block = ring.wait_block()
+        if block is not None:
+            for start, snaplen, length in ring.frames(block):
+                # same (max 4096 byte) packet as received in socket mode
+                n = min(snaplen, 4096)
+                timestamps = parse_packet(view[start:start + n], n, gtp_u,
+                                          pppoe_u)
+                if timestamps is not None:
+                    timestamp1 = timestamps[0] * multi
+                    timestamp2 = timestamps[1] * multi
+                    if timestamp1 > 0 and timestamp2 > 0:
+                        packet_sizes.append(min(length, 4096))
+                        timestamp2_array.append(timestamp2)
+                        timestamp1_array.append(timestamp1)
+            ring.release(block)
+        check_chunk()
+    raw_packet_counter = socket_statistics(ring.sock)[0]
+    del view
+    ring.close()
+# every packet (max 4096 byte) is received into this buffer and parsed
+# in place, no objects are created for packets without timestamps
+buf = bytearray(4096)
+while go and ring is None:
+    try:
+        n = s.recv_into(buf)
+        timestamps = parse_packet(buf, n, gtp_u, pppoe_u)
+        if timestamps is not None:
+            timestamp1 = timestamps[0] * multi
+            timestamp2 = timestamps[1] * multi
+            if timestamp1 > 0 and timestamp2 > 0:
+                packet_sizes.append(n)
+                timestamp2_array.append(timestamp2)
+                timestamp1_array.append(timestamp1)
+    # s.recv_into throws exception if it timeouts
     except Exception as e:
         pass
+    check_chunk()
+if ring is None and not error:
+    raw_packet_counter = socket_statistics(s)[0]
 
 
-# correct the overflows in the timestamps
-epochsize = (int(args.tsmax) + 1) * int(args.multi)
-ts1_last = 0
-ts2_last = 0
-for i in range(0, len(timestamp1_array)):
-    ts1 = timestamp1_array[i]
-    ts2 = timestamp2_array[i]
-    while ts1 < ts1_last - epochsize / 2:
-        ts1 += epochsize
-    while ts2 < ts2_last - epochsize / 2:
-        ts2 += epochsize
-    ts1_last = ts1
-    ts2_last = ts2
-    timestamp1_array[i] = ts1
-    timestamp2_array[i] = ts2
+if chunks_enabled and not error:
+    write_chunk()
+    chunk_queue.put(None)
+    chunk_thread.join()
+    # tells the core that all chunks are written
+    with open("chunks_" + str(name) + ".json", "w") as output:
+        json.dump({"chunks": chunk_counter,
+                   "packets": spilled_packets if spill else
+                   len(timestamp1_array)}, output)
 
-# save csv files
+# save binary result files, in spill mode the packets are in the chunks
 if not error:
-    with open("raw_packet_counter_" + str(name) + ".csv", "w") as output:
-        wr = csv.writer(output, lineterminator='\n')
-        wr.writerow([raw_packet_counter])
-    with open("packet_sizes_" + str(name) + ".csv", "w") as output:
-        wr = csv.writer(output, lineterminator='\n')
-        for e in packet_sizes:
-            wr.writerow([e])
-    with open("timestamp1_list_" + str(name) + ".csv", "w") as output:
-        wr = csv.writer(output, lineterminator='\n')
-        for e in timestamp1_array:
-            wr.writerow([e])
-    with open("timestamp2_list_" + str(name) + ".csv", "w") as output:
-        wr = csv.writer(output, lineterminator='\n')
-        for e in timestamp2_array:
-            wr.writerow([e])
+    write_binary("raw_packet_counter", array("Q", [raw_packet_counter]),
+                 "<u8")
+if not error and not spill:
+    write_binary("packet_sizes", packet_sizes, "<u2")
+    write_binary("timestamp1_list", timestamp1_array, "<u8")
+    write_binary("timestamp2_list", timestamp2_array, "<u8")
 
 with open("receiver_finished.log", "w") as f:
     f.write("True")
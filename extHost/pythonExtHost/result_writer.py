@@ -0,0 +1,38 @@
+# Copyright 2019-2022-present Ralf Kundel, Fridolin Siegmund, Kadir Eryigit
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+###############################################
+# binary result files of the python receiver  #
+# in the format read by the analytics         #
+###############################################
+from array import array
+import struct
+import sys
+
+# binary result format of the analytics (BIN_HEADER in analytics.py):
+# magic, version, numpy dtype, number of values, multi, tsmax
+BIN_MAGIC = b"P4STABIN"
+BIN_VERSION = 1
+BIN_HEADER = struct.Struct("<8sH6sQQQ")
+
+
+# writes the header and the values of the array with the numpy dtype of its
+# type code, little-endian like the analytics expects
+def write_values(output, values, dtype, multi, tsmax):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    output.write(BIN_HEADER.pack(BIN_MAGIC, BIN_VERSION, dtype.encode(),
+                                 len(values), int(multi), int(tsmax)))
+    values.tofile(output)
@@ -51,6 +51,7 @@ urlpatterns = [
     path('deleteData/', analyze.delete_data),
     path('downloadAllResults/', analyze.download_all_zip),
     path('downloadExtResults/', analyze.download_external_results),
+    path('downloadExtParquet/', analyze.download_external_parquet),
     path('downloadLoadgenResults/', analyze.download_loadgen_results),
     path('downloadStamperResults/', analyze.download_stamper_results),
     path('createConfig/', configure.create_new_cfg_from_template),
@@ -110,6 +111,7 @@ urlpatterns = [
     path('job_delete_namespace/', configure.delete_namespace),
 
     # output_external_results.html
-    path('dygraph/', analyze.dygraph)
+    path('dygraph/', analyze.dygraph),
+    path('dygraph_tiles/', analyze.dygraph_tiles)
 
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -17,7 +17,7 @@ import time
 import traceback
 import zipfile
 
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.shortcuts import render
 
 # custom python modules
@@ -152,6 +152,9 @@ def external_results(request):
                 extH_results["min_packets_per_second"]
             latency_range = extH_results["max_latency"] - extH_results[
                 "min_latency"]
+            latency_percentiles = [
+                (name, analytics.find_unit(value)) for name, value in
+                extH_results.get("latency_percentiles", {}).items()]
 
             display = True
 
@@ -198,6 +201,7 @@ def external_results(request):
                            "ave_ipdv": analytics.find_unit(
                                extH_results["avg_ipdv"]),
                            "latency_range": analytics.find_unit(latency_range),
+                           "latency_percentiles": latency_percentiles,
                            "ave_abs_ipdv": analytics.find_unit(
                                extH_results["avg_abs_ipdv"]),
                            "latency_std_deviation": analytics.find_unit(
@@ -224,6 +228,7 @@ def get_ext_host_zip_list():
         "results/" + fid + "/generated/latency.svg",
         "results/" + fid + "/generated/latency_sec.svg",
         "results/" + fid + "/generated/latency_bar.svg",
+        "results/" + fid + "/generated/latency_windows.svg",
         "results/" + fid + "/generated/latency_sec_y0.svg",
         "results/" + fid + "/generated/latency_y0.svg",
         "results/" + fid + "/generated/ipdv.svg",
@@ -242,14 +247,18 @@ def get_ext_host_zip_list():
         files[i] = [files[i], "results/" + fid + "/" +
                     name[:-4] + fid + ".svg"]
 
-    files.append([folder + "/timestamp1_list_" + fid + ".csv",
-                  "results/" + fid + "/timestamp1_list_" + fid + ".csv"])
-    files.append([folder + "/timestamp2_list_" + fid + ".csv",
-                  "results/" + fid + "/timestamp2_list_" + fid + ".csv"])
-    files.append([folder + "/packet_sizes_" + fid + ".csv",
-                  "results/" + fid + "/packet_sizes_" + fid + ".csv"])
-    files.append([folder + "/raw_packet_counter_" + fid + ".csv",
-                  "results/" + fid + "/raw_packet_counter_" + fid + ".csv"])
+    # binary result files replace the csv files if available
+    for name in ["timestamp1_list", "timestamp2_list", "packet_sizes",
+                 "raw_packet_counter"]:
+        ending = ".csv"
+        if os.path.isfile(folder + "/" + name + "_" + fid + ".bin"):
+            ending = ".bin"
+        files.append([folder + "/" + name + "_" + fid + ending,
+                      "results/" + fid + "/" + name + "_" + fid + ending])
+    # latency percentiles per window (not available in streaming mode)
+    if os.path.isfile("results/" + fid + "/generated/latency_windows.json"):
+        files.append(["results/" + fid + "/generated/latency_windows.json",
+                      "results/" + fid + "/latency_windows_" + fid + ".json"])
     files.append([folder + "/output_external_host_" + fid + ".txt",
                   "results/" + fid + "/output_external_host_" + fid + ".txt"])
     
@@ -294,6 +303,24 @@ def download_external_results(request):
     return zip_file
 
 
+# columnar file (parquet) with the per packet data of the selected run for
+# external tools, needs the optional pyarrow
+def download_external_parquet(request):
+    file_id = str(globals.selected_run_id)
+    try:
+        path = analytics.export_run(globals.logger,
+                                    P4STA_utils.get_results_path(file_id),
+                                    file_id, "parquet")
+    except Exception:
+        globals.logger.error(traceback.format_exc())
+        return render(request, "middlebox/timeout.html",
+                      {"inside_ajax": False, "error": (
+                          "parquet export error: " + str(
+                              traceback.format_exc()))})
+    return FileResponse(open(path, "rb"), as_attachment=True,
+                        filename=os.path.basename(path))
+
+
 def download_all_zip(request):
     # first check if cached results are already available
     # this step is not neccessary for download_external_results because
@@ -403,39 +430,18 @@ def dygraph(request):
     if P4STA_utils.is_ajax(request):
         cfg = P4STA_utils.read_result_cfg(globals.selected_run_id)
         try:
-            extH_results = analytics.main(str(globals.selected_run_id),
-                                          cfg["multicast"],
-                                          P4STA_utils.get_results_path(globals.selected_run_id),
-                                          globals.logger)
-            # list for "Dygraph" javascript graph
-            graph_list = []
-            counter = 1
-            adjusted_latency_list, unit = analytics.find_unit(
-                extH_results["latency_list"])
-            for latency in adjusted_latency_list:
-                graph_list.append([counter, latency])
-                counter = counter + 1
-
-            timestamp1_list = analytics.read_csv(
-                globals.logger,
-                P4STA_utils.get_results_path(globals.selected_run_id),
-                "timestamp1_list", str(globals.selected_run_id))
-            timestamp2_list = analytics.read_csv(
-                globals.logger,
-                P4STA_utils.get_results_path(globals.selected_run_id),
-                "timestamp2_list", str(globals.selected_run_id))
-
-            # time in ms when packet was timestamped but starting at 0 ms
-            time_throughput = []
-            if len(timestamp1_list) > 0 and len(timestamp1_list) == len(
-                    timestamp2_list):
-                for i in range(0, len(timestamp1_list)):
-                    time_throughput.append(int(round(
-                        (timestamp2_list[i] - timestamp2_list[0]) / 1000000)))
+            analytics.main(str(globals.selected_run_id), cfg["multicast"],
+                           P4STA_utils.get_results_path(globals.selected_run_id),
+                           globals.logger)
+            # overview of the latencies, finer tiles are loaded by
+            # dygraph_tiles when zooming in
+            tiles = analytics.latency_tiles(globals.selected_run_id)
+            if tiles is None:
+                tiles = {"unit": "nanoseconds", "x": [], "min": [],
+                         "max": [], "mean": [], "time": []}
 
             return render(request, "middlebox/dygraph.html",
-                          {"latencies": graph_list,
-                           "time_throughput": time_throughput, "unit": unit})
+                          {"tiles": json.dumps(tiles)})
 
         except Exception:
             globals.logger.error(traceback.format_exc())
@@ -443,3 +449,16 @@ def dygraph(request):
                           {"inside_ajax": True, "error": (
                                       "render external error: " + str(
                                               traceback.format_exc()))})
+
+
+# points of the interactive latency graph for the visible packets
+# (GET start, end, points), see analytics.latency_tiles
+def dygraph_tiles(request):
+    try:
+        tiles = analytics.latency_tiles(
+            globals.selected_run_id, request.GET.get("start"),
+            request.GET.get("end"), request.GET.get("points"))
+    except Exception:
+        globals.logger.error(traceback.format_exc())
+        tiles = None
+    return JsonResponse(tiles if tiles is not None else {})
@@ -0,0 +1,1001 @@
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)).split("tests")[0])
+try:
+    from analytics import analytics
+    from analytics import benchmark
+except Exception as e:
+    print(e)
+
+
+# pure python implementation of the analytics statistics before the numpy
+# engine, used as reference for the equivalence tests
+def legacy_statistics(timestamp1_list, timestamp2_list, packet_sizes):
+    total_throughput = sum(packet_sizes)
+    latency_list = list(map(int.__sub__, timestamp2_list, timestamp1_list))
+    total_latencies = sum(latency_list)
+    min_latency = min(latency_list, default=0)
+    max_latency = max(latency_list, default=0)
+    ipdv_list = []
+    pdv_list = []
+    total_ipdv = abs_total_ipdv = total_pdv = 0
+    for z in range(0, len(latency_list)):
+        pdv = latency_list[z] - min_latency
+        pdv_list.append(pdv)
+        total_pdv = total_pdv + pdv
+        if 0 < z < len(latency_list):
+            ipdv = latency_list[z] - latency_list[z - 1]
+            ipdv_list.append(ipdv)
+            total_ipdv = total_ipdv + ipdv
+            abs_total_ipdv = abs_total_ipdv + abs(ipdv)
+        else:
+            ipdv_list.append(0)
+    ave_latency = round(total_latencies / len(latency_list), 2)
+    total_sqr_dev = pos_sqr_dev = neg_sqr_dev = 0
+    pos_counter = neg_counter = 0
+    for z in range(0, len(latency_list)):
+        total_sqr_dev += (latency_list[z] - ave_latency)**2
+        if latency_list[z] >= ave_latency:
+            pos_sqr_dev += (latency_list[z] - ave_latency)**2
+            pos_counter += 1
+        else:
+            neg_sqr_dev += (latency_list[z] - ave_latency)**2
+            neg_counter += 1
+    latency_variance = total_sqr_dev / len(ipdv_list)
+    return {
+        "num_processed_packets": len(latency_list),
+        "total_throughput": round(total_throughput/1000000, 2),
+        "min_latency": min_latency, "max_latency": max_latency,
+        "avg_latency": ave_latency,
+        "min_ipdv": min(ipdv_list), "max_ipdv": max(ipdv_list),
+        "avg_ipdv": round(total_ipdv / len(ipdv_list)),
+        "avg_abs_ipdv": round(abs_total_ipdv / len(ipdv_list)),
+        "min_pdv": min(pdv_list), "max_pdv": max(pdv_list),
+        "avg_pdv": round(total_pdv / len(pdv_list)),
+        "latency_std_deviation": latency_variance ** 0.5,
+        "pos_latency_std_deviation":
+            (pos_sqr_dev / pos_counter) ** 0.5 if pos_counter > 0 else 0,
+        "neg_latency_std_deviation":
+            (neg_sqr_dev / neg_counter) ** 0.5 if neg_counter > 0 else 0,
+        "latency_variance": latency_variance}
+
+
+# synthetic run: constant packet rate with jitter, latency spikes and a pause
+def generate_run(num, seed, start=1600000000000000000, latency=25000):
+    rnd = random.Random(seed)
+    timestamp1_list = []
+    timestamp2_list = []
+    packet_sizes = []
+    t = start
+    for i in range(num):
+        t += rnd.randint(800, 1200)
+        if i == num // 2:
+            t += 350000000  # 350ms pause
+        lat = latency + rnd.randint(-500, 500)
+        if rnd.random() < 0.001:
+            lat += rnd.randint(100000, 2000000)
+        timestamp1_list.append(t)
+        timestamp2_list.append(t + lat)
+        packet_sizes.append(rnd.choice([64, 512, 1500]))
+    return timestamp1_list, timestamp2_list, packet_sizes
+
+
+# checks the estimated percentiles of a LatencySketch against the exact ones
+def assert_percentiles_estimated(test, percentiles, latency,
+                                 relative_accuracy):
+    np = analytics.np
+    test.assertEqual(list(percentiles), ["p50", "p90", "p99", "p99.9",
+                                         "p99.99"])
+    for percentile in analytics.PERCENTILES:
+        exact = np.percentile(latency, percentile, method="lower")
+        test.assertAlmostEqual(
+            percentiles[analytics.percentile_name(percentile)], exact,
+            delta=abs(exact) * relative_accuracy + 0.01)
+
+
+# executed in the plotting pool by test_shared_array
+def sum_shared_array(shared):
+    shm, array = shared.attach()
+    try:
+        return int(array.sum())
+    finally:
+        array = None
+        shm.close()
+
+
+# loads recorded runs from the results directory if some exist
+def recorded_runs(max_runs=3):
+    results = os.path.join(analytics.project_path, "results")
+    if not os.path.isdir(results):
+        return []
+    logger = analytics.get_fallback_logger()
+    runs = []
+    for file_id in sorted(os.listdir(results))[-max_runs:]:
+        path = os.path.join(results, file_id)
+        if not os.path.isfile(os.path.join(
+                path, "timestamp1_list_" + file_id + ".csv")) and \
+                not os.path.isfile(os.path.join(
+                    path, "timestamp1_list_" + file_id + ".bin")):
+            continue
+        runs.append((
+            analytics.read_csv(logger, path, "timestamp1_list", file_id),
+            analytics.read_csv(logger, path, "timestamp2_list", file_id),
+            analytics.read_csv(logger, path, "packet_sizes", file_id)))
+    return runs
+
+
+class TestAnalytics(unittest.TestCase):
+    def assert_equivalent(self, timestamp1_list, timestamp2_list,
+                          packet_sizes):
+        expected = legacy_statistics(timestamp1_list, timestamp2_list,
+                                     packet_sizes)
+        results, series = analytics.calculate_statistics(
+            timestamp1_list, timestamp2_list, packet_sizes, "1")
+        self.assertIsNotNone(series)
+        for key, value in expected.items():
+            if isinstance(value, float):
+                self.assertAlmostEqual(results[key], value,
+                                       delta=abs(value) * 1e-9, msg=key)
+            else:
+                self.assertEqual(results[key], value, msg=key)
+                self.assertEqual(type(results[key]), type(value), msg=key)
+
+    def test_statistics_equivalent_synthetic(self):
+        for num, seed in [(1, 1), (2, 2), (1000, 3), (100000, 4)]:
+            self.assert_equivalent(*generate_run(num, seed))
+
+    def test_statistics_equivalent_recorded(self):
+        runs = recorded_runs()
+        if len(runs) == 0:
+            self.skipTest("no recorded runs in results directory")
+        for run in runs:
+            self.assert_equivalent(*run)
+
+    def test_statistics_invalid_input(self):
+        # read_csv returns [-1] if a file is missing
+        results, series = analytics.calculate_statistics(
+            [-1], [-1], [-1], "1")
+        self.assertIsNone(series)
+        self.assertEqual(results["num_processed_packets"], 0)
+        self.assertEqual(results["min_latency"], 0)
+
+    def test_shared_array(self):
+        values = analytics.np.arange(10, dtype=analytics.np.int64) * 3
+        shared = analytics.SharedArray(values)
+        try:
+            pool = analytics.get_plot_pool(2)
+            self.assertIs(pool, analytics.get_plot_pool(2))
+            self.assertEqual(pool.apply(sum_shared_array, (shared,)),
+                             int(values.sum()))
+        finally:
+            shared.release()
+
+    def test_lazy_pyplot(self):
+        # numeric callers (core, Django views) do not import matplotlib
+        code = "import sys; from analytics import analytics; " \
+            "analytics.find_unit([1500000]); " \
+            "print('matplotlib' in sys.modules)"
+        res = subprocess.run([sys.executable, "-c", code],
+                             cwd=os.path.dirname(analytics.dir_path),
+                             stdout=subprocess.PIPE, check=True)
+        self.assertEqual(res.stdout.decode().strip(), "False")
+
+    def test_find_unit_array(self):
+        values = [1500000, 2500000, 3000000]
+        self.assertEqual(analytics.find_unit(values)[1], "milliseconds")
+        array, unit = analytics.find_unit(analytics.np.array(values))
+        self.assertEqual(unit, "milliseconds")
+        self.assertEqual(list(array), analytics.find_unit(values)[0])
+
+    def test_histogram_linear_equivalent(self):
+        for num, seed in [(1, 7), (1000, 8), (20000, 9)]:
+            timestamp1_list, timestamp2_list, _ = generate_run(num, seed)
+            latency = list(map(int.__sub__, timestamp2_list, timestamp1_list))
+            value_list, unit = analytics.find_unit(latency)
+            # nested loop of the bar chart before the histogram engine
+            min_value = min(latency) / analytics.UNIT_FACTORS[unit] - 0.1
+            max_value = max(latency) / analytics.UNIT_FACTORS[unit] + 0.1
+            stepwidth = round(((max_value - min_value) / 10) + 0.1, 1)
+            parts = [round(round(min_value, 1) + (i * stepwidth), 1)
+                     for i in range(11)]
+            expected = [0] * 10
+            for z in value_list:
+                for i in range(10):
+                    if parts[i] < z <= parts[i + 1]:
+                        expected[i] += 1
+            histogram = analytics.latency_histogram(
+                analytics.np.array(latency), min(latency), max(latency))
+            self.assertEqual(histogram["unit"], unit)
+            self.assertEqual(histogram["edges"], parts)
+            self.assertEqual(histogram["counts"], expected)
+
+    def test_histogram_log_hdr(self):
+        np = analytics.np
+        latency = np.array([-20, 0, 5, 25000, 26000, 2000000, 70000000])
+        # first bucket also holds the zero and negative latencies
+        for scale, bins, first in [("log", 6, 3), ("hdr", 10, 2)]:
+            histogram = analytics.latency_histogram(
+                latency, int(latency.min()), int(latency.max()), bins, scale)
+            self.assertEqual(sum(histogram["counts"]), len(latency))
+            self.assertEqual(histogram["edges"][0], -20)
+            self.assertEqual(histogram["counts"][0], first)
+            if scale == "log":
+                self.assertEqual(len(histogram["counts"]), bins)
+            else:
+                # buckets of at most 1/HDR_SUB_BUCKETS relative width
+                edges = np.array(histogram["edges"])
+                edges = edges[edges >= analytics.HDR_SUB_BUCKETS]
+                self.assertTrue(np.all(
+                    np.diff(edges) / edges[:-1]
+                    <= 1 / analytics.HDR_SUB_BUCKETS))
+        with self.assertRaises(ValueError):
+            analytics.new_histogram(0, 10, 10, "quadratic")
+
+    def test_latency_percentiles(self):
+        np = analytics.np
+        latency = np.array(generate_run(3001, 11)[1]) - \
+            np.array(generate_run(3001, 11)[0])
+        percentiles = analytics.latency_percentiles(latency)
+        for percentile in analytics.PERCENTILES:
+            self.assertAlmostEqual(
+                percentiles[analytics.percentile_name(percentile)],
+                np.percentile(latency, percentile), places=2)
+        self.assertEqual(analytics.latency_percentiles([]), {})
+
+    def test_throughput_windows(self):
+        timestamp1_list, timestamp2_list, packet_sizes = generate_run(
+            5000, 12)
+        for window in [10000, 1000000, 100000000]:
+            results, series = analytics.calculate_statistics(
+                timestamp1_list, timestamp2_list, packet_sizes, "1",
+                throughput_window=window)
+            # reference: bytes and packets per window, last one incomplete
+            num = (timestamp2_list[-1] - timestamp2_list[0]) // window
+            byte_counts = [0] * num
+            packet_counts = [0] * num
+            for timestamp2, size in zip(timestamp2_list, packet_sizes):
+                index = (timestamp2 - timestamp2_list[0]) // window
+                if index < num:
+                    byte_counts[index] += size
+                    packet_counts[index] += 1
+            self.assertEqual(len(series["packet"]), num + 2)
+            self.assertEqual(series["packet"][1:-1], [
+                count * 1000000000 // window for count in packet_counts])
+            for mbit, count in zip(series["mbit"][1:-1], byte_counts):
+                self.assertAlmostEqual(mbit, count * 8000 / window)
+            # the 350ms pause is a series of empty windows
+            self.assertEqual(results["min_packets_per_second"], 0)
+        with self.assertRaises(ValueError):
+            analytics.calculate_statistics(
+                timestamp1_list, timestamp2_list, packet_sizes, "1",
+                throughput_window=1000)
+
+    def test_packet_rate_short_run(self):
+        # 1000 packets within 10ms, no complete window of 100ms
+        timestamp1_list = list(range(10**9, 10**9 + 10**7, 10**4))
+        timestamp2_list = [t + 25000 for t in timestamp1_list]
+        packet_sizes = [64] * 1000
+        results, series = analytics.calculate_statistics(
+            timestamp1_list, timestamp2_list, packet_sizes, "1",
+            throughput_window=100000000)
+        self.assertEqual(series["packet"], [0, 0])
+        self.assertEqual(results["avg_packets_per_second"], 10000)
+        # two windows, the average of the complete one
+        results = analytics.calculate_statistics(
+            timestamp1_list, timestamp2_list, packet_sizes, "1",
+            throughput_window=5000000)[0]
+        self.assertEqual(results["avg_packets_per_second"], 100000)
+
+    def test_latency_windows(self):
+        np = analytics.np
+        timestamp1_list, timestamp2_list, _ = generate_run(20000, 20)
+        timestamp2 = np.array(timestamp2_list)
+        latency = timestamp2 - np.array(timestamp1_list)
+        window = 1000000
+        index = (timestamp2 - timestamp2[0]) // window
+        for percentiles in [None, [0, 50, 99.9, 100]]:
+            windows = analytics.latency_windows(
+                timestamp2, latency, int(timestamp2[0]), window, percentiles)
+            # the 350ms pause leaves windows without packets out
+            self.assertEqual(windows["time"], [
+                int(i) * window / 1e9 for i in np.unique(index)])
+            self.assertEqual(sum(windows["packets"]), 20000)
+            for i, time in enumerate(windows["time"]):
+                values = latency[index == round(time * 1e9) // window]
+                self.assertEqual(windows["packets"][i], len(values))
+                self.assertEqual(windows["min"][i], values.min())
+                self.assertEqual(windows["max"][i], values.max())
+                self.assertAlmostEqual(windows["mean"][i], values.mean(),
+                                       delta=0.01)
+                for p in percentiles or analytics.WINDOW_PERCENTILES:
+                    self.assertAlmostEqual(
+                        windows[analytics.percentile_name(p)][i],
+                        np.percentile(values, p), delta=0.01)
+        # too large for one sort key, sorted with lexsort
+        latency[0] = 2**61
+        windows = analytics.latency_windows(timestamp2, latency,
+                                            int(timestamp2[0]), window)
+        self.assertEqual(windows["max"][0], 2**61)
+        without_first = analytics.latency_windows(
+            timestamp2[1:], latency[1:], int(timestamp2[0]), window)
+        self.assertEqual(windows["p50"][1:], without_first["p50"][1:])
+        self.assertEqual(analytics.latency_windows(
+            [], [], 0, window)["time"], [])
+
+    def test_packet_order(self):
+        order = analytics.packet_order([1, 2, 5, 3, 4, 6, 6, 20, 21])
+        self.assertEqual(order["reordered_packets"], 2)
+        self.assertEqual(order["max_reorder_extent"], 2)
+        self.assertEqual(order["avg_reorder_extent"], 1.5)
+        self.assertEqual(order["duplicate_packets"], 1)
+        self.assertEqual(order["loss_bursts"], 1)
+        self.assertEqual(order["estimated_lost_packets"], 13)
+        # one packet overtaken by three others
+        order = analytics.packet_order([10, 20, 30, 40, 50, 15, 60])
+        self.assertEqual(order["reordered_packets"], 1)
+        self.assertEqual(order["max_reorder_extent"], 4)
+        self.assertEqual(order["loss_bursts"], 0)
+        order = analytics.packet_order(generate_run(1000, 17)[0])
+        self.assertEqual(order["reordered_packets"], 0)
+        self.assertEqual(order["duplicate_packets"], 0)
+
+    def test_inter_arrival_times(self):
+        np = analytics.np
+        rnd = np.random.default_rng(22)
+        # bursts of 1 to 8 packets 100ns apart, 5us between the bursts
+        gaps = np.where(rnd.random(30000) < 0.3, 5000, 100)
+        gaps[15000] = 350000000
+        timestamps = 1600000000000000000 + np.cumsum(gaps)
+        # two packets swapped
+        timestamps[[100, 101]] = timestamps[[101, 100]]
+        iat = np.diff(np.sort(timestamps))
+        for chunks in [1, 7, 1000]:
+            iat_stats = analytics.InterArrivalTimes()
+            for chunk in np.array_split(timestamps, chunks):
+                iat_stats.update(chunk)
+            results = iat_stats.results()
+            self.assertEqual(results["num_inter_arrival_times"], len(iat))
+            self.assertEqual((results["min"], results["max"]),
+                             (100, 350000000))
+            self.assertAlmostEqual(results["avg"], iat.mean(), delta=0.01)
+            self.assertAlmostEqual(results["cov"], iat.std() / iat.mean())
+            for p in analytics.PERCENTILES:
+                self.assertAlmostEqual(
+                    results["percentiles"][analytics.percentile_name(p)],
+                    np.percentile(iat, p), delta=0.01)
+            self.assertEqual(results["histogram"]["scale"], "log")
+            self.assertEqual(sum(results["histogram"]["counts"]), len(iat))
+            # runs of gaps below 1us
+            bursts = []
+            run = 0
+            for value in iat.tolist() + [5000]:
+                if value < 1000:
+                    run += 1
+                elif run > 0:
+                    bursts.append(run + 1)
+                    run = 0
+            self.assertEqual(results["bursts"], len(bursts))
+            self.assertEqual(results["burst_packets"], sum(bursts))
+            self.assertEqual(results["max_burst_packets"], max(bursts))
+        results = analytics.inter_arrival_times(timestamps, timestamps + 1,
+                                                iat_gap=50)
+        self.assertEqual(results["ingress"]["bursts"], 0)
+        self.assertEqual(results["ingress"]["gap_threshold"], 50)
+        self.assertEqual(results["egress"]["min"], 100)
+        self.assertEqual(analytics.InterArrivalTimes().results(), {})
+
+    def test_unwrap_timestamps(self):
+        np = analytics.np
+        multi, tsmax = 1000, 2**32 - 1
+        epoch = (tsmax + 1) * multi
+        rnd = random.Random(18)
+        unwrapped = [epoch - 5000000]
+        for i in range(20000):
+            unwrapped.append(unwrapped[-1] + rnd.randint(0, 2000000000))
+        # some packets overtaken across an overflow
+        for i in range(100, 20000, 997):
+            unwrapped[i], unwrapped[i + 1] = unwrapped[i + 1], unwrapped[i]
+        raw = [value % epoch for value in unwrapped]
+        # per packet loop of the python receiver before
+        expected = []
+        last = 0
+        for value in raw:
+            while value < last - epoch / 2:
+                value += epoch
+            last = value
+            expected.append(value)
+        self.assertEqual(expected, unwrapped)
+        self.assertEqual(analytics.TimestampUnwrapper(multi, tsmax).unwrap(
+            raw).tolist(), expected)
+        unwrapper = analytics.TimestampUnwrapper(multi, tsmax)
+        self.assertEqual(np.concatenate([
+            unwrapper.unwrap(chunk) for chunk in np.array_split(
+                np.array(raw), 7)]).tolist(), expected)
+        # already unwrapped by the receiver or unknown format
+        self.assertEqual(analytics.TimestampUnwrapper(multi, tsmax).unwrap(
+            expected).tolist(), expected)
+        self.assertEqual(analytics.TimestampUnwrapper(0, 0).unwrap(
+            raw).tolist(), raw)
+
+    def test_decimate_min_max(self):
+        np = analytics.np
+        values = np.full(100003, 25000, dtype=np.int64)
+        values[777] = 2000000
+        values[54321] = -300
+        index = np.arange(len(values))
+        dec_index, dec_values = analytics.decimate_min_max(
+            index, values, 1000)
+        self.assertLessEqual(len(dec_values), 1000)
+        self.assertEqual(dec_values.max(), 2000000)
+        self.assertEqual(dec_values.min(), -300)
+        self.assertEqual(dec_index[0], 0)
+        self.assertEqual(dec_index[-1], len(values) - 1)
+        self.assertTrue(np.all(np.diff(dec_index) > 0))
+        self.assertEqual(values[dec_index].tolist(), dec_values.tolist())
+        # small lines and disabled decimation stay unchanged
+        for max_points in [0, 200000]:
+            dec_index, dec_values = analytics.decimate_min_max(
+                index, values, max_points)
+            self.assertEqual(len(dec_values), len(values))
+
+
+# temporary results folder (self.path) with the result files of runs as
+# written by the receivers, shared by the tests of the features reading them
+class ResultsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.logger = analytics.get_fallback_logger()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def write_csv(self, file_name, values, file_id="1", path=None):
+        with open(os.path.join(path or self.path, file_name + "_" +
+                               file_id + ".csv"), "w") as f:
+            f.write("\n".join(map(str, values)) + "\n")
+
+    # csv result files of run file_id in path (default self.path), the raw
+    # packet counter only if given
+    def write_run(self, timestamp1_list, timestamp2_list, packet_sizes,
+                  raw_packet_counter=None, file_id="1", path=None):
+        path = path or self.path
+        os.makedirs(path, exist_ok=True)
+        self.write_csv("timestamp1_list", timestamp1_list, file_id, path)
+        self.write_csv("timestamp2_list", timestamp2_list, file_id, path)
+        self.write_csv("packet_sizes", packet_sizes, file_id, path)
+        if raw_packet_counter is not None:
+            self.write_csv("raw_packet_counter", [raw_packet_counter],
+                           file_id, path)
+
+    # results/<id>/generated of the analyzed runs below self.path
+    def use_project_path(self):
+        self.addCleanup(setattr, analytics, "project_path",
+                        analytics.project_path)
+        analytics.project_path = self.path
+
+
+class TestBinaryFormat(ResultsTestCase):
+    def test_write_read_binary(self):
+        path = os.path.join(self.path, "timestamp1_list_1.bin")
+        values = [2**48 - 1, 1, 1600000000000000000]
+        analytics.write_binary(path, values, "<u8", 1000, 2**48 - 1)
+        header = analytics.read_binary_header(path)
+        self.assertEqual(header["count"], 3)
+        self.assertEqual(header["multi"], 1000)
+        self.assertEqual(header["tsmax"], 2**48 - 1)
+        loaded = analytics.read_binary(path)
+        self.assertIsInstance(loaded.base, analytics.np.memmap)
+        self.assertEqual(loaded.dtype, analytics.np.int64)
+        self.assertEqual(loaded.tolist(), values)
+
+    def test_empty_binary(self):
+        path = os.path.join(self.path, "packet_sizes_1.bin")
+        analytics.write_binary(path, [], "<u2")
+        self.assertEqual(len(analytics.read_binary(path)), 0)
+
+    def test_invalid_binary(self):
+        path = os.path.join(self.path, "packet_sizes_1.bin")
+        with open(path, "wb") as f:
+            f.write(b"1\n2\n3\n")
+        self.assertEqual(analytics.read_csv(
+            self.logger, self.path, "packet_sizes", 1).tolist(), [-1])
+
+    def test_convert_csv_to_binary(self):
+        timestamp1_list, timestamp2_list, packet_sizes = generate_run(500, 5)
+        self.write_csv("timestamp1_list", timestamp1_list)
+        self.write_csv("timestamp2_list", timestamp2_list)
+        self.write_csv("packet_sizes", packet_sizes)
+        self.write_csv("raw_packet_counter", [510])
+        from_csv = analytics.read_csv(
+            self.logger, self.path, "timestamp2_list", 1)
+        # empty as written by the receivers without packets
+        open(os.path.join(self.path, "only_timestamp1_list_1.csv"),
+             "w").close()
+        converted = analytics.convert_csv_to_binary(
+            self.logger, self.path, 1, remove_csv=True, chunk_size=7)
+        self.assertEqual(len(converted), 5)
+        # same header dtypes as the files written by the receivers
+        for file_name, dtype in [("timestamp1_list", "<u8"),
+                                 ("timestamp2_list", "<u8"),
+                                 ("packet_sizes", "<u2"),
+                                 ("raw_packet_counter", "<u8")]:
+            header = analytics.read_binary_header(os.path.join(
+                self.path, file_name + "_1.bin"))
+            self.assertEqual(header["dtype"].str, dtype)
+        self.assertEqual(analytics.read_binary_header(os.path.join(
+            self.path, "timestamp1_list_1.bin"))["count"], 500)
+        self.assertEqual(analytics.read_csv(
+            self.logger, self.path, "only_timestamp1_list", 1).tolist(), [])
+        self.assertEqual(analytics.read_csv(
+            self.logger, self.path, "timestamp1_list", 1).tolist(),
+            timestamp1_list)
+        self.assertFalse(os.path.isfile(
+            os.path.join(self.path, "timestamp2_list_1.csv")))
+        from_bin = analytics.read_csv(
+            self.logger, self.path, "timestamp2_list", 1)
+        self.assertEqual(from_bin.tolist(), from_csv.tolist())
+        self.assertEqual(analytics.read_csv(
+            self.logger, self.path, "raw_packet_counter", 1)[0], 510)
+        self.assertEqual(analytics.read_csv(
+            self.logger, self.path, "packet_sizes", 1).tolist(), packet_sizes)
+
+    def test_missing_file(self):
+        self.assertEqual(analytics.read_csv(
+            self.logger, self.path, "timestamp1_list", 1).tolist(), [-1])
+
+
+# comparison of several runs (compare_runs)
+class TestCompareRuns(ResultsTestCase):
+    def test_compare_runs(self):
+        runs = []
+        for file_id, seed, latency in [("11", 13, 25000), ("12", 14, 25000),
+                                       ("13", 15, 26000)]:
+            path = os.path.join(self.path, file_id)
+            self.write_run(*generate_run(3000, seed, latency=latency),
+                           raw_packet_counter=3010, file_id=file_id,
+                           path=path)
+            runs.append((file_id, "1", path))
+        with open(os.path.join(self.path, "11", "stamper_11.json"), "w") as f:
+            json.dump({"dut_ports": [
+                {"use_port": "checked", "num_ingress_packets": 990,
+                 "num_egress_packets": 1000, "num_ingress_stamped_packets": 99,
+                 "num_egress_stamped_packets": 100},
+                {"use_port": "unchecked", "num_ingress_packets": 0,
+                 "num_egress_packets": 5, "num_ingress_stamped_packets": 0,
+                 "num_egress_stamped_packets": 0}]}, f)
+        output_path = os.path.join(self.path, "comparison")
+        comparison = analytics.compare_runs(runs, output_path, self.logger, 2)
+
+        self.assertEqual([row["id"] for row in comparison["runs"]],
+                         ["11", "12", "13"])
+        row = comparison["runs"][0]
+        self.assertEqual(row["num_processed_packets"], 3000)
+        self.assertEqual(row["packetloss"], 10)
+        self.assertEqual(row["packetloss_stamped_percent"], 1.0)
+        self.assertNotIn("packetloss", comparison["runs"][1])
+        self.assertIn("p99.9", row)
+        ks_tests = {(test["run"], test["other_run"]): test
+                    for test in comparison["ks_tests"]}
+        self.assertEqual(len(ks_tests), 3)
+        # same latency distribution vs. 1us more latency
+        self.assertGreater(ks_tests[("11", "12")]["p_value"], 0.01)
+        self.assertLess(ks_tests[("11", "13")]["p_value"], 1e-6)
+        self.assertGreater(ks_tests[("11", "13")]["statistic"], 0.9)
+        for file_name in ["comparison.json", "comparison.csv",
+                          "latency_cdf.svg", "latency_percentiles.svg",
+                          "speed.svg"]:
+            self.assertTrue(os.path.isfile(os.path.join(output_path,
+                                                        file_name)))
+        with open(os.path.join(output_path, "comparison.csv")) as f:
+            self.assertEqual(len(f.readlines()), 4)
+
+
+# chunk snapshots of a running capture folded by LiveAnalytics
+class TestLiveAnalytics(ResultsTestCase):
+    def test_live_analytics(self):
+        timestamp1_list, timestamp2_list, packet_sizes = generate_run(
+            20000, 16)
+        self.write_run(timestamp1_list, timestamp2_list, packet_sizes)
+        for scale in ["linear", "hdr"]:
+            expected = analytics.calculate_statistics_streaming(
+                self.logger, self.path, 1, "2", 997, histogram_scale=scale)[0]
+            live = analytics.LiveAnalytics(1, "2", self.path,
+                                           histogram_scale=scale)
+            os.makedirs(live.chunk_path, exist_ok=True)
+            self.assertEqual(live.fold(self.logger), 0)
+            for number, start in enumerate(range(0, 20000, 6000)):
+                with open(live.chunk_file(number), "w") as f:
+                    for i in range(start, min(start + 6000, 20000)):
+                        f.write(str(timestamp1_list[i]) + "," +
+                                str(timestamp2_list[i]) + "," +
+                                str(packet_sizes[i]) + "\n")
+                self.assertEqual(live.fold(self.logger), 1)
+                self.assertEqual(live.results()[0]["num_processed_packets"],
+                                 min(start + 6000, 20000))
+            self.assertFalse(live.complete())
+            with open(os.path.join(live.chunk_path, "chunks_1.json"),
+                      "w") as f:
+                json.dump({"chunks": 4, "packets": 20000}, f)
+            self.assertTrue(live.complete())
+            results = live.results()[0]
+            for key, value in expected.items():
+                if key == "inter_arrival_times":
+                    # egress packets are only sorted within a chunk
+                    self.assertEqual(results[key]["ingress"], value["ingress"])
+                elif isinstance(value, float):
+                    self.assertAlmostEqual(results[key], value,
+                                           delta=abs(value) * 1e-9, msg=key)
+                else:
+                    self.assertEqual(results[key], value, msg=key)
+            shutil.rmtree(live.chunk_path)
+
+    def test_merge_chunks(self):
+        timestamp1_list, timestamp2_list, packet_sizes = generate_run(
+            20000, 17)
+        live = analytics.LiveAnalytics(1, "2", self.path)
+        os.makedirs(live.chunk_path)
+        # binary chunks as written by the receivers in spill mode
+        for number, start in enumerate(range(0, 20000, 6000)):
+            with open(live.chunk_file(number, ".bin"), "wb") as f:
+                for name, values in [("timestamp1_list", timestamp1_list),
+                                     ("timestamp2_list", timestamp2_list),
+                                     ("packet_sizes", packet_sizes)]:
+                    dtype = analytics.CHUNK_DTYPES[name]
+                    values = values[start:start + 6000]
+                    f.write(analytics.BIN_HEADER.pack(
+                        analytics.BIN_MAGIC, analytics.BIN_VERSION,
+                        dtype.encode(), len(values), 1, 2**48 - 1))
+                    f.write(analytics.np.asarray(
+                        values, dtype=dtype).tobytes())
+        self.assertEqual(live.fold(self.logger), 4)
+        with self.assertRaises(OSError):
+            analytics.merge_chunks(self.logger, self.path, 1)
+        manifest = os.path.join(live.chunk_path, "chunks_1.json")
+        with open(manifest, "w") as f:
+            json.dump({"chunks": 4, "packets": 20001}, f)
+        with self.assertRaises(ValueError):
+            analytics.merge_chunks(self.logger, self.path, 1)
+        self.assertEqual(sorted(os.listdir(self.path)), ["chunks"])
+        with open(manifest, "w") as f:
+            json.dump({"chunks": 4, "packets": 20000}, f)
+        self.assertTrue(live.complete())
+        self.assertEqual(analytics.merge_chunks(self.logger, self.path, 1),
+                         20000)
+        for name, values in [("timestamp1_list", timestamp1_list),
+                             ("timestamp2_list", timestamp2_list),
+                             ("packet_sizes", packet_sizes)]:
+            path = os.path.join(self.path, name + "_1.bin")
+            self.assertEqual(analytics.read_binary(path).tolist(), values)
+            self.assertEqual(analytics.read_binary_header(path)["tsmax"],
+                             2**48 - 1)
+        results = analytics.calculate_statistics_streaming(
+            self.logger, self.path, 1, "2")[0]
+        for key in ["num_processed_packets", "min_latency", "max_latency",
+                    "total_throughput"]:
+            self.assertEqual(live.results()[0][key], results[key], msg=key)
+        # truncated chunk
+        with open(live.chunk_file(3, ".bin"), "r+b") as f:
+            f.truncate(100)
+        with self.assertRaises(ValueError):
+            analytics.read_chunk(live.chunk_file(3, ".bin"))
+
+
+# min/max/mean pyramid of the interactive latency graph
+class TestLatencyPyramid(ResultsTestCase):
+    def test_latency_pyramid(self):
+        np = analytics.np
+        timestamp1_list, timestamp2_list, _ = generate_run(20000, 19)
+        latency = np.array(timestamp2_list) - np.array(timestamp1_list)
+        count_sec = (np.array(timestamp2_list) - timestamp2_list[0]) / 1e9
+        self.use_project_path()
+        self.assertIsNone(analytics.latency_tiles(1))
+        analytics.save_results(1, {}, latency)
+        analytics.save_latency_pyramid(1, latency, count_sec)
+        unit = analytics.find_unit(latency)[1]
+        tiles = analytics.latency_tiles(1, points=2000)
+        # 20000 => 5000 => 1250 buckets
+        self.assertEqual((tiles["level"], tiles["bucket"]), (2, 16))
+        self.assertEqual(len(tiles["x"]), 1250)
+        self.assertEqual(min(tiles["min"]), analytics.scale_to_unit(
+            latency.min(), unit))
+        self.assertEqual(max(tiles["max"]), analytics.scale_to_unit(
+            latency.max(), unit))
+        self.assertAlmostEqual(tiles["mean"][-1], analytics.scale_to_unit(
+            latency[-16:].mean(), unit), delta=0.01)
+        tiles = analytics.latency_tiles(1, 10000, 14000, 1000)
+        self.assertEqual(tiles["level"], 1)
+        self.assertEqual(tiles["x"][0], 10001)
+        self.assertEqual(len(tiles["x"]), 1000)
+        tiles = analytics.latency_tiles(1, 100, 300, 1000)
+        self.assertEqual(tiles["level"], 0)
+        self.assertEqual(tiles["x"], list(range(101, 301)))
+        self.assertEqual(tiles["max"], analytics.scale_to_unit(
+            latency[100:300], unit).tolist())
+        self.assertEqual(tiles["time"][-1], round(count_sec[299] * 1000))
+        # no latency series in streaming mode: the old pyramid is removed
+        self.write_run(timestamp1_list, timestamp2_list,
+                       [100] * len(timestamp1_list))
+        analytics.main(1, "1", self.path, streaming=True, plots=False)
+        self.assertIsNone(analytics.latency_tiles(1))
+
+
+# analysis of many runs at once (batch_analyze)
+class TestBatchAnalyze(ResultsTestCase):
+    def test_batch_analyze(self):
+        results_dir = os.path.join(self.path, "results")
+        for file_id, seed in [("21", 20), ("22", 21), ("31", 22)]:
+            self.write_run(*generate_run(2000, seed), raw_packet_counter=2000,
+                           file_id=file_id,
+                           path=os.path.join(results_dir, file_id))
+        os.makedirs(os.path.join(results_dir, "23"))
+        self.assertEqual(analytics.batch_run_ids(results_dir, ["2*"]),
+                         ["21", "22"])
+        self.assertEqual(analytics.batch_run_ids(results_dir, ["2*", "31"]),
+                         ["21", "22", "31"])
+        runs = [("21", "1", os.path.join(results_dir, "21")),
+                ("22", "", os.path.join(results_dir, "22")),
+                ("31", "1", os.path.join(results_dir, "31"))]
+        summary_path = os.path.join(results_dir, "batch_summary")
+        self.use_project_path()
+        summary = analytics.batch_analyze(runs, summary_path, self.logger,
+                                          2, plots=False)
+        self.assertEqual([row["status"] for row in summary["runs"]],
+                         ["ok", "error: config_22.json not found", "ok"])
+        row = summary["runs"][0]
+        self.assertEqual(row["num_processed_packets"], 2000)
+        self.assertIn("p99", row)
+        self.assertIn("reordered_packets", row)
+        generated = os.path.join(results_dir, "21", "generated")
+        with open(os.path.join(generated, "extHost_results.json")) as f:
+            self.assertFalse(json.load(f)["plotted"])
+        self.assertFalse(os.path.isfile(os.path.join(generated,
+                                                     "speed.svg")))
+        with open(summary_path + ".csv") as f:
+            self.assertEqual(len(f.readlines()), 4)
+        # graphs rendered in the worker processes
+        summary = analytics.batch_analyze(runs[:1], summary_path,
+                                          self.logger, 1)
+        self.assertEqual(summary["runs"][0]["status"], "ok")
+        self.assertTrue(os.path.isfile(os.path.join(generated,
+                                                    "speed.svg")))
+
+
+# synthetic runs and stages of benchmark.py
+class TestBenchmark(ResultsTestCase):
+    def test_benchmark_generate_run(self):
+        # 3 overflows of the stamper counter and 2 pauses of 5ms
+        benchmark.generate_run(self.path, 1, 50000, wraps=3, pauses=2,
+                               pause_length=5000000)
+        multi, tsmax = analytics.read_timestamp_format(self.path, 1)
+        self.assertEqual(multi, 1)
+        timestamp1 = analytics.read_csv(self.logger, self.path,
+                                        "timestamp1_list", 1)
+        self.assertEqual(analytics.np.count_nonzero(
+            analytics.np.diff(timestamp1) < 0), 3)
+        results, series = analytics.analyze_run(self.logger, self.path, 1,
+                                                "1")
+        self.assertEqual(results["num_raw_packets"], 50000)
+        self.assertEqual(results["num_processed_packets"], 50000)
+        self.assertGreaterEqual(results["min_latency"],
+                                benchmark.LATENCY - benchmark.JITTER)
+        self.assertLessEqual(results["max_latency"],
+                             benchmark.LATENCY + benchmark.JITTER)
+        self.assertEqual(results["packet_order"]["reordered_packets"], 0)
+        self.assertGreaterEqual(series["count_sec"][-1], 0.059)
+
+    def test_benchmark_stage(self):
+        results_path = os.path.join(self.path, "results", "1")
+        benchmark.generate_run(results_path, 1, 10000)
+        # run_stage sets the project path to the parent of results
+        self.use_project_path()
+        for stage in ["load", "statistics", "binning", "histogram"]:
+            report = benchmark.run_stage(stage, results_path, 1)
+            self.assertGreaterEqual(report["seconds"], 0)
+            self.assertGreater(report["peak_rss_mb"], 0)
+            self.assertFalse(report["streaming"])
+
+
+# columnar export of the per packet data (export_run)
+class TestExport(ResultsTestCase):
+    def test_export_run(self):
+        timestamp1_list, timestamp2_list, packet_sizes = generate_run(5000, 23)
+        self.write_run(timestamp1_list, timestamp2_list, packet_sizes)
+        with open(os.path.join(self.path, "config_1.json"), "w") as f:
+            json.dump({"multicast": "1"}, f)
+        try:
+            pa = analytics.get_pyarrow()
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        for file_format in ["parquet", "arrow"]:
+            path = analytics.export_run(
+                self.logger, self.path, 1, file_format,
+                os.path.join(self.path, "packets." + file_format), 997)
+            if file_format == "parquet":
+                table = pa.parquet.read_table(path)
+            else:
+                table = pa.ipc.open_file(path).read_all()
+            self.assertEqual(table.column("timestamp1").to_pylist(),
+                             timestamp1_list)
+            self.assertEqual(table.column("latency").to_pylist(), list(
+                map(int.__sub__, timestamp2_list, timestamp1_list)))
+            self.assertEqual(table.column("packet_size").to_pylist(),
+                             packet_sizes)
+            self.assertEqual(json.loads(
+                table.schema.metadata[b"p4sta_config"]), {"multicast": "1"})
+        os.remove(os.path.join(self.path, "packet_sizes_1.csv"))
+        with self.assertRaises(ValueError):
+            analytics.export_run(self.logger, self.path, 1, "parquet",
+                                 os.path.join(self.path, "broken.parquet"))
+        self.assertFalse(os.path.isfile(os.path.join(self.path,
+                                                     "broken.parquet")))
+
+
+# percentiles estimated by the mergeable LatencySketch
+class TestLatencySketch(unittest.TestCase):
+    def test_percentiles_sketch(self):
+        np = analytics.np
+        rnd = np.random.default_rng(10)
+        latency = np.concatenate((
+            rnd.lognormal(10, 1, 50000).astype(np.int64),
+            -rnd.integers(1, 5000, 300), np.zeros(20, dtype=np.int64)))
+        rnd.shuffle(latency)
+        sketch = analytics.LatencySketch()
+        merged = analytics.LatencySketch()
+        for chunk in np.array_split(latency, 7):
+            sketch.add(chunk)
+            part = analytics.LatencySketch()
+            part.add(chunk)
+            merged.merge(part)
+        min_latency, max_latency = int(latency.min()), int(latency.max())
+        percentiles = sketch.percentiles(min_latency, max_latency)
+        assert_percentiles_estimated(self, percentiles, latency,
+                                     analytics.PERCENTILE_ACCURACY)
+        self.assertEqual(merged.percentiles(min_latency, max_latency),
+                         percentiles)
+        self.assertEqual(sketch.percentiles(0, 10, [0, 100]),
+                         {"p0": 0, "p100": 10})
+
+
+# chunked statistics compared with the in-memory calculate_statistics
+class TestStreaming(ResultsTestCase):
+    def test_streaming_equivalent(self):
+        timestamp1_list, timestamp2_list, packet_sizes = generate_run(
+            20000, 6)
+        self.write_run(timestamp1_list, timestamp2_list, packet_sizes)
+        expected, expected_series = analytics.calculate_statistics(
+            timestamp1_list, timestamp2_list, packet_sizes, "2")
+        latency = list(map(int.__sub__, timestamp2_list, timestamp1_list))
+        for chunk_size in [1, 997, 20000, 50000]:
+            if chunk_size == 50000:
+                analytics.convert_csv_to_binary(self.logger, self.path, 1)
+            results, series = analytics.calculate_statistics_streaming(
+                self.logger, self.path, 1, "2", chunk_size)
+            self.assertNotIn("packet_order", results)
+            for key, value in expected.items():
+                if key == "packet_order":
+                    # needs all ingress timestamps, in memory only
+                    continue
+                elif key == "inter_arrival_times" and chunk_size < 20000:
+                    # egress packets are only sorted within a chunk
+                    self.assertEqual(results[key]["ingress"], value["ingress"])
+                    self.assertEqual(
+                        results[key]["egress"]["num_inter_arrival_times"],
+                        value["egress"]["num_inter_arrival_times"])
+                elif key == "latency_percentiles":
+                    # estimated by the sketch in streaming mode
+                    assert_percentiles_estimated(
+                        self, results[key], latency, 0.001)
+                elif isinstance(value, float):
+                    self.assertAlmostEqual(results[key], value,
+                                           delta=abs(value) * 1e-9, msg=key)
+                else:
+                    self.assertEqual(results[key], value, msg=key)
+            for key in ["mbit", "packet", "upsc_mbit", "upsc_packet"]:
+                self.assertEqual(series[key], expected_series[key])
+        # windows of 10us, many of them spread over several chunks
+        expected_series = analytics.calculate_statistics(
+            timestamp1_list, timestamp2_list, packet_sizes, "2",
+            throughput_window=10000)[1]
+        series = analytics.calculate_statistics_streaming(
+            self.logger, self.path, 1, "2", 997, throughput_window=10000)[1]
+        self.assertEqual(series["packet"], expected_series["packet"])
+
+    def test_streaming_length_mismatch(self):
+        self.write_run([5, 6, 7], [8, 9], [64, 64, 64])
+        results, series = analytics.calculate_statistics_streaming(
+            self.logger, self.path, 1, "1", 2)
+        self.assertIsNone(series)
+        self.assertEqual(results["num_processed_packets"], 0)
+
+
+# cache key of the analysis results saved in extHost_results.json
+class TestResultsCache(ResultsTestCase):
+    def test_results_cache_key(self):
+        self.write_run([5, 6, 7], [8, 9, 10], [64, 64, 64],
+                       raw_packet_counter=3)
+        key = analytics.results_cache_key(self.path, 1, "1")
+        self.assertEqual(sorted(key["inputs"]), [
+            "packet_sizes.csv", "raw_packet_counter.csv",
+            "timestamp1_list.csv", "timestamp2_list.csv"])
+        # the key is compared to the one loaded from extHost_results.json
+        self.assertEqual(json.loads(json.dumps(key)),
+                         analytics.results_cache_key(self.path, 1, "1"))
+        self.assertNotEqual(key, analytics.results_cache_key(
+            self.path, 1, "1", histogram_scale="log"))
+        self.assertNotEqual(key, analytics.results_cache_key(
+            self.path, 1, "10"))
+        self.write_csv("packet_sizes", [64, 64, 1500])
+        changed = analytics.results_cache_key(self.path, 1, "1")
+        self.assertNotEqual(key["inputs"]["packet_sizes.csv"],
+                            changed["inputs"]["packet_sizes.csv"])
+        analytics.convert_csv_to_binary(self.logger, self.path, 1)
+        self.assertIn("packet_sizes.bin", analytics.results_cache_key(
+            self.path, 1, "1")["inputs"])
+
+    def test_file_fingerprint(self):
+        path = os.path.join(self.path, "timestamp1_list_1.csv")
+        size = analytics.FINGERPRINT_BYTES * 3
+        with open(path, "wb") as f:
+            f.write(b"1" * size)
+        fingerprint = analytics.file_fingerprint(path)
+        self.assertEqual(fingerprint["size"], size)
+        # a change at the end of a large file is detected
+        with open(path, "r+b") as f:
+            f.seek(size - 1)
+            f.write(b"2")
+        os.utime(path, ns=(0, fingerprint["mtime_ns"]))
+        self.assertNotEqual(analytics.file_fingerprint(path)["sha1"],
+                            fingerprint["sha1"])
+
+
+# timestamps unwrapped with the timestamp-multi/-max of the stamper
+class TestReadTimestamps(ResultsTestCase):
+    def test_read_timestamps(self):
+        epoch = 2**32
+        self.write_csv("timestamp1_list", [epoch - 2, epoch - 1, 0, 1])
+        self.assertEqual(analytics.read_timestamp_format(self.path, 1), (0, 0))
+        self.assertEqual(analytics.read_timestamps(
+            self.logger, self.path, "timestamp1_list", 1).tolist(),
+            [epoch - 2, epoch - 1, 0, 1])
+        with open(os.path.join(self.path, "config_1.json"), "w") as f:
+            json.dump({"stamping_capabilities": {
+                "timestamp-multi": 1, "timestamp-max": epoch - 1}}, f)
+        self.assertEqual(analytics.read_timestamp_format(self.path, 1),
+                         (1, epoch - 1))
+        self.assertEqual(analytics.read_timestamps(
+            self.logger, self.path, "timestamp1_list", 1).tolist(),
+            [epoch - 2, epoch - 1, epoch, epoch + 1])
+        # the binary header has precedence
+        analytics.convert_csv_to_binary(self.logger, self.path, 1, 1000,
+                                        epoch - 1)
+        self.assertEqual(analytics.read_timestamp_format(self.path, 1),
+                         (1000, epoch - 1))
+
+
+# latency windows saved to and plotted from results/<id>/generated
+class TestLatencyWindows(ResultsTestCase):
+    def test_latency_windows_saved(self):
+        timestamp1_list, timestamp2_list, packet_sizes = generate_run(5000, 21)
+        results, series = analytics.calculate_statistics(
+            timestamp1_list, timestamp2_list, packet_sizes, "1")
+        self.use_project_path()
+        self.assertIsNone(analytics.load_latency_windows(1))
+        analytics.save_latency_windows(1, series["latency_windows"])
+        self.assertEqual(analytics.load_latency_windows(1),
+                         series["latency_windows"])
+        analytics.plot_latency_windows(series["latency_windows"],
+                                       "latency_windows", 1)
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.path, "results", "1", "generated",
+            "latency_windows.svg")))
+
+
+if __name__ == "__main__":
+    unittest.main()
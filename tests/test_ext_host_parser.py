@@ -0,0 +1,303 @@
+from array import array
+import os
+import random
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)).split("tests")[0])
+sys.path.append(os.path.join(
+    os.path.dirname(os.path.realpath(__file__)).split("tests")[0],
+    "extHost", "pythonExtHost"))
+try:
+    import bpf_filter
+    import packet_parser
+    import packet_ring
+    import parser_benchmark
+    import result_writer
+    from analytics import analytics
+except Exception as e:
+    print(e)
+
+
+# GTP-U encapsulated UDP packet as matched by the receiver: the 8 bytes of
+# the outer UDP header equal the 8 bytes after it and their value is 2152,
+# the inner UDP header follows 36 bytes (+ 8 with extension flag) later
+def gtp_packet(timestamp1, timestamp2, extension=False):
+    inner_udp = parser_benchmark.udp_packet(timestamp1, timestamp2)[34:]
+    flags = b"\x04" + bytes(27) if extension else b"\x00" + bytes(19)
+    return parser_benchmark.ipv4_frame(
+        17, struct.pack("!QQ", 2152, 2152) + flags + inner_udp)
+
+
+class TestPacketParser(unittest.TestCase):
+    def assert_same(self, packet, gtp=False, pppoe=False):
+        buf = bytearray(4096)
+        buf[:len(packet)] = packet
+        # stale bytes after the packet must not be parsed
+        buf[len(packet):] = b"\x0f\x10" * ((4096 - len(packet)) // 2) + \
+            b"\x0f" * (len(packet) % 2)
+        expected = parser_benchmark.parse_packet_hex(packet.hex(), gtp, pppoe)
+        self.assertEqual(packet_parser.parse_packet(buf, len(packet), gtp,
+                                                    pppoe), expected)
+        return expected
+
+    def test_udp(self):
+        ts1, ts2 = 2**48 - 5, 123456789
+        for vlans in [0, 1, 2]:
+            self.assertEqual(self.assert_same(parser_benchmark.udp_packet(
+                ts1, ts2, vlans=vlans)), (ts1, ts2))
+        packet = parser_benchmark.udp_packet(ts1, ts2, pppoe=True)
+        self.assertEqual(self.assert_same(packet, pppoe=True), (ts1, ts2))
+        self.assertIsNone(self.assert_same(packet))
+        # timestamps must follow the UDP header directly, empty field 0
+        packet = bytearray(parser_benchmark.udp_packet(ts1, ts2))
+        packet[50] = 1
+        self.assertIsNone(self.assert_same(bytes(packet)))
+
+    def test_tcp(self):
+        ts1, ts2 = 1600000000, 1600025000
+        for options_before in [0, 1, 3]:
+            for payload in [1, 100]:
+                self.assertEqual(self.assert_same(parser_benchmark.tcp_packet(
+                    ts1, ts2, payload, options_before, vlans=1)), (ts1, ts2))
+        # header of exactly 36 byte is too short for the receiver
+        self.assertIsNone(self.assert_same(parser_benchmark.tcp_packet(
+            ts1, ts2, 0)))
+
+    def test_gtp(self):
+        for extension in [False, True]:
+            packet = gtp_packet(5, 6, extension)
+            self.assertEqual(self.assert_same(packet, gtp=True), (5, 6))
+            self.assertIsNone(self.assert_same(packet))
+        # ends at the start of the outer UDP header
+        self.assertIsNone(self.assert_same(parser_benchmark.ipv4_frame(
+            17, b""), gtp=True))
+
+    def test_not_stamped(self):
+        arp = b"\xff" * 6 + b"\x66\x77\x88\x99\xaa\xbb\x08\x06" + bytes(28)
+        self.assertIsNone(self.assert_same(arp))
+        self.assertIsNone(self.assert_same(b""))
+        self.assertIsNone(self.assert_same(arp[:13]))
+        packet = parser_benchmark.udp_packet(1, 2)
+        for length in [14, 20, 23, 24, 41, 42, 57, 58, 59]:
+            self.assert_same(packet[:length])
+            self.assert_same(packet[:length], gtp=True)
+
+    def test_random_packets(self):
+        rnd = random.Random(1)
+        packets = parser_benchmark.synthetic_packets(300, 2)
+        packets += [gtp_packet(rnd.randint(1, 2**40), rnd.randint(1, 2**40))
+                    for i in range(20)]
+        for packet in packets:
+            for i in range(10):
+                # mutated headers, some of the packets cut
+                mutated = bytearray(packet)
+                for j in range(rnd.randint(1, 3)):
+                    mutated[rnd.randrange(min(len(packet), 80))] = \
+                        rnd.randrange(256)
+                if rnd.random() < 0.3:
+                    mutated = mutated[:rnd.randint(0, len(mutated))]
+                for gtp, pppoe in [(False, False), (True, True)]:
+                    self.assert_same(bytes(mutated), gtp, pppoe)
+
+    def test_read_pcap(self):
+        packets = parser_benchmark.synthetic_packets(10)
+        with tempfile.NamedTemporaryFile(suffix=".pcap") as f:
+            f.write(parser_benchmark.PCAP_HEADER.pack(
+                0xa1b2c3d4, 2, 4, 0, 0, 65535, 1))
+            for packet in packets:
+                f.write(parser_benchmark.PCAP_RECORD.pack(
+                    0, 0, len(packet), len(packet)) + packet)
+            f.flush()
+            self.assertEqual(parser_benchmark.read_pcap(f.name), packets)
+
+
+# interpreter of the classic BPF instructions used by bpf_filter, returns
+# the accepted length (0 = dropped)
+def run_filter(program, packet):
+    a = x = 0
+    mem = [0] * 16
+    pc = 0
+    sizes = {bpf_filter.BPF_W: 4, bpf_filter.BPF_H: 2, bpf_filter.BPF_B: 1}
+    while True:
+        code, jt, jf, k = program[pc]
+        pc += 1
+        cls, size, mode = code & 0x07, code & 0x18, code & 0xe0
+        if cls == bpf_filter.BPF_LD:
+            if mode == bpf_filter.BPF_MEM:
+                a = mem[k]
+                continue
+            offset = k + (x if mode == bpf_filter.BPF_IND else 0)
+            if offset + sizes[size] > len(packet):
+                return 0
+            a = int.from_bytes(packet[offset:offset + sizes[size]], "big")
+        elif cls == bpf_filter.BPF_LDX:
+            if k >= len(packet):
+                return 0
+            x = 4 * (packet[k] & 0x0f)
+        elif cls == bpf_filter.BPF_ST:
+            mem[k] = a
+        elif cls == bpf_filter.BPF_ALU:
+            a = (a + k if code & 0xf0 == bpf_filter.BPF_ADD else a >> k) & \
+                0xffffffff
+        elif cls == bpf_filter.BPF_MISC:
+            if code & 0xf8 == bpf_filter.BPF_TAX:
+                x = a
+            else:
+                a = x
+        elif cls == bpf_filter.BPF_RET:
+            return k
+        else:
+            op = code & 0xf0
+            if op == bpf_filter.BPF_JA:
+                pc += k
+            elif op == bpf_filter.BPF_JEQ:
+                pc += jt if a == k else jf
+            elif op == bpf_filter.BPF_JGT:
+                pc += jt if a > k else jf
+            else:
+                pc += jt if a & k else jf
+
+
+class TestBpfFilter(unittest.TestCase):
+    # every packet the receiver would accept passes the filter
+    def assert_passes(self, packet, gtp=False, pppoe=False):
+        program = bpf_filter.generate_filter(gtp, pppoe)
+        accepted = run_filter(program, packet) > 0
+        if packet_parser.parse_packet(packet, len(packet), gtp, pppoe) \
+                is not None:
+            self.assertTrue(accepted)
+        return accepted
+
+    def test_variants(self):
+        ts1, ts2 = 2**48 - 5, 123456789
+        for vlans in [0, 1, 2]:
+            self.assertTrue(self.assert_passes(parser_benchmark.udp_packet(
+                ts1, ts2, vlans=vlans)))
+            self.assertTrue(self.assert_passes(parser_benchmark.tcp_packet(
+                ts1, ts2, 10, 3, vlans=vlans)))
+        packet = parser_benchmark.udp_packet(ts1, ts2, pppoe=True)
+        self.assertTrue(self.assert_passes(packet, pppoe=True))
+        self.assertFalse(self.assert_passes(packet))
+        for extension in [False, True]:
+            packet = gtp_packet(5, 6, extension)
+            self.assertTrue(self.assert_passes(packet, gtp=True))
+            self.assertFalse(self.assert_passes(packet))
+
+    def test_dropped(self):
+        arp = b"\xff" * 6 + b"\x66\x77\x88\x99\xaa\xbb\x08\x06" + bytes(28)
+        self.assertFalse(self.assert_passes(arp, True, True))
+        packet = bytearray(parser_benchmark.udp_packet(1, 2))
+        packet[50] = 1
+        self.assertFalse(self.assert_passes(bytes(packet)))
+        packet = parser_benchmark.udp_packet(1, 2)
+        for length in [14, 34, 42, 58]:
+            self.assertFalse(self.assert_passes(packet[:length]))
+        self.assertTrue(self.assert_passes(packet[:59]))
+        # unstamped UDP and TCP (timestamp option type replaced)
+        self.assertFalse(self.assert_passes(
+            packet.replace(b"\x0f\x10", b"\x0f\x11", 1)))
+        packet = parser_benchmark.tcp_packet(1, 2, 100, 2)
+        self.assertFalse(self.assert_passes(
+            packet.replace(b"\x0f\x10", b"\x0f\x11", 1)))
+
+    def test_random_packets(self):
+        rnd = random.Random(2)
+        packets = parser_benchmark.synthetic_packets(300, 3)
+        packets += [gtp_packet(rnd.randint(1, 2**40), rnd.randint(1, 2**40),
+                               rnd.random() < 0.5) for i in range(20)]
+        accepted = 0
+        for packet in packets:
+            for i in range(10):
+                mutated = bytearray(packet)
+                for j in range(rnd.randint(0, 2)):
+                    mutated[rnd.randrange(min(len(packet), 80))] = \
+                        rnd.randrange(256)
+                if rnd.random() < 0.3:
+                    mutated = mutated[:rnd.randint(0, len(mutated))]
+                for gtp, pppoe in [(False, False), (True, True)]:
+                    accepted += self.assert_passes(bytes(mutated), gtp, pppoe)
+        self.assertTrue(accepted > 0)
+
+    def test_format(self):
+        program = bpf_filter.generate_filter(True, True)
+        text = bpf_filter.format_filter(program)
+        self.assertEqual(bpf_filter.parse_filter(text), program)
+        self.assertTrue(len(program) < 4096)
+        with self.assertRaises(ValueError):
+            bpf_filter.parse_filter("3," + text.split(",", 1)[1])
+
+
+class TestPacketRing(unittest.TestCase):
+    # TPACKET_V3 block as filled by the kernel: block descriptor, frames
+    # with their header aligned to 16 byte, the mac header after tp_mac
+    def test_block_frames(self):
+        packets = parser_benchmark.synthetic_packets(20)
+        ring = bytearray(2 * 16384)
+        block = 16384
+        first = 48
+        frame = block + first
+        for i, packet in enumerate(packets):
+            snaplen = min(len(packet), 600)
+            next_offset = (32 + 2 + snaplen + 15) // 16 * 16
+            if i == len(packets) - 1:
+                next_offset = 0
+            struct.pack_into("IIIIIIH", ring, frame, next_offset, 0, 0,
+                             snaplen, len(packet), 1, 34)
+            ring[frame + 34:frame + 34 + snaplen] = packet[:snaplen]
+            frame += next_offset
+        packet_ring.BLOCK_DESC.pack_into(ring, block, 1, 0,
+                                         packet_ring.TP_STATUS_USER,
+                                         len(packets), first)
+        frames = packet_ring.block_frames(ring, block)
+        self.assertEqual(len(frames), len(packets))
+        view = memoryview(ring)
+        for (start, snaplen, length), packet in zip(frames, packets):
+            self.assertEqual(length, len(packet))
+            self.assertEqual(bytes(view[start:start + snaplen]),
+                             packet[:600])
+            self.assertEqual(packet_parser.parse_packet(
+                view[start:start + snaplen], snaplen),
+                packet_parser.parse_packet(packet[:600], snaplen))
+        self.assertEqual(packet_ring.block_frames(ring, 0), [])
+
+
+class TestResultWriter(unittest.TestCase):
+    # result files of the receiver read back by the analytics
+    def test_read_binary(self):
+        multi, tsmax = 1000, 2**48 - 1
+        for typecode, dtype, values in [
+                ("Q", "<u8", [0, 1, 2**48 - 1, 1600000000000000000]),
+                ("H", "<u2", [64, 1500, 65535]), ("Q", "<u8", [])]:
+            with tempfile.TemporaryDirectory() as path:
+                path = os.path.join(path, "values_1.bin")
+                with open(path, "wb") as output:
+                    result_writer.write_values(output, array(typecode, values),
+                                               dtype, multi, tsmax)
+                header = analytics.read_binary_header(path)
+                self.assertEqual(header["dtype"], analytics.np.dtype(dtype))
+                self.assertEqual(header["dtype"].str, dtype)
+                self.assertEqual(header["count"], len(values))
+                self.assertEqual(header["multi"], multi)
+                self.assertEqual(header["tsmax"], tsmax)
+                self.assertEqual(analytics.read_binary(path).tolist(), values)
+
+    # chunk of the live analytics: timestamp1, timestamp2 and packet sizes
+    def test_read_chunk(self):
+        sections = [array("Q", [5, 6, 7]), array("Q", [8, 9, 2**40]),
+                    array("H", [64, 64, 1500])]
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, "chunk_1_0.bin")
+            with open(path, "wb") as output:
+                for values, dtype in zip(sections, ["<u8", "<u8", "<u2"]):
+                    result_writer.write_values(output, values, dtype, 0, 0)
+            values, header = analytics.read_chunk(path)
+        self.assertEqual([v.tolist() for v in values],
+                         [s.tolist() for s in sections])
+        self.assertEqual((header["multi"], header["tsmax"]), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()